@@ -52,7 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'store.sessions.LazySessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -124,6 +124,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'store.context_processors.categories_context',
+                'store.context_processors.cart_context',
             ],
         },
     },
@@ -147,9 +148,74 @@ if not DEBUG:
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
 
+# Cache Configuration
+# A shared backend keeps rate limiting and cached pages consistent across
+# gunicorn workers. CACHE_BACKEND: locmem (default), file, db or redis.
+# Heroku Redis sets REDIS_URL, which selects the redis backend by default.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'locmem').lower()
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', '300'))
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'sss',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'sss',
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    # Requires: python manage.py createcachetable
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'store_cache'),
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'sss',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'somerset-shrimp-shack',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'sss',
+        }
+    }
+
+# Cache alias used by the store app's namespaced caches (store/cache.py)
+STORE_CACHE_ALIAS = 'default'
+
+# Cart storage: 'session' (default) or 'database', which keeps signed-in
+# customers' carts in CartLine rows and merges the session cart on login
+CART_STORAGE = os.environ.get('CART_STORAGE', 'session').lower()
+
 # Session Configuration
+# Sessions are saved only when their data changes (store.sessions.LazySessionMiddleware);
+# the expiry of an active session is refreshed at most once per SESSION_REFRESH_INTERVAL.
 SESSION_COOKIE_AGE = 86400  # 24 hours
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', '3600'))  # 1 hour
+
+# SESSION_BACKEND: db (default), cached_db (reads served from CACHES) or
+# signed_cookies (no server-side storage; keep carts small, as cookies are
+# limited to about 4KB - use CART_STORAGE=database for signed-in customers)
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'db').lower()
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}.get(SESSION_BACKEND, 'django.contrib.sessions.backends.db')
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
 # CSRF Configuration
@@ -229,10 +295,25 @@ else:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Responsive image renditions (store/renditions.py): widths in pixels of the
+# WebP and JPEG/PNG copies written next to each uploaded product/category image.
+IMAGE_RENDITION_WIDTHS = tuple(
+    int(width) for width in os.environ.get('IMAGE_RENDITION_WIDTHS', '320,640,1024').split(',') if width.strip()
+)
+
 # Stripe Settings
 STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
 
+# Stripe API calls (store/payments.py): seconds per attempt, seconds per call
+# including retries, retries, and keep-alive connections per process.
+# STRIPE_API_BASE overrides the API host (e.g. a local fake for benchmarks).
+STRIPE_TIMEOUT = float(os.environ.get('STRIPE_TIMEOUT', '10'))
+STRIPE_TIMEOUT_BUDGET = float(os.environ.get('STRIPE_TIMEOUT_BUDGET', '20'))
+STRIPE_MAX_RETRIES = int(os.environ.get('STRIPE_MAX_RETRIES', '2'))
+STRIPE_POOL_SIZE = int(os.environ.get('STRIPE_POOL_SIZE', '10'))
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', '')
+
 # Messages configuration
 MESSAGE_TAGS = {
     messages.DEBUG: 'alert-info',
@@ -261,6 +342,17 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Somerset Shrimp Shack
 # Admin email for order notifications
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@somersetshrimp.com')
 
+# Email outbox (order emails are queued and sent by `manage.py process_email_outbox`)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '8'))
+EMAIL_OUTBOX_BACKOFF_BASE = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_BASE', '60'))  # seconds
+EMAIL_OUTBOX_BACKOFF_MAX = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX', str(6 * 3600)))  # seconds
+EMAIL_OUTBOX_STALE_AFTER = int(os.environ.get('EMAIL_OUTBOX_STALE_AFTER', '600'))  # seconds
+
+# Checkout stock holds last as long as the Stripe Checkout Session (31 minutes to 24 hours,
+# leaving a minute above Stripe's 30 minute minimum); lapsed holds are marked expired by
+# `manage.py expire_stock_reservations`
+STOCK_RESERVATION_TTL = int(os.environ.get('STOCK_RESERVATION_TTL', '1860'))  # seconds
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from .models import Product, Order, OrderItem, Category
+from django.utils import timezone
+from .models import (
+    Product, Order, OrderItem, Category, CartLine, OutboundEmail, StockMovement, StockReservation, WebhookEvent
+)
 
 # Inline display of OrderItem within Order admin
 class OrderItemInline(admin.TabularInline):
@@ -110,3 +113,67 @@ class CategoryAdmin(admin.ModelAdmin):
         return bool(obj.image)
     has_image.short_description = 'Image'
     has_image.boolean = True
+
+# Custom admin view for the order email outbox
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'order', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['order__email', 'order__order_reference']
+    readonly_fields = ['order', 'kind', 'attempts', 'claimed_at', 'sent_at', 'last_error', 'created_at']
+    list_select_related = ['order']
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """Requeue failed or dead-lettered emails for immediate delivery"""
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            claimed_at=None,
+        )
+        messages.success(request, f'{updated} email(s) queued for retry.')
+    retry_now.short_description = 'Retry selected emails now'
+
+# Read-only admin view of processed Stripe webhook events
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'processed_at']
+    list_filter = ['event_type']
+    search_fields = ['event_id']
+    readonly_fields = ['event_id', 'event_type', 'processed_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+# Read-only audit trail of manual stock changes
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'product', 'previous_stock', 'new_stock', 'change', 'reason', 'user']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['product__name']
+    list_select_related = ['product', 'user']
+    readonly_fields = ['product', 'user', 'reason', 'previous_stock', 'new_stock', 'change', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+# Checkout stock holds (read-only; created by checkout, settled by the Stripe webhook)
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'product', 'quantity', 'status', 'expires_at', 'stripe_checkout_id']
+    list_filter = ['status', 'created_at']
+    search_fields = ['stripe_checkout_id', 'product__name']
+    list_select_related = ['product']
+    readonly_fields = ['product', 'stripe_checkout_id', 'quantity', 'status', 'expires_at', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+# Saved carts of signed-in customers (CART_STORAGE = 'database')
+@admin.register(CartLine)
+class CartLineAdmin(admin.ModelAdmin):
+    list_display = ['user', 'product', 'size', 'quantity', 'price', 'updated_at']
+    search_fields = ['user__username', 'user__email', 'product__name']
+    list_select_related = ['user', 'product']
+    raw_id_fields = ['user', 'product']
@@ -0,0 +1,207 @@
+"""
+Sales analytics backed by the DailySalesRollup table.
+
+Orders update the rollup incrementally when they enter or leave a sale
+status (see Order.SALE_STATUSES), so the admin dashboard reads its KPIs and
+monthly chart from a handful of pre-aggregated rows instead of scanning
+orders. ``rebuild_daily_sales`` recomputes the table from the orders
+(``manage.py rebuild_sales_rollup``).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+def add_months(day, months):
+    """Return the first day of the month `months` away from `day`'s month"""
+    years, month = divmod(day.month - 1 + months, 12)
+    return day.replace(year=day.year + years, month=month + 1, day=1)
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _bump(day, **deltas):
+    """Add deltas to a day's rollup row, creating the row if needed"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if DailySalesRollup.objects.filter(date=day).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(date=day, **deltas)
+    except IntegrityError:
+        # Another transaction created the row first
+        DailySalesRollup.objects.filter(date=day).update(**increments)
+
+def _first_sale_day(order, include_order):
+    """Day of the customer's first sale in the order's month, or None"""
+    day = timezone.localdate(order.created_at)
+    month_start = day.replace(day=1)
+    first = Order.objects.filter(
+        email=order.email,
+        status__in=Order.SALE_STATUSES,
+        created_at__gte=_start_of_day(month_start),
+        created_at__lt=_start_of_day(add_months(month_start, 1)),
+    ).exclude(pk=order.pk).aggregate(first=Min('created_at'))['first']
+    
+    days = [timezone.localdate(first)] if first else []
+    if include_order:
+        days.append(day)
+    return min(days, default=None)
+
+def record_order_change(order, was_sale, is_sale):
+    """
+    Apply an order entering or leaving a sale status to the rollup.
+    
+    Args:
+        order: The Order (still present in the database)
+        was_sale: Whether the order counted as a sale before the change
+        is_sale: Whether it counts as a sale after the change
+    """
+    if was_sale == is_sale:
+        return
+    
+    sign = 1 if is_sale else -1
+    day = timezone.localdate(order.created_at)
+    items = order.items.aggregate(total=Sum('quantity'))['total'] or 0
+    
+    with transaction.atomic():
+        _bump(day, orders=sign, revenue=sign * order.total_amount, items=sign * items)
+        
+        # Move the customer's once-per-month count if their first sale day changed
+        old_day = _first_sale_day(order, include_order=was_sale)
+        new_day = _first_sale_day(order, include_order=is_sale)
+        if old_day != new_day:
+            if old_day:
+                _bump(old_day, customers=-1)
+            if new_day:
+                _bump(new_day, customers=1)
+
+def rebuild_daily_sales(since=None, batch_size=500):
+    """
+    Recompute the rollup from the orders table.
+    
+    Args:
+        since: Optional date; only months from this date's month onward are
+            rebuilt (whole months, so customer counts stay exact)
+        batch_size: Rows written per INSERT
+    
+    Returns:
+        int: Number of rollup rows written
+    """
+    orders = Order.objects.filter(status__in=Order.SALE_STATUSES)
+    rollups = DailySalesRollup.objects.all()
+    if since:
+        since = since.replace(day=1)
+        orders = orders.filter(created_at__gte=_start_of_day(since))
+        rollups = rollups.filter(date__gte=since)
+    
+    days = defaultdict(lambda: {'orders': 0, 'revenue': Decimal('0.00'), 'customers': 0, 'items': 0})
+    
+    by_day = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(order_count=Count('id'), revenue_total=Sum('total_amount'))
+        .order_by()
+    )
+    for row in by_day:
+        days[row['day']]['orders'] = row['order_count']
+        days[row['day']]['revenue'] = row['revenue_total'] or Decimal('0.00')
+    
+    items_by_day = (
+        OrderItem.objects.filter(order__in=orders)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day')
+        .annotate(item_count=Sum('quantity'))
+        .order_by()
+    )
+    for row in items_by_day:
+        days[row['day']]['items'] = row['item_count'] or 0
+    
+    first_sales = (
+        orders.annotate(month=TruncMonth('created_at'))
+        .values('email', 'month')
+        .annotate(first=Min('created_at'))
+        .order_by()
+    )
+    for row in first_sales.iterator():
+        days[timezone.localdate(row['first'])]['customers'] += 1
+    
+    with transaction.atomic():
+        rollups.delete()
+        DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(date=day, **totals) for day, totals in days.items()],
+            batch_size=batch_size,
+        )
+    
+    logger.info(f"Rebuilt {len(days)} daily sales rollup rows")
+    return len(days)
+
+def get_sales_summary(months=6, today=None):
+    """
+    Sales KPIs and a per-month series read from the rollup (two queries).
+    
+    Args:
+        months: Number of calendar months in the series, ending with the current one
+        today: Optional date to report from (defaults to the local date)
+    
+    Returns:
+        dict: 'total' (all-time orders, revenue and items) and 'months'
+        (oldest first, each with 'month', 'orders', 'revenue', 'customers'
+        and 'items')
+    """
+    today = today or timezone.localdate()
+    current_month = today.replace(day=1)
+    first_month = add_months(current_month, 1 - months)
+    
+    monthly = {
+        row['month']: row
+        for row in DailySalesRollup.objects.filter(date__gte=first_month, date__lte=today)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(
+            order_count=Sum('orders'),
+            revenue_total=Sum('revenue'),
+            customer_count=Sum('customers'),
+            item_count=Sum('items'),
+        )
+        .order_by()
+    }
+    # Customers are counted once per month, so they have no all-time total
+    totals = DailySalesRollup.objects.aggregate(
+        order_count=Sum('orders'),
+        revenue_total=Sum('revenue'),
+        item_count=Sum('items'),
+    )
+    
+    series = []
+    for offset in range(1 - months, 1):
+        month = add_months(current_month, offset)
+        row = monthly.get(month, {})
+        series.append({
+            'month': month,
+            'orders': row.get('order_count') or 0,
+            'revenue': row.get('revenue_total') or Decimal('0.00'),
+            'customers': row.get('customer_count') or 0,
+            'items': row.get('item_count') or 0,
+        })
+    
+    return {
+        'total': {
+            'orders': totals['order_count'] or 0,
+            'revenue': totals['revenue_total'] or Decimal('0.00'),
+            'items': totals['item_count'] or 0,
+        },
+        'months': series,
+    }
@@ -5,3 +5,7 @@ class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField' 
     
     name = 'store'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
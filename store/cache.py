@@ -0,0 +1,137 @@
+"""
+Shared cache layer for the store app.
+
+Every cache in the app goes through a named CacheNamespace so that keys are
+prefixed per subsystem, a whole subsystem can be invalidated at once by
+switching its version, and hit/miss counts are tracked per namespace.
+
+The backend itself is configured by the CACHES setting (see
+ecommerce/settings.py); STORE_CACHE_ALIAS selects which alias is used.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_TIMEOUT = 60 * 15  # 15 minutes
+
+_namespaces = {}
+_MISSING = object()
+
+class CacheNamespace:
+    """
+    A versioned key namespace in the shared store cache.
+    
+    Keys are stored as ``store:<name>:<version>:<key>``. Calling
+    invalidate() switches to a fresh random version, which orphans every
+    existing key in the namespace (they expire through their own timeouts).
+    Hit/miss counters are kept per process.
+    """
+    
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, versioned=True):
+        self.name = name
+        self.timeout = timeout
+        self.versioned = versioned
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _namespaces[name] = self
+    
+    def __repr__(self):
+        return f"<CacheNamespace {self.name}>"
+    
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'STORE_CACHE_ALIAS', 'default')]
+    
+    @property
+    def version_key(self):
+        return f"store:{self.name}:version"
+    
+    def get_version(self):
+        """Return the current namespace version, creating one if missing"""
+        if not self.versioned:
+            return '0'
+        version = self.cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not self.cache.add(self.version_key, version, None):
+                version = self.cache.get(self.version_key, version)
+        return version
+    
+    def make_key(self, key):
+        return f"store:{self.name}:{self.get_version()}:{key}"
+    
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def get(self, key, default=None):
+        value = self.cache.get(self.make_key(key), _MISSING)
+        self._record(value is not _MISSING)
+        return default if value is _MISSING else value
+    
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.make_key(key), value, self.timeout if timeout is None else timeout)
+    
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+    
+    def get_or_set(self, key, default, timeout=None):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        
+        Args:
+            default: Value or zero-argument callable producing the value
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = default() if callable(default) else default
+            self.set(key, value, timeout)
+        return value
+    
+    def incr(self, key, delta=1, timeout=None):
+        """
+        Atomically increment a counter, creating it with the namespace
+        timeout when missing. Returns the new value.
+        """
+        cache_key = self.make_key(key)
+        if self.cache.add(cache_key, delta, self.timeout if timeout is None else timeout):
+            return delta
+        try:
+            return self.cache.incr(cache_key, delta)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(cache_key, delta, self.timeout if timeout is None else timeout)
+            return delta
+    
+    def invalidate(self):
+        """Invalidate every key in this namespace"""
+        if self.versioned:
+            self.cache.set(self.version_key, uuid.uuid4().hex, None)
+    
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+        }
+    
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+def get_namespace(name):
+    """Return a registered namespace by name"""
+    return _namespaces[name]
+
+def cache_stats():
+    """Return hit/miss counters for every registered namespace"""
+    return {name: namespace.stats() for name, namespace in sorted(_namespaces.items())}
@@ -1,22 +1,224 @@
 from decimal import Decimal
 from django.conf import settings
-from .models import Product
+from django.db import transaction
+from django.db.models import Q, Sum
+from .cache import CacheNamespace
+from .models import CartLine, Product
 
-class Cart:
+# Bumped by the Product save/delete signal handlers so that any product map
+# memoized on a Cart instance is re-fetched after a catalogue edit.
+_product_generation = 0
+
+# Navbar item counts for database-backed carts, keyed by user id
+cart_count_cache = CacheNamespace('cart_counts', timeout=60 * 60 * 24)
+
+
+def invalidate_cart_products():
+    """Mark every memoized cart product map as stale"""
+    global _product_generation
+    _product_generation += 1
+
+
+def invalidate_cart_counts():
+    """Drop every cached cart item count (called when products are deleted)"""
+    cart_count_cache.invalidate()
+
+
+def _line_key(product_id, size=None):
+    """Return the cart key for a product and optional size"""
+    return f"{product_id}_{size}" if size else str(product_id)
+
+
+###################
+# CART STORAGE
+###################
+
+class SessionCartStorage:
     """
-    Shopping cart implementation that stores cart data in the user's session.
-    Provides methods to add, update, remove items and calculate totals.
+    Cart lines kept in the session under "cart" (the default backend).
+    
+    The session is only marked as modified when lines actually change.
     """
-    def __init__(self, request):
-        """Initialize the cart using Django's session"""
-        self.session = request.session
+    
+    def __init__(self, session):
+        self.session = session
+    
+    def load(self):
         cart = self.session.get("cart")
+        if not isinstance(cart, dict):
+            # Not stored until save(), so browsing never creates a session
+            return {}
+        return cart
+    
+    def save(self, lines, changed, removed):
+        self.session["cart"] = lines
+        self.session.modified = True
+    
+    def clear(self):
+        self.session["cart"] = {}
+        self.session.modified = True
+        return self.session["cart"]
+    
+    def item_count(self):
+        cart = self.session.get("cart")
+        if not isinstance(cart, dict):
+            return 0
+        return sum(item.get("quantity", 0) for item in cart.values())
+
+
+class DatabaseCartStorage:
+    """
+    Cart lines kept in the CartLine table for a signed-in user.
+    
+    Only changed lines are upserted and removed lines deleted, and the
+    user's item count is cached so the navbar never has to load the cart.
+    """
+    
+    def __init__(self, user):
+        self.user = user
+    
+    def load(self):
+        lines = {}
+        rows = CartLine.objects.filter(user=self.user).select_related('product').only(
+            'product_id', 'size', 'quantity', 'price', 'product__name'
+        )
+        for row in rows:
+            size = row.size or None
+            lines[_line_key(row.product_id, size)] = {
+                'id': str(row.product_id),
+                'name': row.product.name,
+                'price': str(row.price),
+                'quantity': row.quantity,
+                'size': size,
+            }
+        return lines
+    
+    def save(self, lines, changed, removed):
+        upserts = [
+            CartLine(
+                user=self.user,
+                product_id=int(lines[key]['id']),
+                size=lines[key].get('size') or '',
+                quantity=lines[key]['quantity'],
+                price=Decimal(lines[key]['price']),
+            )
+            for key in changed if key in lines
+        ]
+        removals = Q()
+        for key in removed:
+            product_id, _, size = key.partition('_')
+            removals |= Q(product_id=int(product_id), size=size)
+        
+        with transaction.atomic():
+            if upserts:
+                CartLine.objects.bulk_create(
+                    upserts,
+                    update_conflicts=True,
+                    unique_fields=['user', 'product', 'size'],
+                    update_fields=['quantity', 'price', 'updated_at'],
+                )
+            if removed:
+                CartLine.objects.filter(removals, user=self.user).delete()
+        cart_count_cache.set(self.user.pk, sum(item['quantity'] for item in lines.values()))
+    
+    def clear(self):
+        CartLine.objects.filter(user=self.user).delete()
+        cart_count_cache.set(self.user.pk, 0)
+        return {}
+    
+    def item_count(self):
+        return cart_count_cache.get_or_set(self.user.pk, lambda: (
+            CartLine.objects.filter(user=self.user).aggregate(total=Sum('quantity'))['total'] or 0
+        ))
+
+
+def get_cart_storage(request):
+    """
+    Return the cart storage for a request.
+    
+    CART_STORAGE = 'database' keeps signed-in users' carts in CartLine rows;
+    anonymous visitors (and the default 'session' setting) use the session.
+    """
+    user = getattr(request, 'user', None)
+    if getattr(settings, 'CART_STORAGE', 'session') == 'database' and user is not None and user.is_authenticated:
+        return DatabaseCartStorage(user)
+    return SessionCartStorage(request.session)
+
+
+def get_cart_item_count(request):
+    """Return the number of items in the request's cart without loading its lines"""
+    return get_cart_storage(request).item_count()
+
+
+def merge_session_cart(request, user):
+    """
+    Move an anonymous session cart into the user's database cart on login.
+    
+    Quantities of lines already in the saved cart are added together.
+    """
+    session_cart = request.session.get("cart")
+    if not session_cart or not isinstance(session_cart, dict):
+        return
+    
+    storage = DatabaseCartStorage(user)
+    lines = storage.load()
+    changed = set()
+    for key, item in session_cart.items():
+        try:
+            quantity = int(item['quantity'])
+            product_id = int(item['id'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if quantity <= 0:
+            continue
+        if key in lines:
+            lines[key]['quantity'] += quantity
+        else:
+            lines[key] = {
+                'id': str(product_id),
+                'name': item.get('name', ''),
+                'price': item.get('price', '0'),
+                'quantity': quantity,
+                'size': item.get('size'),
+            }
+        changed.add(key)
+    
+    if changed:
+        # Drop lines for products deleted since they were added
+        existing = set(Product.objects.filter(id__in={int(lines[key]['id']) for key in changed})
+                       .values_list('id', flat=True))
+        changed = {key for key in changed if int(lines[key]['id']) in existing}
+        storage.save(lines, changed, set())
+    del request.session["cart"]
 
-        if not cart:
-            cart = self.session["cart"] = {}  # Initialize empty cart
 
-        self.cart = cart
+###################
+# CART
+###################
 
+class Cart:
+    """
+    Shopping cart with pluggable storage (see get_cart_storage()).
+    Provides methods to add, update, remove items and calculate totals.
+    
+    Changes are tracked per line, and the storage is only written when a
+    line was actually added, changed or removed.
+    """
+    def __init__(self, request):
+        """Initialize the cart from the request's cart storage"""
+        self.session = request.session
+        self.storage = get_cart_storage(request)
+        self.cart = self.storage.load()
+        
+        # Keys of lines changed or removed since the last save
+        self._changed = set()
+        self._removed = set()
+        
+        # Products resolved for the current cart lines, memoized for the request
+        self._products = None
+        self._products_keys = set()
+        self._products_generation = None
+    
     def add(self, product, quantity=1, override_quantity=False, size=None):
         """
         Add a product to the cart or update its quantity.
@@ -30,9 +232,7 @@ class Cart:
         product_id = str(product.id)
         
         # Create a unique identifier for product+size combinations
-        cart_key = product_id
-        if size:
-            cart_key = f"{product_id}_{size}"
+        cart_key = _line_key(product_id, size)
             
         # Add new item to cart if not already present
         if cart_key not in self.cart:
@@ -43,15 +243,19 @@ class Cart:
                 'quantity': 0,
                 'size': size
             }
+            self._mark_changed(cart_key)
         
         # Update quantity based on override flag
+        previous = self.cart[cart_key]['quantity']
         if override_quantity:
             self.cart[cart_key]['quantity'] = quantity
         else:
             self.cart[cart_key]['quantity'] += quantity
+        if self.cart[cart_key]['quantity'] != previous:
+            self._mark_changed(cart_key)
             
         self.save()
-
+    
     def update(self, product_id, quantity, size=None):
         """
         Update the quantity of a product in the cart
@@ -61,20 +265,18 @@ class Cart:
             quantity: New quantity value
             size: Optional product size to identify the specific cart item
         """
-        product_id = str(product_id)  # Ensure ID is a string
-        
         # Create the cart key based on product ID and optional size
-        cart_key = product_id
-        if size:
-            cart_key = f"{product_id}_{size}"
+        cart_key = _line_key(product_id, size)
             
         # Update the item if it exists
         if cart_key in self.cart and int(quantity) > 0:
-            self.cart[cart_key]["quantity"] = int(quantity)
-            self.save()
+            if self.cart[cart_key]["quantity"] != int(quantity):
+                self.cart[cart_key]["quantity"] = int(quantity)
+                self._mark_changed(cart_key)
+                self.save()
             return True
         return False
-
+    
     def remove(self, product, size=None):
         """
         Remove a product from the cart
@@ -83,31 +285,60 @@ class Cart:
             product: Product object to remove
             size: Optional product size to identify specific item to remove
         """
-        product_id = str(product.id)
-        
         # Create the cart key based on product ID and optional size
-        cart_key = product_id
-        if size:
-            cart_key = f"{product_id}_{size}"
-
+        cart_key = _line_key(product.id, size)
+        
         # Remove the item if it exists
         if cart_key in self.cart:
             del self.cart[cart_key]
+            self._changed.discard(cart_key)
+            self._removed.add(cart_key)
             self.save()
             return True
         return False
-
+    
+    def _mark_changed(self, cart_key):
+        self._changed.add(cart_key)
+        self._removed.discard(cart_key)
+    
     def save(self):
-        """Save the cart in the session"""
-        self.session["cart"] = self.cart
-        self.session.modified = True
-
+        """Write any changed lines to the cart storage"""
+        if not self._changed and not self._removed:
+            return
+        self.storage.save(self.cart, self._changed, self._removed)
+        self._changed = set()
+        self._removed = set()
+    
     def clear(self):
         """Remove all items from the cart"""
-        self.session["cart"] = {}
-        self.cart = self.session["cart"]  # Update the reference
-        self.session.modified = True
-
+        self.cart = self.storage.clear()
+        self._changed = set()
+        self._removed = set()
+        self._products = None
+    
+    def get_products(self):
+        """
+        Resolve every product referenced by the cart in a single query.
+        
+        The result is memoized on this Cart instance and reused by
+        get_cart_items() and get_shipping_cost(); it is re-fetched when a
+        line references a product not yet loaded or when a product has been
+        saved or deleted since the last fetch.
+        
+        Returns:
+            dict: Product objects (with category) keyed by product id
+        """
+        product_ids = {int(item['id']) for item in self.cart.values()}
+        
+        if (self._products is None
+                or self._products_generation != _product_generation
+                or not product_ids.issubset(self._products_keys)):
+            self._products = Product.objects.select_related('category').in_bulk(product_ids)
+            self._products_keys = product_ids
+            self._products_generation = _product_generation
+        
+        return self._products
+    
     def is_in_cart(self, product, size=None):
         """
         Check if a product is already in the cart
@@ -119,19 +350,12 @@ class Cart:
         Returns:
             bool: True if the product is in the cart, False otherwise
         """
-        product_id = str(product.id)
-        
-        # Create the cart key based on product ID and optional size
-        cart_key = product_id
-        if size:
-            cart_key = f"{product_id}_{size}"
-            
-        return cart_key in self.cart
-
+        return _line_key(product.id, size) in self.cart
+    
     def get_items(self):
         """Return all cart items"""
         return self.cart.values()
-
+    
     def get_total_price(self):
         """Calculate the total cost of all items in the cart"""
         return sum(Decimal(item["price"]) * item["quantity"] for item in self.cart.values())
@@ -144,18 +368,21 @@ class Cart:
         """
         Return cart items as CartItem objects with full product information
         """
+        if not self.cart:
+            return []
+        
+        products = self.get_products()
         cart_items = []
         for item in self.cart.values():
-            try:
-                product = Product.objects.get(id=item['id'])
-                cart_items.append(CartItem(
-                    product=product,
-                    quantity=item['quantity'],
-                    size=item.get('size')
-                ))
-            except Product.DoesNotExist:
+            product = products.get(int(item['id']))
+            if product is None:
                 # Handle case where product no longer exists
-                pass
+                continue
+            cart_items.append(CartItem(
+                product=product,
+                quantity=item['quantity'],
+                size=item.get('size')
+            ))
         
         return cart_items
         
@@ -175,9 +402,14 @@ class Cart:
         if not self.cart:
             return Decimal('0.00')
         
-        # Check if any item in the cart is a live aquarium animal
-        cart_items = self.get_cart_items()
-        has_live_animals = any(item.product.is_shrimp_product for item in cart_items)
+        # Check if any item in the cart is a live aquarium animal using the
+        # precomputed shipping class on the (memoized) cart products
+        products = self.get_products()
+        has_live_animals = any(
+            products[int(item['id'])].is_shrimp_product
+            for item in self.cart.values()
+            if int(item['id']) in products
+        )
         
         # Return appropriate shipping cost
         if has_live_animals:
@@ -0,0 +1,455 @@
+"""
+Bulk catalogue import from JSON Lines or CSV (the import_catalogue command).
+
+The old setup scripts created every category and product with its own
+save(): a slug query per candidate, full validation and several signal
+handlers per row. The importer instead streams records from the file and
+works through them in chunks:
+
+* categories are resolved by slug from a map loaded once (category
+  records in a JSON Lines file are upserted as they are met)
+* rows without a slug are matched to existing products by name and
+  category: the n-th such row for a name updates the n-th product with
+  that name (oldest first), so several "Cherry Shrimp" grades stay
+  separate products, and the rest get slugs allocated for the whole
+  chunk at once (see SlugAllocator)
+* rows are validated in Python and written with one
+  bulk_create(update_conflicts=True) per chunk, keyed on the slug, so
+  re-running an import updates products in place; a second row for a
+  slug already imported is reported as an error
+* the search index is updated per chunk and the catalogue caches are
+  invalidated once at the end
+
+JSON Lines records look like:
+
+    {"type": "category", "slug": "live-shrimp", "name": "Live Shrimp", "order": 10}
+    {"name": "Amano Shrimp", "category": "live-shrimp", "price": "5.99", "stock": 40}
+
+CSV files have one product per row with the same column names. Only the
+optional columns present in a row are written when a product already
+exists, so a file with just slug, name, category and price leaves stock
+untouched.
+"""
+import csv
+import json
+import logging
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.utils.text import slugify
+
+from .models import Category, Product, SIZE_CHOICES, SlugAllocator, classify_shipping_class
+from .stock_io import FALSE_VALUES, TRUE_VALUES
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+MAX_PRICE = Decimal('9999.99')
+
+REQUIRED_FIELDS = ['name', 'category', 'price']
+OPTIONAL_FIELDS = ['description', 'meta_description', 'size', 'stock', 'available', 'featured']
+CATEGORY_FIELDS = ['name', 'description', 'order']
+VALID_SIZES = {value for value, label in SIZE_CHOICES}
+
+class CatalogueImportError(Exception):
+    """Raised when a catalogue file cannot be read at all"""
+    pass
+
+class ImportReport:
+    """Running totals for an import"""
+    
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.categories = 0
+        self.errors = []
+        self.error_count = 0
+        self.started = time.monotonic()
+        self.finished = None
+    
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+    
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+    
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+###################
+# Reading
+###################
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    raise CatalogueImportError('Use a .jsonl, .ndjson or .csv file (or pass --format).')
+
+def read_lines(file):
+    """
+    Yield decoded lines from a file opened in binary mode.
+    
+    Raises:
+        CatalogueImportError: On the first line that is not UTF-8
+    """
+    for number, line in enumerate(file, start=1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError as e:
+            raise CatalogueImportError(f'Line {number}: not UTF-8 text ({e.reason} at byte {e.start})')
+
+def iter_records(file, fmt):
+    """
+    Yield (line number, record dict) from an open text file or lines.
+    
+    The file is read lazily, one line or CSV row at a time.
+    
+    Raises:
+        CatalogueImportError: If a CSV row cannot be parsed at all
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        try:
+            if not reader.fieldnames:
+                return
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+            for record in reader:
+                if not any((value or '').strip() for value in record.values() if isinstance(value, str)):
+                    continue  # Skip blank lines
+                yield reader.line_num, {key: value for key, value in record.items() if value not in (None, '')}
+        except csv.Error as e:
+            # DictReader.line_num lags until a row parses; the inner reader's counts the bad line
+            raise CatalogueImportError(f'Line {reader.reader.line_num}: {str(e)}')
+        return
+    
+    for number, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, CatalogueImportError(f'Invalid JSON: {str(e)}')
+            continue
+        if not isinstance(record, dict):
+            yield number, CatalogueImportError('Each line must be a JSON object.')
+            continue
+        yield number, record
+
+###################
+# Validation
+###################
+
+def _blank(value):
+    return value is None or str(value).strip() == ''
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError('enter yes or no')
+
+def _parse_price(value):
+    try:
+        price = Decimal(str(value).strip().lstrip('£'))
+    except InvalidOperation:
+        raise ValueError('not a number')
+    if not price.is_finite() or price < Decimal('0.01') or price > MAX_PRICE:
+        raise ValueError(f'must be between 0.01 and {MAX_PRICE}')
+    return price.quantize(Decimal('0.01'))
+
+def _parse_stock(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    stock = int(str(value).strip())
+    if stock < 0:
+        raise ValueError('cannot be negative')
+    return stock
+
+PARSERS = {
+    'price': _parse_price,
+    'stock': _parse_stock,
+    'available': _parse_bool,
+    'featured': _parse_bool,
+}
+
+def clean_product(record):
+    """
+    Validate a product record.
+    
+    Returns:
+        dict of cleaned values (slug, '' if the record has none, required
+        fields and any optional fields present in the record)
+    
+    Raises:
+        ValueError: With a message describing every problem in the record
+    """
+    problems = [f'{field} is required' for field in REQUIRED_FIELDS if _blank(record.get(field))]
+    max_length = Product._meta.get_field('slug').max_length
+    cleaned = {'slug': slugify(str(record.get('slug') or ''))[:max_length]}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        if _blank(record.get(field)):
+            continue
+        value = record[field]
+        try:
+            cleaned[field] = PARSERS[field](value) if field in PARSERS else str(value).strip()
+        except (TypeError, ValueError) as e:
+            problems.append(f'{field}: {str(e)}')
+    
+    if len(cleaned.get('name', '')) > Product._meta.get_field('name').max_length:
+        problems.append('name is too long')
+    if cleaned.get('size') and cleaned['size'] not in VALID_SIZES:
+        problems.append(f"size: must be one of {', '.join(sorted(VALID_SIZES))}")
+    if problems:
+        raise ValueError('; '.join(problems))
+    return cleaned
+
+###################
+# Importing
+###################
+
+class CatalogueImporter:
+    """
+    Upsert categories and products from a stream of records.
+    
+    Usage:
+        importer = CatalogueImporter(chunk_size=1000)
+        report = importer.run(iter_records(file, 'jsonl'))
+    """
+    
+    def __init__(self, chunk_size=CHUNK_SIZE, create_categories=False, index=True, progress=None):
+        """
+        Args:
+            chunk_size: Products written per bulk statement and transaction
+            create_categories: Create categories for unknown slugs instead of
+                rejecting the product
+            index: Update the search index as chunks are written
+            progress: Optional callable receiving the report after each chunk
+        """
+        self.chunk_size = max(1, chunk_size)
+        self.create_categories = create_categories
+        self.index = index
+        self.progress = progress
+        self.categories = {category.slug: category for category in Category.objects.only('id', 'slug', 'name')}
+        self.slugs = SlugAllocator(Product)
+        # Slugs of products with a given (name, category id), oldest first, and
+        # how many rows without a slug have used them so far
+        self.named = {}
+        self.named_used = {}
+        self.loaded_names = set()
+        # Line each slug was imported from, to report repeats
+        self.imported = {}
+        self.report = ImportReport()
+    
+    def run(self, records):
+        """
+        Import every record, writing products a chunk at a time.
+        
+        Returns:
+            ImportReport
+        
+        Raises:
+            CatalogueImportError: If the file cannot be read past a line or a
+                chunk cannot be written; earlier chunks stay imported
+        """
+        chunk = []
+        try:
+            for line, record in records:
+                if isinstance(record, CatalogueImportError):
+                    self.report.add_error(line, str(record))
+                    continue
+                if record.get('type') == 'category':
+                    self._import_category(line, record)
+                    continue
+                
+                self.report.rows += 1
+                try:
+                    chunk.append((line, clean_product(record)))
+                except ValueError as e:
+                    self.report.add_error(line, str(e))
+                
+                if len(chunk) >= self.chunk_size:
+                    self._write_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._write_chunk(chunk)
+        finally:
+            self.report.finished = time.monotonic()
+            if self.report.created or self.report.updated:
+                # bulk_create sends no model signals
+                from .signals import invalidate_catalogue_caches
+                invalidate_catalogue_caches()
+        return self.report
+    
+    def _import_category(self, line, record):
+        slug = str(record.get('slug') or '').strip()
+        if not slug:
+            self.report.add_error(line, 'category slug is required')
+            return
+        category = Category.objects.filter(slug=slug).first() or Category(slug=slug)
+        for field in CATEGORY_FIELDS:
+            if not _blank(record.get(field)):
+                setattr(category, field, record[field])
+        if not category.name:
+            category.name = slug.replace('-', ' ').title()
+        try:
+            category.save()
+        except Exception as e:
+            self.report.add_error(line, f'category {slug}: {str(e)}')
+            return
+        self.categories[slug] = category
+        self.report.categories += 1
+    
+    def _category(self, slug):
+        category = self.categories.get(slug)
+        if category is None and self.create_categories:
+            category = Category(slug=slug, name=slug.replace('-', ' ').title())
+            category.save()
+            self.categories[slug] = category
+            self.report.categories += 1
+        return category
+    
+    def _write_chunk(self, chunk):
+        try:
+            self._upsert(chunk)
+        except DatabaseError as e:
+            raise CatalogueImportError(f'Lines {chunk[0][0]}-{chunk[-1][0]}: {str(e)}') from e
+    
+    def _upsert(self, chunk):
+        rows = []
+        for line, values in chunk:
+            category = self._category(values['category'])
+            if category is None:
+                self.report.add_error(line, f"unknown category '{values['category']}'")
+                continue
+            rows.append((line, values, category))
+        self._assign_slugs(rows)
+        
+        # One row per product
+        by_slug = {}
+        for line, values, category in rows:
+            slug = values['slug']
+            if slug in self.imported:
+                self.report.add_error(line, f"product '{slug}' was already imported from line {self.imported[slug]}")
+                continue
+            self.imported[slug] = line
+            by_slug[slug] = (values, category)
+        
+        with transaction.atomic():
+            existing = set(Product.objects.filter(slug__in=list(by_slug)).values_list('slug', flat=True))
+            
+            # Group by the optional fields present, so absent columns are left alone
+            groups = {}
+            restocked = {}
+            for slug, (values, category) in by_slug.items():
+                if 'stock' in values:
+                    restocked[slug] = values['stock']
+                present = frozenset(field for field in OPTIONAL_FIELDS if field in values)
+                groups.setdefault(present, []).append(self._build(values, category, slug not in existing))
+            
+            for present, products in groups.items():
+                update_fields = ['name', 'category', 'price', 'shipping_class', 'updated_at'] + sorted(present)
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['slug'],
+                    update_fields=update_fields,
+                )
+            
+            written = [product for products in groups.values() for product in products]
+            # Same rule as Product.save(): running out of stock makes a product
+            # unavailable, but restocking never makes it available again
+            sold_out = [slug for slug, stock in restocked.items() if stock <= 0 and slug in existing]
+            if sold_out:
+                Product.objects.filter(slug__in=sold_out, available=True).update(available=False)
+            if self.index and written:
+                self._index(written)
+        
+        self.report.created += len(written) - len(existing)
+        self.report.updated += len(existing)
+        if self.progress:
+            self.progress(self.report)
+    
+    def _assign_slugs(self, rows):
+        """
+        Give rows without a slug the slug of the product they update, or a
+        newly allocated one.
+        """
+        self.slugs.reserve(values['slug'] for line, values, category in rows if values['slug'])
+        unslugged = [(values, category) for line, values, category in rows if not values['slug']]
+        if not unslugged:
+            return
+        
+        # Existing products are read once per name
+        new_names = list({values['name'] for values, category in unslugged} - self.loaded_names)
+        if new_names:
+            self.loaded_names.update(new_names)
+            query = Product.objects.filter(name__in=new_names).order_by('id')
+            for name, category_id, slug in query.values_list('name', 'category_id', 'slug'):
+                self.named.setdefault((name, category_id), []).append(slug)
+        
+        new = []
+        for values, category in unslugged:
+            key = (values['name'], category.pk)
+            slugs = self.named.setdefault(key, [])
+            used = self.named_used.get(key, 0)
+            self.named_used[key] = used + 1
+            if used < len(slugs):
+                values['slug'] = slugs[used]
+            else:
+                new.append((values, slugs))
+        
+        for (values, slugs), slug in zip(new, self.slugs.allocate([values['name'] for values, slugs in new])):
+            values['slug'] = slug
+            slugs.append(slug)
+    
+    def _build(self, values, category, new):
+        stock = values.get('stock', 0)
+        product = Product(
+            slug=values['slug'],
+            name=values['name'],
+            category=category,
+            price=values['price'],
+            description=values.get('description', ''),
+            meta_description=values.get('meta_description', ''),
+            size=values.get('size') or None,
+            stock=stock,
+            available=values.get('available', True),
+            featured=values.get('featured', False),
+            shipping_class=classify_shipping_class(values['name'], category.name),
+        )
+        if stock <= 0 and (new or 'stock' in values):
+            # An existing product's stock is only known when the row has it
+            product.available = False
+        return product
+    
+    def _index(self, products):
+        from .search import get_search_backend
+        
+        # Upserted rows may not get their ids back on every database
+        missing = [product.slug for product in products if product.pk is None]
+        if missing:
+            ids = dict(Product.objects.filter(slug__in=missing).values_list('slug', 'id'))
+            for product in products:
+                if product.pk is None:
+                    product.pk = ids.get(product.slug)
+        try:
+            with transaction.atomic():
+                get_search_backend().index_products(products)
+        except Exception as e:
+            logger.error(f"Failed to index imported products for search: {str(e)}")
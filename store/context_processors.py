@@ -1,9 +1,44 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cache import CacheNamespace
+from .cart import get_cart_item_count
 from .models import Category
 
+NAV_CATEGORIES_CACHE_TIMEOUT = 60 * 60 * 24  # 24 hours
+
+nav_cache = CacheNamespace('nav_categories', NAV_CATEGORIES_CACHE_TIMEOUT)
+
+def invalidate_nav_categories():
+    """Invalidate the cached category nav (called on category save/delete/reorder)"""
+    nav_cache.invalidate()
+
+def get_nav_categories():
+    """
+    Return the category nav as a small list of dicts (id, name, slug),
+    ordered by display order then name, cached under a versioned key.
+    """
+    return nav_cache.get_or_set('list', lambda: list(
+        Category.objects.order_by('order', 'name').values('id', 'name', 'slug')
+    ))
+
 def categories_context(request):
     """
     Context processor to make categories available in all templates
+    
+    The value is lazy, so renders that never use nav_categories (AJAX
+    responses, emails, admin pages) do not touch the cache or database.
+    """
+    return {
+        'nav_categories': SimpleLazyObject(get_nav_categories)
+    }
+
+def cart_context(request):
+    """
+    Context processor exposing the navbar cart item count
+    
+    Lazy like nav_categories; with database carts the count is a single
+    cached integer, so the cart lines are never loaded just for the badge.
     """
     return {
-        'nav_categories': Category.objects.all().order_by('order', 'name')
+        'cart_item_count': SimpleLazyObject(lambda: get_cart_item_count(request))
     }
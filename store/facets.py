@@ -0,0 +1,173 @@
+"""
+Faceted navigation for the product list.
+
+All facet counts for a filter set come from a single grouped query over
+available products. The grouped rows ignore the category filter so that the
+category facet can show every category (disjunctive faceting) while the
+remaining facets are folded in Python for the selected category only.
+Rows are cached per normalized filter key and invalidated by the Product and
+Category signal handlers.
+"""
+import hashlib
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import BooleanField, Case, Count, Max, Min, Q, Value, When
+
+from .cache import CacheNamespace
+from .models import Product, SIZE_CHOICES
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+FACET_CACHE_TIMEOUT = 60 * 15  # 15 minutes
+
+facet_cache = CacheNamespace('facets', FACET_CACHE_TIMEOUT)
+
+def _parse_price(value, label):
+    """Parse a non-negative price filter value, returning None when invalid"""
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except (ValueError, TypeError, InvalidOperation):
+        logger.warning(f"Invalid {label} provided: {value}")
+        return None
+    if not price.is_finite() or price < 0:
+        logger.warning(f"Invalid {label} provided: {value}")
+        return None
+    return price
+
+def normalize_filters(params):
+    """
+    Build a normalized filter dict from request GET parameters.
+    
+    Equivalent requests (extra whitespace, different price formatting) map
+    to the same dict and therefore the same cache key.
+    """
+    min_price = _parse_price(params.get('min_price'), 'min_price')
+    max_price = _parse_price(params.get('max_price'), 'max_price')
+    return {
+        'category': (params.get('category') or '').strip(),
+        # Limit search query length for security; the filter form submits "q"
+        'search': (params.get('search') or params.get('q') or '').strip()[:100],
+        'in_stock': params.get('in_stock') == '1',
+        'min_price': min_price.normalize() if min_price is not None else None,
+        'max_price': max_price.normalize() if max_price is not None else None,
+    }
+
+def filter_products(queryset, filters, include_category=True):
+    """Apply a normalized filter dict to a Product queryset"""
+    if include_category and filters['category']:
+        # Try to filter by category slug or name
+        queryset = queryset.filter(
+            Q(category__slug=filters['category']) | Q(category__name__iexact=filters['category'])
+        )
+    
+    if filters['search']:
+        queryset = get_search_backend().filter(queryset, filters['search'])
+    
+    if filters['in_stock']:
+        queryset = queryset.filter(stock__gt=0)
+    
+    if filters['min_price'] is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    
+    if filters['max_price'] is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    
+    return queryset
+
+def invalidate_facets():
+    """Invalidate every cached facet result"""
+    facet_cache.invalidate()
+
+def _cache_key(filters):
+    """Cache key for the grouped rows (the category filter is not part of it)"""
+    key_data = {k: str(v) for k, v in filters.items() if k != 'category'}
+    return hashlib.md5(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+def _grouped_rows(filters):
+    """Run (or fetch from cache) the single grouped facet query"""
+    cache_key = _cache_key(filters)
+    rows = facet_cache.get(cache_key)
+    if rows is not None:
+        return rows
+    
+    queryset = filter_products(
+        Product.objects.filter(available=True), filters, include_category=False
+    )
+    rows = list(
+        queryset.annotate(
+            has_stock=Case(
+                When(stock__gt=0, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        ).order_by().values(
+            'category_id', 'category__name', 'category__slug', 'size', 'has_stock'
+        ).annotate(
+            count=Count('id'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+        )
+    )
+    facet_cache.set(cache_key, rows)
+    return rows
+
+def _matches_category(row, category):
+    return row['category__slug'] == category or row['category__name'].lower() == category.lower()
+
+def get_facets(filters):
+    """
+    Return facet data for a normalized filter dict.
+    
+    Returns:
+        dict with:
+            total: number of products matching all filters
+            categories: list of {id, name, slug, count}, ignoring the category filter
+            price_range: {min_price, max_price} for the matching products
+            in_stock / out_of_stock: counts for the matching products
+            sizes: list of {value, label, count} for the matching products
+    """
+    rows = _grouped_rows(filters)
+    
+    categories = {}
+    for row in rows:
+        entry = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            'count': 0,
+        })
+        entry['count'] += row['count']
+    
+    if filters['category']:
+        rows = [row for row in rows if _matches_category(row, filters['category'])]
+    
+    size_labels = dict(SIZE_CHOICES)
+    size_counts = {}
+    in_stock = out_of_stock = 0
+    for row in rows:
+        if row['has_stock']:
+            in_stock += row['count']
+        else:
+            out_of_stock += row['count']
+        if row['size']:
+            size_counts[row['size']] = size_counts.get(row['size'], 0) + row['count']
+    
+    return {
+        'total': in_stock + out_of_stock,
+        'categories': sorted(categories.values(), key=lambda c: c['name'].lower()),
+        'price_range': {
+            'min_price': min((row['min_price'] for row in rows), default=None),
+            'max_price': max((row['max_price'] for row in rows), default=None),
+        },
+        'in_stock': in_stock,
+        'out_of_stock': out_of_stock,
+        'sizes': [
+            {'value': value, 'label': size_labels[value], 'count': size_counts[value]}
+            for value, _ in SIZE_CHOICES if value in size_counts
+        ],
+    }
@@ -1,6 +1,7 @@
 from django import forms
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from .models import Product, Category
+from .uploads import validate_image_upload
 
 class ProductForm(forms.ModelForm):
     # Add proper validators to price field
@@ -37,6 +38,10 @@ class ProductForm(forms.ModelForm):
         return name
 
 class CategoryForm(forms.ModelForm):
+    # Checked by store.uploads from the file header; a plain FileField avoids
+    # also decoding the whole image with Pillow
+    image = forms.FileField(required=False, widget=forms.ClearableFileInput(attrs={'accept': 'image/*'}))
+    
     class Meta:
         model = Category
         fields = ['name', 'description', 'image', 'order']
@@ -77,20 +82,11 @@ class CategoryForm(forms.ModelForm):
         return name
     
     def clean_image(self):
-        """Validate the image field"""
+        """Validate the image field (size, extension and real image type)"""
         image = self.cleaned_data.get('image')
-        if image:
-            # Check file size (max 5MB)
-            if hasattr(image, 'size') and image.size > 5 * 1024 * 1024:
-                raise forms.ValidationError('Image file too large. Maximum size is 5MB.')
-            
-            # Check file extension
-            if hasattr(image, 'name'):
-                valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-                file_name = image.name.lower()
-                if not any(file_name.endswith(ext) for ext in valid_extensions):
-                    raise forms.ValidationError(f'Invalid image format. Allowed formats: {", ".join(valid_extensions)}')
-        
+        # Only new uploads; the stored image (a committed FieldFile) passed already
+        if image and not getattr(image, '_committed', False):
+            validate_image_upload(image)
         return image
 
 class CheckoutForm(forms.Form):
@@ -105,4 +101,16 @@ class ContactForm(forms.Form):
     name = forms.CharField(max_length=100, required=True)
     email = forms.EmailField(required=True)
     subject = forms.CharField(max_length=200, required=True)
-    message = forms.CharField(widget=forms.Textarea, required=True)
\ No newline at end of file
+    message = forms.CharField(widget=forms.Textarea, required=True)
+
+class StockImportForm(forms.Form):
+    file = forms.FileField(
+        validators=[FileExtensionValidator(['csv', 'xlsx'])],
+        help_text="CSV or XLSX file with id, stock, price and available columns"
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Preview changes only",
+        help_text="Show what would change without saving anything"
+    )
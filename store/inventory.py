@@ -0,0 +1,379 @@
+"""
+Stock reservation, decrement and bulk stock updates.
+
+Stock is decremented with conditional UPDATE statements
+(``SET stock = stock - q WHERE id = ? AND stock >= q``), so concurrent
+webhooks can never lose an update or drive stock negative, and no product
+rows need to be read first. The same statement marks a product unavailable
+when it sells out.
+
+Manual stock takes go through apply_stock_levels(), which reads every
+affected product once, writes all changes with a single bulk_update and
+records a StockMovement audit row per change.
+
+During Stripe checkout, stock is held with StockReservation rows tied to
+the Checkout Session id. Available-to-sell is stock minus active holds,
+summed by a subquery over a partial index of active holds, so checkouts
+never lock more than the products they buy. Holds expire with the session
+(and are reaped by ``manage.py expire_stock_reservations``), are released
+when Stripe reports the session expired, and are converted into the real
+decrement when the payment webhook arrives.
+"""
+import logging
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockReservation
+
+logger = logging.getLogger(__name__)
+
+StockDecrement = namedtuple('StockDecrement', ['product_id', 'quantity', 'decremented'])
+StockChange = namedtuple('StockChange', ['product', 'previous_stock', 'change'])
+StockShortage = namedtuple('StockShortage', ['product_id', 'name', 'requested', 'available'])
+
+# Stripe Checkout Sessions must expire between 30 minutes and 24 hours after Stripe
+# receives the request; the extra minute covers the API call and clock skew
+MIN_RESERVATION_TTL = 31 * 60
+MAX_RESERVATION_TTL = 24 * 60 * 60
+DEFAULT_REAP_BATCH_SIZE = 500
+
+class InsufficientStock(Exception):
+    """Raised when requested quantities exceed the stock available to sell"""
+    
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f"{shortage.name}: {shortage.requested} requested, {shortage.available} available"
+            for shortage in shortages
+        ))
+
+def _aggregate_lines(lines):
+    """Sum quantities per product (the same product may appear in several sizes)"""
+    quantities = OrderedDict()
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + int(quantity)
+    return quantities
+
+def decrement_stock(lines):
+    """
+    Atomically decrement stock for a set of order lines.
+    
+    Each product is decremented only if it has enough stock; products are
+    processed in id order inside one transaction to avoid lock-order
+    deadlocks between concurrent calls.
+    
+    Args:
+        lines: iterable of (product_id, quantity) pairs
+    
+    Returns:
+        list of StockDecrement(product_id, quantity, decremented), one per
+        input line, where decremented is False if the product did not have
+        enough stock (or no longer exists)
+    """
+    lines = [(product_id, int(quantity)) for product_id, quantity in lines]
+    quantities = _aggregate_lines(lines)
+    outcome = {}
+    now = timezone.now()
+    
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            quantity = quantities[product_id]
+            updated = Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+                stock=F('stock') - quantity,
+                # The CASE sees the pre-update stock, so this flips products
+                # that sell out with this decrement
+                available=Case(
+                    When(stock__lte=quantity, then=Value(False)),
+                    default=F('available'),
+                ),
+                updated_at=now,
+            )
+            outcome[product_id] = bool(updated)
+            if not updated:
+                logger.warning(f"Not enough stock to decrement product #{product_id} by {quantity}")
+        
+        if any(outcome.values()):
+            transaction.on_commit(stock_changed)
+    
+    return [
+        StockDecrement(product_id, quantity, outcome[product_id])
+        for product_id, quantity in lines
+    ]
+
+def stock_changed():
+    """
+    Invalidate data derived from stock levels after a bulk stock update.
+    
+    Queryset updates bypass model signals, so callers that change stock
+    with update() or bulk_update() schedule this with
+    ``transaction.on_commit(stock_changed)``.
+    """
+    from .signals import invalidate_catalogue_caches
+    invalidate_catalogue_caches()
+
+def parse_stock_levels(data, prefix='stock_'):
+    """
+    Extract {product_id: stock} from submitted form data.
+    
+    Fields look like ``stock_<product id>``; fields with a malformed id, a
+    non-integer value or a negative stock are skipped.
+    
+    Args:
+        data: QueryDict or mapping of submitted fields
+        prefix: Field name prefix
+        
+    Returns:
+        dict: Requested stock level per product id
+    """
+    levels = {}
+    for key, value in data.items():
+        if not key.startswith(prefix):
+            continue
+        try:
+            product_id = int(key[len(prefix):])
+            stock = int(value)
+        except (TypeError, ValueError):
+            continue
+        if stock >= 0:
+            levels[product_id] = stock
+    return levels
+
+def apply_stock_levels(levels, user=None, reason=StockMovement.REASON_BULK_UPDATE, batch_size=500):
+    """
+    Set absolute stock levels for many products in one transaction.
+    
+    Affected products are locked and fetched with one query, diffs are
+    computed in memory, and only changed products are written with a single
+    bulk_update (which also marks sold-out products unavailable, as
+    Product.save() does). One StockMovement is recorded per change.
+    
+    Args:
+        levels: dict of {product_id: new stock}; unknown ids are ignored
+        user: Optional user recorded on the audit rows
+        reason: StockMovement reason
+        batch_size: Rows per UPDATE/INSERT statement
+        
+    Returns:
+        list of StockChange(product, previous_stock, change) for changed products,
+        in product id order
+    """
+    if not levels:
+        return []
+    
+    now = timezone.now()
+    changes = []
+    
+    with transaction.atomic():
+        products = Product.objects.select_for_update().in_bulk(list(levels))
+        for product_id in sorted(products):
+            product = products[product_id]
+            new_stock = levels[product_id]
+            if product.stock == new_stock:
+                continue
+            changes.append(StockChange(product, product.stock, new_stock - product.stock))
+            product.stock = new_stock
+            # Only ever switch availability off automatically
+            if new_stock <= 0:
+                product.available = False
+            product.updated_at = now
+        
+        if changes:
+            Product.objects.bulk_update(
+                [change.product for change in changes],
+                ['stock', 'available', 'updated_at'],
+                batch_size=batch_size,
+            )
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    product=change.product,
+                    user=user,
+                    reason=reason,
+                    previous_stock=change.previous_stock,
+                    new_stock=change.product.stock,
+                    change=change.change,
+                )
+                for change in changes
+            ], batch_size=batch_size)
+            transaction.on_commit(stock_changed)
+    
+    return changes
+
+###################
+# Stock Reservations
+###################
+
+def get_reservation_ttl():
+    """How long checkout holds last (STOCK_RESERVATION_TTL, clamped to Stripe's session limits)"""
+    seconds = getattr(settings, 'STOCK_RESERVATION_TTL', MIN_RESERVATION_TTL)
+    return timedelta(seconds=max(MIN_RESERVATION_TTL, min(seconds, MAX_RESERVATION_TTL)))
+
+def get_reservation_expiry(now=None):
+    """
+    When checkout holds taken now lapse, for the Stripe session's expires_at.
+    
+    Rounded up to a whole second, since expires_at is a Unix timestamp and
+    truncating it would bring the expiry closer than the TTL.
+    """
+    expires_at = (now or timezone.now()) + get_reservation_ttl()
+    if expires_at.microsecond:
+        expires_at = expires_at.replace(microsecond=0) + timedelta(seconds=1)
+    return expires_at
+
+def with_available_to_sell(queryset, now=None):
+    """
+    Annotate products with ``held`` (active hold quantity) and
+    ``available_to_sell`` (stock minus holds) using a correlated subquery.
+    """
+    held = StockReservation.objects.active(now).filter(product=OuterRef('pk')).order_by().values(
+        'product'
+    ).annotate(total=Sum('quantity')).values('total')
+    return queryset.annotate(held=Coalesce(Subquery(held), 0)).annotate(
+        available_to_sell=F('stock') - F('held')
+    )
+
+def check_available(quantities, names=None, lock=False, now=None):
+    """
+    Compare requested quantities with available-to-sell stock in one query.
+    
+    Args:
+        quantities: dict of {product_id: requested quantity}
+        names: Optional {product_id: name} used for products that no longer exist
+        lock: Lock the product rows (SELECT ... FOR UPDATE); call inside a transaction
+        now: Time used to decide which holds have expired
+    
+    Returns:
+        list of StockShortage, empty if every quantity can be sold; unavailable
+        or deleted products count as having no stock
+    """
+    products = with_available_to_sell(Product.objects.filter(pk__in=list(quantities)), now).order_by('pk')
+    if lock:
+        products = products.select_for_update()
+    stock = {
+        pk: (name, level if available else 0)
+        for pk, name, level, available in products.values_list('pk', 'name', 'available_to_sell', 'available')
+    }
+    
+    names = names or {}
+    shortages = []
+    for product_id, requested in quantities.items():
+        name, level = stock.get(product_id, (names.get(product_id, f"Product #{product_id}"), 0))
+        level = max(level, 0)
+        if requested > level:
+            shortages.append(StockShortage(product_id, name, requested, level))
+    return shortages
+
+def reserve_stock(stripe_checkout_id, quantities, names=None, expires_at=None):
+    """
+    Hold stock for a checkout session, all or nothing.
+    
+    The products are locked, availability is re-checked against stock minus
+    other sessions' active holds, and one hold per product is inserted with
+    a single bulk_create.
+    
+    Args:
+        stripe_checkout_id: Stripe Checkout Session id the holds belong to
+        quantities: dict of {product_id: quantity}
+        names: Optional {product_id: name} for error messages
+        expires_at: When the holds lapse (default: get_reservation_expiry())
+    
+    Returns:
+        list of the created StockReservation objects
+    
+    Raises:
+        InsufficientStock: If any product cannot cover its quantity
+    """
+    now = timezone.now()
+    expires_at = expires_at or get_reservation_expiry(now)
+    quantities = {product_id: int(quantity) for product_id, quantity in quantities.items() if int(quantity) > 0}
+    
+    with transaction.atomic():
+        shortages = check_available(quantities, names=names, lock=True, now=now)
+        if shortages:
+            raise InsufficientStock(shortages)
+        return StockReservation.objects.bulk_create([
+            StockReservation(
+                product_id=product_id,
+                stripe_checkout_id=stripe_checkout_id,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for product_id, quantity in sorted(quantities.items())
+        ])
+
+def convert_reservations(stripe_checkout_id, lines):
+    """
+    Turn a paid session's holds into real stock decrements.
+    
+    The holds stop counting (status "converted") and the stock is
+    decremented in the same transaction. Holds that already expired are
+    converted too: the payment went through, so the stock is taken anyway
+    when there is enough of it.
+    
+    Args:
+        stripe_checkout_id: The paid Checkout Session id
+        lines: iterable of (product_id, quantity) pairs for the order
+    
+    Returns:
+        list of StockDecrement, as returned by decrement_stock()
+    """
+    with transaction.atomic():
+        StockReservation.objects.filter(stripe_checkout_id=stripe_checkout_id).exclude(
+            status=StockReservation.STATUS_CONVERTED
+        ).update(status=StockReservation.STATUS_CONVERTED)
+        return decrement_stock(lines)
+
+def release_reservations(stripe_checkout_id):
+    """
+    Release the active holds of an abandoned or expired checkout session.
+    
+    Returns:
+        int: Number of holds released
+    """
+    released = StockReservation.objects.filter(
+        stripe_checkout_id=stripe_checkout_id, status=StockReservation.STATUS_ACTIVE
+    ).update(status=StockReservation.STATUS_RELEASED)
+    if released:
+        logger.info(f"Released {released} stock reservations for {stripe_checkout_id}")
+    return released
+
+def expire_reservations(batch_size=DEFAULT_REAP_BATCH_SIZE, max_batches=None, now=None):
+    """
+    Mark lapsed active holds as expired, in batches.
+    
+    Expired holds already stop counting against stock through their
+    expires_at; reaping keeps the partial index of active holds small.
+    
+    Args:
+        batch_size: Holds updated per statement
+        max_batches: Optional limit on the number of batches
+        now: Cut-off time (default: now)
+    
+    Returns:
+        int: Number of holds expired
+    """
+    now = now or timezone.now()
+    batch_size = max(1, batch_size)
+    expired = batches = 0
+    
+    while max_batches is None or batches < max_batches:
+        ids = list(StockReservation.objects.filter(
+            status=StockReservation.STATUS_ACTIVE, expires_at__lte=now
+        ).order_by('expires_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        expired += StockReservation.objects.filter(
+            id__in=ids, status=StockReservation.STATUS_ACTIVE
+        ).update(status=StockReservation.STATUS_EXPIRED)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+    
+    if expired:
+        logger.info(f"Expired {expired} stock reservations")
+    return expired
@@ -0,0 +1,38 @@
+"""
+Management command to recompute the stored shipping class for products
+"""
+from django.core.management.base import BaseCommand
+from store.models import Product, SHIPPING_CLASS_LIVE
+
+class Command(BaseCommand):
+    help = 'Recompute Product.shipping_class from product and category names'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows written per bulk update (default: 500)'
+        )
+        parser.add_argument(
+            '--category',
+            help='Only recompute products in the category with this slug'
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['category']:
+            products = products.filter(category__slug=options['category'])
+        
+        self.stdout.write(f"Checking shipping class for {products.count()} products")
+        
+        updated = Product.objects.refresh_shipping_classes(
+            products, batch_size=max(1, options['batch_size'])
+        )
+        live_count = products.filter(shipping_class=SHIPPING_CLASS_LIVE).count()
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Updated {updated} products ({live_count} now use live animal shipping)'
+            )
+        )
@@ -0,0 +1,48 @@
+"""
+Management command to expire lapsed checkout stock holds
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from store.inventory import DEFAULT_REAP_BATCH_SIZE, expire_reservations
+
+class Command(BaseCommand):
+    help = 'Mark checkout stock reservations past their expiry as expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_REAP_BATCH_SIZE,
+            help=f'Reservations updated per statement (default: {DEFAULT_REAP_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches in a single pass'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep reaping instead of exiting after one pass'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Seconds to wait between passes when running with --loop (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_reservations(
+                batch_size=options['batch_size'], max_batches=options['max_batches']
+            )
+            if expired or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Expired {expired} stock reservations')
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -12,15 +12,13 @@ class Command(BaseCommand):
         
         self.stdout.write(f"Found {categories.count()} categories to fix")
         
-        for i, category in enumerate(categories):
-            old_order = category.order
-            new_order = (i + 1) * 10  # Set orders as 10, 20, 30, etc.
-            
-            category.order = new_order
-            category.save()
-            
+        # Set orders as 10, 20, 30, etc. with a single UPDATE
+        orders = {category.pk: (i + 1) * 10 for i, category in enumerate(categories)}
+        Category.objects.reorder(orders)
+        
+        for category in categories:
             self.stdout.write(
-                f"Updated '{category.name}': {old_order} -> {new_order}"
+                f"Updated '{category.name}': {category.order} -> {orders[category.pk]}"
             )
         
         self.stdout.write(
@@ -0,0 +1,93 @@
+"""
+Management command to backfill resized/WebP image renditions
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from store.models import Category, Product
+from store.renditions import generate_renditions, is_current
+
+MODELS = {'product': Product, 'category': Category}
+
+def _init_worker():
+    # Each worker process needs Django set up and its own DB connections
+    django.setup()
+    connections.close_all()
+
+def render_instance(model_name, pk, force=False):
+    """Generate renditions for one object (runs in a worker process)"""
+    instance = MODELS[model_name].objects.filter(pk=pk).first()
+    if instance is None:
+        return 0
+    return generate_renditions(instance, force=force)
+
+class Command(BaseCommand):
+    help = 'Generate responsive image renditions for existing product and category images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=['product', 'category', 'all'],
+            default='all',
+            help='Which images to process (default: all)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes; 0 renders in this process (default: CPU count)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate renditions that are already up to date'
+        )
+
+    def handle(self, *args, **options):
+        names = list(MODELS) if options['model'] == 'all' else [options['model']]
+        jobs = []
+        for name in names:
+            queryset = MODELS[name].objects.exclude(image='').exclude(image__isnull=True)
+            for obj in queryset.only('pk', 'image', 'image_renditions').iterator():
+                if options['force'] or not is_current(obj):
+                    jobs.append((name, obj.pk))
+
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('All image renditions are up to date'))
+            return
+
+        started = time.monotonic()
+        rendered = failed = 0
+        if options['workers'] <= 0:
+            for name, pk in jobs:
+                if render_instance(name, pk, options['force']):
+                    rendered += 1
+                else:
+                    failed += 1
+        else:
+            # Forked workers must not share the parent's DB connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                futures = {pool.submit(render_instance, name, pk, options['force']): (name, pk) for name, pk in jobs}
+                for future in as_completed(futures):
+                    name, pk = futures[future]
+                    try:
+                        widths = future.result()
+                    except Exception as e:
+                        widths = 0
+                        self.stderr.write(f'Failed to render {name} #{pk}: {str(e)}')
+                    if widths:
+                        rendered += 1
+                    else:
+                        failed += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rendered {rendered} images in {elapsed:.1f}s ({failed} failed or skipped)'
+            )
+        )
@@ -0,0 +1,79 @@
+"""
+Management command to bulk import categories and products from JSON Lines or CSV
+"""
+from django.core.management.base import BaseCommand, CommandError
+from store.catalogue import CHUNK_SIZE, CatalogueImporter, CatalogueImportError, file_format, iter_records, read_lines
+
+class Command(BaseCommand):
+    help = 'Import (insert or update) categories and products from a JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Catalogue file, e.g. store/fixtures/catalogue/aquarium.jsonl'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['jsonl', 'csv'],
+            default=None,
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Products written per bulk statement (default: {CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--create-categories',
+            action='store_true',
+            help='Create categories for unknown category slugs instead of skipping the product'
+        )
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Do not update the search index (run rebuild_search_index afterwards)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fmt = options['format'] or file_format(options['path'])
+        except CatalogueImportError as e:
+            raise CommandError(str(e))
+
+        verbosity = options['verbosity']
+
+        def progress(report):
+            if verbosity > 1:
+                self.stdout.write(
+                    f"{report.rows} rows, {report.created} created, {report.updated} updated "
+                    f"({report.rows_per_second:,.0f} rows/s)"
+                )
+
+        importer = CatalogueImporter(
+            chunk_size=options['chunk_size'],
+            create_categories=options['create_categories'],
+            index=not options['skip_index'],
+            progress=progress,
+        )
+        try:
+            with open(options['path'], 'rb') as file:
+                report = importer.run(iter_records(read_lines(file), fmt))
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {str(e)}")
+        except CatalogueImportError as e:
+            imported = importer.report.created + importer.report.updated
+            raise CommandError(f"{options['path']}: {str(e)} ({imported} products were imported before the error)")
+
+        for line, message in report.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... and {report.error_count - len(report.errors)} more errors')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {report.created + report.updated} products ({report.created} created, '
+                f'{report.updated} updated) and {report.categories} categories from {report.rows} rows '
+                f'in {report.elapsed:.2f}s ({report.rows_per_second:,.0f} rows/s, {report.error_count} errors)'
+            )
+        )
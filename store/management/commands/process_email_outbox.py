@@ -0,0 +1,50 @@
+"""
+Management command to deliver queued order emails from the outbox
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from store.outbox import DEFAULT_BATCH_SIZE, process_outbox
+
+class Command(BaseCommand):
+    help = 'Send queued order emails, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Emails sent per SMTP connection (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches in a single pass'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new emails instead of exiting when the outbox is empty'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when running with --loop (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        while True:
+            sent, failed = process_outbox(
+                batch_size=batch_size, max_batches=options['max_batches']
+            )
+            if sent or failed or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Sent {sent} emails ({failed} failed)')
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
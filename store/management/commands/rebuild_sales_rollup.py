@@ -0,0 +1,39 @@
+"""
+Management command to rebuild the daily sales rollup from the orders table
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from store.analytics import rebuild_daily_sales
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup used by the admin dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild from the month containing this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rollup rows written per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+        
+        started = time.monotonic()
+        count = rebuild_daily_sales(since=since, batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {count} daily rollup rows in {elapsed:.2f}s')
+        )
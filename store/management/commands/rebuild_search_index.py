@@ -0,0 +1,30 @@
+"""
+Management command to rebuild the product full-text search index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from store.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of products indexed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f"Rebuilding search index using {backend.__class__.__name__}")
+        
+        started = time.monotonic()
+        count = backend.rebuild(batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {count} products in {elapsed:.2f}s')
+        )
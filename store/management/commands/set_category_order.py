@@ -9,11 +9,12 @@ class Command(BaseCommand):
         
         self.stdout.write(f"Found {categories.count()} categories")
         
-        for i, category in enumerate(categories):
-            # Set order based on alphabetical order, starting from 1
-            category.order = (i + 1) * 10  # Use multiples of 10 to leave room for reordering
-            category.save()
-            self.stdout.write(f"Set {category.name} order to {category.order}")
+        # Set order based on alphabetical order, starting from 1
+        # Use multiples of 10 to leave room for reordering
+        orders = {category.pk: (i + 1) * 10 for i, category in enumerate(categories)}
+        Category.objects.reorder(orders)
+        for category in categories:
+            self.stdout.write(f"Set {category.name} order to {orders[category.pk]}")
         
         self.stdout.write(self.style.SUCCESS(f'Successfully set order values for {categories.count()} categories'))
         self.stdout.write("Categories are now ordered and ready for reordering in the admin interface!")
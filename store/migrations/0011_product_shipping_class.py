@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+# The classification rules as they were when this migration was written,
+# copied so later changes to store.models do not alter this migration
+LIVE_ANIMAL_TERMS = [
+    'shrimp', 'cherry shrimp', 'ghost shrimp', 'amano shrimp',
+    'crystal shrimp', 'bee shrimp', 'blue shrimp', 'red shrimp',
+    'dwarf shrimp', 'freshwater shrimp', 'aquarium shrimp',
+    'live shrimp', 'breeding shrimp',
+    'fish', 'tetra', 'guppy', 'molly', 'platy', 'angelfish',
+    'barb', 'danio', 'rasbora', 'corydoras', 'pleco',
+    'live fish', 'tropical fish', 'freshwater fish',
+    'snails', 'live snails', 'nerite snail', 'mystery snail',
+    'crab', 'crayfish', 'live aquatic animals', 'livestock'
+]
+FOOD_TERMS = ['food', 'flake', 'pellet', 'frozen', 'dried', 'treat']
+
+
+def classify_shipping_class(product_name, category_name=''):
+    text = f"{product_name or ''} {category_name or ''}".lower()
+    if 'live' in text:
+        return 'live'
+    if any(term in text for term in LIVE_ANIMAL_TERMS) and not any(term in text for term in FOOD_TERMS):
+        return 'live'
+    return 'standard'
+
+
+def populate_shipping_class(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    live_ids = [
+        product_id
+        for product_id, name, category_name in Product.objects.values_list('id', 'name', 'category__name')
+        if classify_shipping_class(name, category_name) == 'live'
+    ]
+    Product.objects.filter(id__in=live_ids).update(shipping_class='live')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_rename_prod_cat_avail_idx_store_produ_categor_b49ff2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='shipping_class',
+            field=models.CharField(choices=[('standard', 'Standard'), ('live', 'Live animal')], db_index=True, default='standard', editable=False, help_text='Computed from the product and category names when saved', max_length=20),
+        ),
+        migrations.RunPython(populate_shipping_class, migrations.RunPython.noop),
+    ]
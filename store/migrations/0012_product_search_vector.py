@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:46
+
+import django.contrib.postgres.search
+import store.models
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE store_product SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts "
+            "USING fts5(name, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO store_product_fts (rowid, name, description) "
+            "SELECT id, name, coalesce(description, '') FROM store_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS store_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_product_shipping_class'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=store.models.SearchVectorIndex(fields=['search_vector'], name='prod_search_vector_gin'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_stock_movement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('adjustment', 'Manual adjustment'), ('bulk_update', 'Bulk stock update'), ('import', 'Spreadsheet import')], default='adjustment', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_order_search_indexes(apps, schema_editor):
+    # Trigram indexes on the expressions Django's icontains/istartswith use
+    # (UPPER(col::text) LIKE UPPER(%s)); other databases fall back to scans
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS order_email_trgm "
+        "ON store_order USING gin ((UPPER(email::text)) gin_trgm_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS order_ship_name_trgm "
+        "ON store_order USING gin ((UPPER(shipping_name::text)) gin_trgm_ops)"
+    )
+
+
+def drop_order_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS order_email_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS order_ship_name_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_order_search_indexes, drop_order_search_indexes),
+    ]
@@ -1,47 +1,174 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator, MinValueValidator, RegexValidator
 from django.utils.text import slugify
-from django.db.models import Sum, F
+from django.db.models import Case, F, Sum, Value, When
 from django.urls import reverse
+from django.utils import timezone
 from decimal import Decimal
+from collections import namedtuple
+import re
 import uuid
 
-# Function to generate unique slug
-def generate_unique_slug(instance, max_length=255):
-    """Generate a unique slug for the product name"""
-    base_slug = slugify(instance.name)
+###################
+# SLUGS
+###################
+
+SLUG_SUFFIX_ROOM = 10  # Characters kept free for a "-<n>" suffix
+SLUG_PREFIX_BATCH_SIZE = 200  # Base slugs looked up per query
+SLUG_SAVE_ATTEMPTS = 3
+
+def _base_slug(name, max_length):
+    base_slug = slugify(name or '')[:max_length - SLUG_SUFFIX_ROOM].strip('-')
+    return base_slug or uuid.uuid4().hex[:8]
+
+class SlugAllocator:
+    """
+    Hands out unique slugs for a model.
     
-    # Truncate base slug if too long, leaving room for counter
-    if len(base_slug) > max_length - 10:
-        base_slug = base_slug[:max_length - 10]
+    Every existing slug sharing a base is read the first time the base is
+    seen (one query per SLUG_PREFIX_BATCH_SIZE new bases) and suffixes are
+    then picked in memory, so a thousand "Cherry Shrimp" grades cost one
+    query rather than one query per candidate. Slugs handed out or reserved
+    count as taken for the allocator's lifetime, so one allocator can serve
+    several batches without re-reading prefixes.
+    """
     
-    slug = base_slug
-    counter = 1
+    def __init__(self, model_class, max_length=None, exclude_pk=None):
+        """
+        Args:
+            model_class: Model with a unique slug field
+            max_length: Slug length limit (default: the slug field's max_length)
+            exclude_pk: Ignore this object's own slug (when renaming it)
+        """
+        self.model_class = model_class
+        self.max_length = max_length or model_class._meta.get_field('slug').max_length
+        self.exclude_pk = exclude_pk
+        self.taken = set()
+        self._loaded = set()
+        self._next_suffix = {}
     
-    # Get the model class
-    model_class = instance.__class__
+    def reserve(self, slugs):
+        """Treat slugs as taken, e.g. explicit slugs in an import not saved yet"""
+        self.taken.update(slugs)
     
-    # Handle updating existing products correctly
-    while True:
-        if instance.pk:
-            query = model_class.objects.filter(slug=slug).exclude(pk=instance.pk)
-        else:
-            query = model_class.objects.filter(slug=slug)
-        
-        if not query.exists():
-            break
-            
-        slug = f"{base_slug}-{counter}"
-        counter += 1
+    def _load(self, bases):
+        new = [base_slug for base_slug in dict.fromkeys(bases) if base_slug not in self._loaded]
+        for start in range(0, len(new), SLUG_PREFIX_BATCH_SIZE):
+            match = models.Q()
+            for base_slug in new[start:start + SLUG_PREFIX_BATCH_SIZE]:
+                match |= models.Q(slug=base_slug) | models.Q(slug__startswith=f"{base_slug}-")
+            query = self.model_class._default_manager.filter(match)
+            if self.exclude_pk is not None:
+                query = query.exclude(pk=self.exclude_pk)
+            self.taken.update(query.values_list('slug', flat=True))
+        self._loaded.update(new)
+    
+    def allocate(self, names):
+        """
+        Allocate a unique slug for each name.
         
-        # Safety check to prevent infinite loops
-        if counter > 9999:
-            import uuid
-            slug = f"{base_slug}-{uuid.uuid4().hex[:6]}"
-            break
+        Returns:
+            list: One slug per name ("base", "base-1", "base-2", ...)
+        """
+        bases = [_base_slug(name, self.max_length) for name in names]
+        self._load(bases)
+        
+        slugs = []
+        for base_slug in bases:
+            slug = base_slug
+            if slug in self.taken:
+                counter = self._next_suffix.get(base_slug, 1)
+                while f"{base_slug}-{counter}" in self.taken:
+                    counter += 1
+                slug = f"{base_slug}-{counter}"
+                self._next_suffix[base_slug] = counter + 1
+            self.taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+def allocate_slugs(model_class, names, max_length=None, exclude_pk=None, reserved=()):
+    """
+    Allocate unique slugs for a batch of names (see SlugAllocator).
+    
+    Args:
+        model_class: Model with a unique slug field
+        names: Names to slugify, in order
+        max_length: Slug length limit (default: the slug field's max_length)
+        exclude_pk: Ignore this object's own slug (when renaming it)
+        reserved: Further slugs to avoid
     
-    return slug
+    Returns:
+        list: One slug per name
+    """
+    allocator = SlugAllocator(model_class, max_length=max_length, exclude_pk=exclude_pk)
+    allocator.reserve(reserved)
+    return allocator.allocate(names)
+
+def generate_unique_slug(instance, max_length=None):
+    """Generate a unique slug for the instance's name (one query)"""
+    return allocate_slugs(type(instance), [instance.name], max_length=max_length, exclude_pk=instance.pk)[0]
+
+def save_with_unique_slug(instance, save):
+    """
+    Run save() for an instance whose slug was just generated.
+    
+    Two concurrent inserts can allocate the same slug; the loser's insert
+    fails on the unique constraint, so the slug is re-allocated and the
+    save retried (inside a savepoint, so the caller's transaction survives).
+    """
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            slug_taken = type(instance)._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not slug_taken or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                raise
+            instance.slug = generate_unique_slug(instance)
+
+CategoryReorder = namedtuple('CategoryReorder', ['updated', 'unchanged', 'missing'])
+
+class CategoryManager(models.Manager):
+    """Custom manager for Category model"""
+    
+    def reorder(self, orders):
+        """
+        Apply new display orders to many categories at once.
+        
+        The ids are checked with one query and every changed category is
+        updated with a single CASE WHEN statement. Model signals are not
+        sent, so the category caches are invalidated once on commit.
+        
+        Args:
+            orders: Mapping of {category_id: order}
+        
+        Returns:
+            CategoryReorder(updated, unchanged, missing), where missing lists
+            ids that do not exist
+        """
+        current = dict(self.filter(pk__in=list(orders)).order_by().values_list('pk', 'order'))
+        missing = [pk for pk in orders if pk not in current]
+        changed = {pk: order for pk, order in orders.items() if pk in current and current[pk] != order}
+        
+        if changed:
+            self.filter(pk__in=list(changed)).update(
+                order=Case(
+                    *[When(pk=pk, then=Value(order)) for pk, order in changed.items()],
+                    output_field=models.PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            transaction.on_commit(_categories_changed)
+        
+        return CategoryReorder(len(changed), len(current) - len(changed), missing)
+
+def _categories_changed():
+    # Queryset updates bypass model signals, so invalidate derived data here
+    from .signals import invalidate_category_data
+    invalidate_category_data()
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -53,6 +180,12 @@ class Category(models.Model):
         null=True,
         help_text="Category image for display on the website"
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized/WebP copies of the image (see store.renditions)"
+    )
     order = models.PositiveIntegerField(
         default=0,
         help_text="Order for displaying categories (lower numbers appear first)"
@@ -60,6 +193,8 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CategoryManager()
+    
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['order', 'name']
@@ -79,21 +214,27 @@ class Category(models.Model):
         return 10
     
     def clean(self):
-        """Validate the category model"""
+        """
+        Validate the category model.
+        
+        Only fields that changed since the category was loaded are checked,
+        so saving a reorder does not re-validate the image or re-query for
+        duplicate names.
+        """
         from django.core.exceptions import ValidationError
+        from .uploads import is_new_upload, validate_image_upload
         
-        # Validate image file if provided
-        if self.image:
-            # Check file size (max 5MB)
-            if hasattr(self.image, 'size') and self.image.size > 5 * 1024 * 1024:
-                raise ValidationError({'image': 'Image file too large. Maximum size is 5MB.'})
-            
-            # Check file extension
-            if hasattr(self.image, 'name'):
-                valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-                file_extension = self.image.name.lower().split('.')[-1]
-                if f'.{file_extension}' not in valid_extensions:
-                    raise ValidationError({'image': f'Invalid image format. Allowed formats: {", ".join(valid_extensions)}'})
+        changed = self.changed_fields()
+        
+        # Validate a newly uploaded image (already-stored images passed before)
+        if is_new_upload(self.image):
+            try:
+                validate_image_upload(self.image)
+            except ValidationError as e:
+                raise ValidationError({'image': e.messages})
+        
+        if changed is not None and 'name' not in changed:
+            return
         
         # Validate name
         if not self.name or not self.name.strip():
@@ -108,7 +249,41 @@ class Category(models.Model):
         if existing:
             raise ValidationError({'name': 'A category with this name already exists.'})
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so save() can tell which fields changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def _field_value(self, field):
+        value = getattr(self, field.attname)
+        return value.name if field.name == 'image' else value
+    
+    def changed_fields(self):
+        """
+        Names of fields changed since the category was loaded or saved.
+        
+        Returns None for a category that has not been loaded from the
+        database (every field counts as changed).
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self.pk is None or loaded is None:
+            return None
+        
+        changed = set()
+        for field in self._meta.concrete_fields:
+            if field.attname not in loaded:
+                continue  # Deferred when loaded, not assigned since
+            if self._field_value(field) != loaded[field.attname]:
+                changed.add(field.name)
+        if getattr(self.image, '_committed', True) is False:
+            changed.add('image')
+        return changed
+    
     def save(self, *args, **kwargs):
+        from .uploads import save_image_field
+        
         # Strip whitespace from name
         self.name = self.name.strip() if self.name else ''
         
@@ -117,13 +292,35 @@ class Category(models.Model):
             self.order = self.get_next_order()
         
         # Generate slug before validation
-        if not self.slug:
+        slug_generated = not self.slug
+        if slug_generated:
             self.slug = generate_unique_slug(self)
         
-        # Always run clean() before saving
-        self.full_clean()
+        # Validate before saving, skipping fields that have not changed
+        changed = self.changed_fields()
+        if changed is None:
+            self.full_clean()
+        elif changed:
+            self.full_clean(exclude=[
+                field.name for field in self._meta.concrete_fields if field.name not in changed
+            ])
         
-        super().save(*args, **kwargs)
+        name_changed = changed is not None and 'name' in changed
+        
+        # Store a new image under its content hash, reusing identical files
+        save_image_field(self, 'image', 'categories/')
+        
+        if slug_generated:
+            save_with_unique_slug(self, lambda: super(Category, self).save(*args, **kwargs))
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self._field_value(field) for field in self._meta.concrete_fields
+        }
+        
+        # Product shipping classes depend on the category name
+        if name_changed:
+            Product.objects.refresh_shipping_classes(self.products.all())
     
 # Define constant choices at module level
 SIZE_CHOICES = [
@@ -132,6 +329,62 @@ SIZE_CHOICES = [
     ('large', 'Large'),
 ]
 
+SHIPPING_CLASS_STANDARD = 'standard'
+SHIPPING_CLASS_LIVE = 'live'
+SHIPPING_CLASS_CHOICES = [
+    (SHIPPING_CLASS_STANDARD, 'Standard'),
+    (SHIPPING_CLASS_LIVE, 'Live animal'),
+]
+
+# Live aquarium animals that need special temperature-controlled shipping
+LIVE_ANIMAL_TERMS = [
+    'shrimp', 'cherry shrimp', 'ghost shrimp', 'amano shrimp',
+    'crystal shrimp', 'bee shrimp', 'blue shrimp', 'red shrimp',
+    'dwarf shrimp', 'freshwater shrimp', 'aquarium shrimp',
+    'live shrimp', 'breeding shrimp',
+    'fish', 'tetra', 'guppy', 'molly', 'platy', 'angelfish',
+    'barb', 'danio', 'rasbora', 'corydoras', 'pleco',
+    'live fish', 'tropical fish', 'freshwater fish',
+    'snails', 'live snails', 'nerite snail', 'mystery snail',
+    'crab', 'crayfish', 'live aquatic animals', 'livestock'
+]
+
+# Food items that might contain live animal terms (e.g. "shrimp pellets")
+FOOD_TERMS = ['food', 'flake', 'pellet', 'frozen', 'dried', 'treat']
+
+_LIVE_ANIMAL_RE = re.compile('|'.join(re.escape(term) for term in LIVE_ANIMAL_TERMS))
+_FOOD_RE = re.compile('|'.join(re.escape(term) for term in FOOD_TERMS))
+
+def classify_shipping_class(product_name, category_name=''):
+    """
+    Work out the shipping class for a product from its name and category name.
+    
+    Live aquarium animals (shrimp, fish, snails...) need temperature controlled
+    shipping unless the text marks the product as food; anything mentioning
+    "live" is always treated as a live animal.
+    """
+    text = f"{product_name or ''} {category_name or ''}".lower()
+    
+    if 'live' in text:
+        return SHIPPING_CLASS_LIVE
+    if _LIVE_ANIMAL_RE.search(text) and not _FOOD_RE.search(text):
+        return SHIPPING_CLASS_LIVE
+    return SHIPPING_CLASS_STANDARD
+
+class SearchVectorIndex(GinIndex):
+    """
+    GIN index for a SearchVectorField on PostgreSQL.
+    
+    Other databases (SQLite in development) have no GIN indexes and search
+    through their own backend (see store.search), so they get a plain index
+    of the same name and the schema stays the same everywhere.
+    """
+    
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
 class ProductManager(models.Manager):
     """Custom manager for Product model with common queries"""
     
@@ -154,6 +407,31 @@ class ProductManager(models.Manager):
     def by_category(self, category):
         """Return products in a specific category"""
         return self.filter(category=category, available=True)
+    
+    def refresh_shipping_classes(self, queryset=None, batch_size=500):
+        """
+        Recompute the stored shipping class for products.
+        
+        Only rows whose class actually changes are written, using bulk_update.
+        Returns the number of products updated.
+        """
+        if queryset is None:
+            queryset = self.all()
+        
+        rows = queryset.select_related('category').only(
+            'id', 'name', 'shipping_class', 'category__name'
+        ).order_by().iterator(chunk_size=2000)
+        
+        changed = []
+        for product in rows:
+            shipping_class = classify_shipping_class(product.name, product.category.name)
+            if product.shipping_class != shipping_class:
+                product.shipping_class = shipping_class
+                changed.append(product)
+        
+        if changed:
+            self.bulk_update(changed, ['shipping_class'], batch_size=batch_size)
+        return len(changed)
 
 class Product(models.Model):
     """
@@ -178,9 +456,25 @@ class Product(models.Model):
         null=True,
         validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])]
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized/WebP copies of the image (see store.renditions)"
+    )
     stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     available = models.BooleanField(default=True, db_index=True)
     featured = models.BooleanField(default=False, help_text="Feature this product on the homepage")
+    shipping_class = models.CharField(
+        max_length=20,
+        choices=SHIPPING_CLASS_CHOICES,
+        default=SHIPPING_CLASS_STANDARD,
+        db_index=True,
+        editable=False,
+        help_text="Computed from the product and category names when saved"
+    )
+    # Full-text index column, only populated on PostgreSQL (see store.search)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -196,14 +490,17 @@ class Product(models.Model):
             models.Index(fields=['category', 'available']),  # For category filtering on available products
             models.Index(fields=['price', 'available'], name='prod_price_avail_idx'),
             models.Index(fields=['featured', 'available'], name='prod_feat_avail_idx'),
+            models.Index(fields=['stock', 'name', 'id'], name='prod_stock_name_id_idx'),  # Keyset pagination
             models.Index(fields=['size', 'category'], name='prod_size_cat_idx'),
+            SearchVectorIndex(fields=['search_vector'], name='prod_search_vector_gin'),  # Full-text search
         ]
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
 
     def save(self, *args, **kwargs):
         # Generate slug if not provided
-        if not self.slug:
+        slug_generated = not self.slug
+        if slug_generated:
             self.slug = generate_unique_slug(self)
 
         # FIX: Re-enable automatic availability setting based on stock
@@ -211,7 +508,17 @@ class Product(models.Model):
         if self.stock <= 0:
             self.available = False
 
-        super().save(*args, **kwargs)
+        # Precompute the shipping class so carts never scan product text
+        category_name = self.category.name if self.category_id else ''
+        self.shipping_class = classify_shipping_class(self.name, category_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'category'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'shipping_class'}
+
+        if slug_generated:
+            save_with_unique_slug(self, lambda: super(Product, self).save(*args, **kwargs))
+        else:
+            super().save(*args, **kwargs)
     
     def clean(self):
         """Validate product data"""
@@ -276,39 +583,11 @@ class Product(models.Model):
         Aquarium Shop Context:
         - LIVE aquarium shrimp and fish need special shipping (£12) - temperature controlled, expedited
         - Food (frozen/dry), equipment, decorations use standard shipping (£6)
-        """
-        # Live aquarium animals that need special temperature-controlled shipping
-        live_animal_terms = [
-            'shrimp', 'cherry shrimp', 'ghost shrimp', 'amano shrimp',
-            'crystal shrimp', 'bee shrimp', 'blue shrimp', 'red shrimp',
-            'dwarf shrimp', 'freshwater shrimp', 'aquarium shrimp',
-            'live shrimp', 'breeding shrimp',
-            'fish', 'tetra', 'guppy', 'molly', 'platy', 'angelfish',
-            'barb', 'danio', 'rasbora', 'corydoras', 'pleco',
-            'live fish', 'tropical fish', 'freshwater fish',
-            'snails', 'live snails', 'nerite snail', 'mystery snail',
-            'crab', 'crayfish', 'live aquatic animals', 'livestock'
-        ]
-        
-        product_name_lower = self.name.lower()
-        category_name_lower = self.category.name.lower() if self.category else ''
-        combined_text = product_name_lower + ' ' + category_name_lower
-        
-        # Check for live animals (these need special shipping)
-        for term in live_animal_terms:
-            if term in combined_text:
-                # But exclude food items that might contain these terms
-                food_indicators = ['food', 'flake', 'pellet', 'frozen', 'dried', 'treat']
-                is_food = any(food_term in combined_text for food_term in food_indicators)
-                if not is_food:
-                    return True
-        
-        # Special case: specifically check for "live" animals
-        if 'live' in combined_text:
-            # This is likely a live animal
-            return True
         
-        return False
+        The class is computed by classify_shipping_class() when the product or
+        its category is saved, so this only reads the stored column.
+        """
+        return self.shipping_class == SHIPPING_CLASS_LIVE
 
 class Order(models.Model):
     """
@@ -321,6 +600,8 @@ class Order(models.Model):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     ]
+    # Statuses that count as a completed sale in the sales rollup
+    SALE_STATUSES = ('paid', 'shipped', 'delivered')
 
     user = models.ForeignKey(User, related_name='orders', on_delete=models.CASCADE, null=True, blank=True)
     stripe_checkout_id = models.CharField(max_length=255, unique=True, db_index=True)
@@ -364,10 +645,18 @@ class Order(models.Model):
             models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
             models.Index(fields=['user', 'status'], name='order_user_status_idx'),
             models.Index(fields=['email', 'status'], name='order_email_status_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),  # Keyset pagination
         ]
 
     def __str__(self):
         return f"Order {self.order_reference or self.id} - {self.email} ({self.get_status_display()})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so the sales rollup can detect transitions
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
         
     def save(self, *args, **kwargs):
         # Generate order reference if not set
@@ -500,4 +789,226 @@ class OrderItem(models.Model):
     
     @property
     def subtotal(self):
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+class OutboundEmail(models.Model):
+    """
+    Email queued for background delivery (transactional outbox).
+    
+    Order emails are queued here instead of being rendered and sent inside
+    the Stripe webhook request; the process_email_outbox worker renders and
+    delivers them, retrying with backoff and dead-lettering after too many
+    failures.
+    """
+    KIND_ORDER_CONFIRMATION = 'order_confirmation'
+    KIND_ORDER_NOTIFICATION = 'order_notification'
+    KIND_CHOICES = [
+        (KIND_ORDER_CONFIRMATION, 'Order confirmation (customer)'),
+        (KIND_ORDER_NOTIFICATION, 'Order notification (admin)'),
+    ]
+    
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead letter'),
+    ]
+    
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    order = models.ForeignKey(Order, related_name='outbound_emails', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} for Order {self.order_id} ({self.get_status_display()})"
+
+
+class WebhookEventManager(models.Manager):
+    """Manager for the processed webhook event ledger"""
+    
+    def is_processed(self, event_id):
+        """Cheap duplicate check (one lookup on the unique event_id index)"""
+        return self.filter(event_id=event_id).exists()
+    
+    def claim(self, event_id, event_type=''):
+        """
+        Record an event as processed, unless another request already did.
+        
+        Call inside the transaction that applies the event, so the claim is
+        rolled back with it if processing fails and the retry can run again.
+        
+        Args:
+            event_id: Provider event id (e.g. Stripe's evt_...)
+            event_type: Event type, for reference in the admin
+            
+        Returns:
+            bool: True if this call claimed the event, False for a duplicate
+        """
+        try:
+            with transaction.atomic():
+                self.create(event_id=event_id, event_type=event_type)
+        except IntegrityError:
+            return False
+        return True
+
+
+class WebhookEvent(models.Model):
+    """Ledger of Stripe webhook events that have been processed"""
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100, blank=True)
+    processed_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = WebhookEventManager()
+    
+    class Meta:
+        ordering = ['-processed_at']
+        verbose_name = 'Webhook Event'
+        verbose_name_plural = 'Webhook Events'
+    
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Per-day sales totals, maintained incrementally as orders become paid.
+    
+    Orders are bucketed by the local date they were placed. ``customers``
+    counts each customer once per calendar month, on the day of their first
+    sale that month, so summing a month's rows gives its distinct customers.
+    """
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    customers = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Sales Rollup'
+        verbose_name_plural = 'Daily Sales Rollups'
+    
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders, £{self.revenue}"
+
+
+class StockMovement(models.Model):
+    """Audit trail entry for a manual change to a product's stock level"""
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_BULK_UPDATE = 'bulk_update'
+    REASON_IMPORT = 'import'
+    REASON_CHOICES = [
+        (REASON_ADJUSTMENT, 'Manual adjustment'),
+        (REASON_BULK_UPDATE, 'Bulk stock update'),
+        (REASON_IMPORT, 'Spreadsheet import'),
+    ]
+    
+    product = models.ForeignKey(Product, related_name='stock_movements', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='stock_movements', on_delete=models.SET_NULL,
+                             null=True, blank=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default=REASON_ADJUSTMENT)
+    previous_stock = models.IntegerField()
+    new_stock = models.IntegerField()
+    change = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Stock Movement'
+        verbose_name_plural = 'Stock Movements'
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stockmove_product_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.previous_stock} -> {self.new_stock} ({self.get_reason_display()})"
+
+class StockReservationManager(models.Manager):
+    """Manager for checkout stock holds"""
+    
+    def active(self, now=None):
+        """Holds that still count against stock (active and not yet expired)"""
+        return self.filter(status=StockReservation.STATUS_ACTIVE, expires_at__gt=now or timezone.now())
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a Stripe Checkout Session until it is paid or expires.
+    
+    Available-to-sell stock is a product's stock minus its active holds.
+    Holds become real decrements when the payment webhook arrives.
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_CONVERTED = 'converted'
+    STATUS_RELEASED = 'released'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_CONVERTED, 'Converted to sale'),
+        (STATUS_RELEASED, 'Released'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+    
+    product = models.ForeignKey(Product, related_name='reservations', on_delete=models.CASCADE)
+    stripe_checkout_id = models.CharField(max_length=255, db_index=True)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = StockReservationManager()
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        indexes = [
+            # Only active holds are summed or reaped, so index just those rows
+            models.Index(fields=['product', 'expires_at'], name='stockres_active_idx',
+                         condition=models.Q(status='active')),
+            models.Index(fields=['expires_at'], name='stockres_reap_idx',
+                         condition=models.Q(status='active')),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity}x product {self.product_id} for {self.stripe_checkout_id} ({self.get_status_display()})"
+
+
+class CartLine(models.Model):
+    """A line in a signed-in customer's persisted cart (used when CART_STORAGE = 'database')"""
+    user = models.ForeignKey(User, related_name='cart_lines', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='cart_lines', on_delete=models.CASCADE)
+    # '' rather than NULL for "no size", so the unique constraint covers sizeless lines
+    size = models.CharField(max_length=20, blank=True, default='')
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)  # Price when added to the cart
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Cart Line'
+        verbose_name_plural = 'Cart Lines'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product', 'size'], name='unique_cart_line'),
+        ]
+    
+    def __str__(self):
+        size_str = f" ({self.size})" if self.size else ""
+        return f"{self.quantity}x {self.product_id}{size_str} for user {self.user_id}"
@@ -0,0 +1,78 @@
+"""
+Order search planner for the order management page.
+
+Rather than OR-ing ``icontains`` over every column (plus ``id__icontains``,
+which casts the primary key to text), the planner looks at the shape of the
+query and picks the cheapest indexed lookup:
+
+* ``SSS-...`` order references use a prefix match on order_reference
+* all-digit queries use a primary-key lookup (or a reference prefix)
+* queries containing ``@`` search the email column only
+* anything else searches email and shipping name
+
+On PostgreSQL, reference prefixes use the varchar_pattern_ops index Django
+creates for the unique order_reference column, and migration 0019 adds
+pg_trgm GIN indexes on UPPER(email) and UPPER(shipping_name), which serve
+Django's case-insensitive ``icontains``/``istartswith`` lookups.
+"""
+import re
+from collections import namedtuple
+
+from django.db.models import Q
+
+ORDER_REFERENCE_PREFIX = 'SSS-'
+MAX_QUERY_LENGTH = 100
+# Trigram indexes need at least 3 characters to narrow a search
+MIN_CONTAINS_LENGTH = 3
+
+_REFERENCE_RE = re.compile(r'^SSS-[A-Z0-9-]*$', re.IGNORECASE)
+_DIGITS_RE = re.compile(r'^\d+$')
+
+OrderSearchPlan = namedtuple('OrderSearchPlan', ['strategy', 'condition'])
+
+def plan_order_search(query):
+    """
+    Choose the lookup for an order search query.
+    
+    Args:
+        query: Raw search text from the user
+    
+    Returns:
+        OrderSearchPlan(strategy, condition), where condition is a Q to
+        filter orders with, or None when the query is blank
+    """
+    query = (query or '').strip()[:MAX_QUERY_LENGTH]
+    if not query:
+        return OrderSearchPlan('none', None)
+    
+    if _REFERENCE_RE.match(query):
+        # References are stored upper-case, so a case-sensitive prefix can use the index
+        return OrderSearchPlan('reference', Q(order_reference__startswith=query.upper()))
+    
+    if _DIGITS_RE.match(query):
+        # An order number, or the start of a reference typed without "SSS-"
+        condition = Q(order_reference__startswith=f'{ORDER_REFERENCE_PREFIX}{query}')
+        if len(query) <= 18:  # Fits in a bigint
+            condition |= Q(pk=int(query))
+        return OrderSearchPlan('id', condition)
+    
+    if '@' in query:
+        return OrderSearchPlan('email', Q(email__icontains=query))
+    
+    if len(query) < MIN_CONTAINS_LENGTH:
+        # Too short for a trigram index; prefix matches stay cheap
+        return OrderSearchPlan('text_prefix', Q(email__istartswith=query) | Q(shipping_name__istartswith=query))
+    
+    return OrderSearchPlan('text', Q(email__icontains=query) | Q(shipping_name__icontains=query))
+
+def search_orders(queryset, query):
+    """
+    Filter an order queryset by a search query using plan_order_search().
+    
+    Returns:
+        QuerySet: The filtered orders
+    """
+    plan = plan_order_search(query)
+    if plan.condition is None:
+        return queryset
+    return queryset.filter(plan.condition)
@@ -0,0 +1,135 @@
+"""
+Order builder service used by checkout (and reusable by any future API).
+
+Checkout used to validate stock line by line, insert the order and then one
+OrderItem per cart line. The builder instead:
+
+* validates available-to-sell stock (stock minus other checkouts' holds)
+  for every line with a single query
+* when the order is written, locks the products, re-validates and holds
+  the stock for the Stripe Checkout Session (see inventory.reserve_stock)
+* inserts the order once, with its total already computed from the lines,
+  so Order.save() never has to re-aggregate its items
+* inserts every OrderItem with one bulk_create
+"""
+import logging
+from collections import OrderedDict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+
+from .inventory import check_available, reserve_stock
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+OrderLine = namedtuple('OrderLine', ['product', 'quantity', 'price', 'size'])
+
+class OrderBuilder:
+    """
+    Build an order from a set of lines.
+    
+    Usage:
+        builder = OrderBuilder.from_cart(cart, email, user)
+        shortages = builder.check_stock()          # Cheap pre-check, no locks
+        order = builder.create(stripe_checkout_id)  # Holds stock under lock, inserts
+    """
+    
+    def __init__(self, lines, email, user=None, shipping_cost=Decimal('0.00')):
+        """
+        Args:
+            lines: Iterable of OrderLine(product, quantity, price, size)
+            email: Customer email address
+            user: Optional authenticated user placing the order
+            shipping_cost: Shipping charge added to the order total
+        """
+        self.lines = [
+            OrderLine(line.product, int(line.quantity), Decimal(line.price), line.size or None)
+            for line in lines
+        ]
+        self.email = email
+        self.user = user if user is not None and user.is_authenticated else None
+        self.shipping_cost = Decimal(shipping_cost)
+    
+    @classmethod
+    def from_cart(cls, cart, email, user=None):
+        """Create a builder for the contents of a Cart"""
+        lines = [
+            OrderLine(item.product, item.quantity, item.price, item.size)
+            for item in cart.get_cart_items()
+        ]
+        return cls(lines, email, user=user, shipping_cost=cart.get_shipping_cost())
+    
+    @property
+    def subtotal(self):
+        return sum((line.price * line.quantity for line in self.lines), Decimal('0.00'))
+    
+    @property
+    def total(self):
+        return self.subtotal + self.shipping_cost
+    
+    def quantities(self):
+        """Requested quantity per product id (a product may appear in several sizes)"""
+        quantities = OrderedDict()
+        for line in self.lines:
+            quantities[line.product.pk] = quantities.get(line.product.pk, 0) + line.quantity
+        return quantities
+    
+    def check_stock(self):
+        """
+        Compare requested quantities with available-to-sell stock using one query.
+        
+        Returns:
+            list of StockShortage, empty if every line can be fulfilled
+        """
+        return check_available(self.quantities(), names=self.names())
+    
+    def names(self):
+        return {line.product.pk: line.product.name for line in self.lines}
+    
+    def create(self, stripe_checkout_id, status='pending', reservation_expires_at=None, **fields):
+        """
+        Hold the stock and insert the order with all its items.
+        
+        Args:
+            stripe_checkout_id: Stripe Checkout Session id for the order
+            status: Initial order status
+            reservation_expires_at: When the stock holds lapse (normally the
+                Stripe session's expires_at); defaults to the reservation TTL
+            **fields: Any other Order fields (shipping details, notes, ...)
+        
+        Returns:
+            Order: The created order
+        
+        Raises:
+            InsufficientStock: If any line exceeds the stock available now
+        """
+        if not self.lines:
+            raise ValueError("Cannot create an order without lines")
+        
+        with transaction.atomic():
+            reserve_stock(stripe_checkout_id, self.quantities(), names=self.names(),
+                          expires_at=reservation_expires_at)
+            
+            fields.setdefault('shipping_address', 'To be provided via Stripe')
+            order = Order.objects.create(
+                user=self.user,
+                email=self.email,
+                stripe_checkout_id=stripe_checkout_id,
+                status=status,
+                total_amount=self.total,
+                **fields
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=line.product,
+                    price=line.price,
+                    quantity=line.quantity,
+                    size=line.size,
+                )
+                for line in self.lines
+            ])
+        
+        logger.info(f"Created order {order.order_reference} with {len(self.lines)} lines")
+        return order
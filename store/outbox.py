@@ -0,0 +1,180 @@
+"""
+Background delivery of order emails.
+
+The Stripe webhook only inserts OutboundEmail rows (a few milliseconds);
+the ``process_email_outbox`` worker claims due rows in batches, renders
+them and sends the whole batch over one SMTP connection. Failed sends are
+retried with exponential backoff and jitter and dead-lettered once
+EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .utils import build_order_email
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+def enqueue_order_emails(order):
+    """
+    Queue the customer confirmation and admin notification emails for an order.
+    
+    Args:
+        order: The Order that has just been paid
+    
+    Returns:
+        list: The created OutboundEmail rows
+    """
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(order=order, kind=OutboundEmail.KIND_ORDER_CONFIRMATION),
+        OutboundEmail(order=order, kind=OutboundEmail.KIND_ORDER_NOTIFICATION),
+    ])
+    logger.info(f"Queued {len(emails)} emails for order #{order.id}")
+    return emails
+
+def retry_delay(attempts):
+    """
+    Backoff before the next attempt: base * 2^(attempts-1), capped, with +/-25% jitter.
+    
+    Args:
+        attempts: Number of attempts made so far (>= 1)
+    
+    Returns:
+        timedelta: Delay until the email is due again
+    """
+    base = _setting('EMAIL_OUTBOX_BACKOFF_BASE', 60)
+    cap = _setting('EMAIL_OUTBOX_BACKOFF_MAX', 6 * 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.75, 1.25))
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Claim up to batch_size due emails for this worker.
+    
+    Rows are locked with SKIP LOCKED (where the database supports it) and
+    flipped to 'sending' in the same transaction, so concurrent workers never
+    pick up the same email. Rows left in 'sending' by a worker that died are
+    reclaimed after EMAIL_OUTBOX_STALE_AFTER seconds.
+    
+    Returns:
+        list: Claimed OutboundEmail instances with their orders loaded
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting('EMAIL_OUTBOX_STALE_AFTER', 600))
+    due = (
+        Q(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now) |
+        Q(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=stale_before)
+    )
+    
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboundEmail.objects.filter(id__in=ids).update(
+            status=OutboundEmail.STATUS_SENDING, claimed_at=now
+        )
+    
+    return list(
+        OutboundEmail.objects.filter(id__in=ids)
+        .select_related('order')
+        .order_by('next_attempt_at', 'id')
+    )
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    email.claimed_at = None
+    if email.attempts >= _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 8):
+        email.status = OutboundEmail.STATUS_DEAD
+        logger.error(f"Dead-lettered {email.kind} email #{email.id} for order #{email.order_id}: {str(error)}")
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.next_attempt_at = now + retry_delay(email.attempts)
+        logger.warning(f"Failed to send {email.kind} email #{email.id} (attempt {email.attempts}): {str(error)}")
+
+def deliver_batch(emails):
+    """
+    Render and send a batch of claimed emails over a single mail connection.
+    
+    Args:
+        emails: OutboundEmail instances returned by claim_batch()
+    
+    Returns:
+        tuple: (sent, failed) counts
+    """
+    if not emails:
+        return 0, 0
+    
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # The whole batch shares the connection, so it fails together
+        now = timezone.now()
+        for email in emails:
+            _record_failure(email, e, now)
+        failed = len(emails)
+    else:
+        try:
+            for email in emails:
+                try:
+                    message = build_order_email(email.order, email.kind, connection=connection)
+                    message.send()
+                except Exception as e:
+                    _record_failure(email, e, timezone.now())
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.status = OutboundEmail.STATUS_SENT
+                    email.sent_at = timezone.now()
+                    email.claimed_at = None
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+    
+    OutboundEmail.objects.bulk_update(
+        emails,
+        ['status', 'attempts', 'next_attempt_at', 'claimed_at', 'sent_at', 'last_error'],
+    )
+    return sent, failed
+
+def process_outbox(batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """
+    Drain due emails batch by batch until none are left.
+    
+    Args:
+        batch_size: Emails claimed (and sent over one connection) per batch
+        max_batches: Optional limit on batches processed in this call
+    
+    Returns:
+        tuple: Total (sent, failed) counts
+    """
+    total_sent = total_failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        sent, failed = deliver_batch(emails)
+        total_sent += sent
+        total_failed += failed
+        batches += 1
+    return total_sent, total_failed
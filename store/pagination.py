@@ -0,0 +1,158 @@
+"""
+Keyset (cursor) pagination for large admin listings.
+
+Instead of ``OFFSET n`` (which scans and discards n rows) and a COUNT(*)
+per page, each page is fetched with a range condition on a unique sort key,
+e.g. ``(created_at, id) < (last_created_at, last_id)``. Every page therefore
+costs one indexed range query, however deep it is. Page positions are passed
+around as opaque, signed cursor tokens.
+"""
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Count, Q
+
+from .cache import CacheNamespace
+
+CURSOR_SALT = 'store.pagination.cursor'
+# Totals are cached briefly, so listings show an approximate count
+total_cache = CacheNamespace('listing_totals', timeout=60)
+
+def _serialize(value):
+    # Full precision: DjangoJSONEncoder would truncate microseconds
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded"""
+    pass
+
+class CursorPage:
+    """One page of a keyset-paginated listing"""
+    
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def __bool__(self):
+        return bool(self.object_list)
+    
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+class CursorPaginator:
+    """
+    Paginate a queryset by a unique ordering, e.g. ('-created_at', '-id').
+    
+    The last field of the ordering must make it unique (normally the primary
+    key), and there should be a matching composite index.
+    """
+    
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = max(1, min(per_page, 100))  # Limit between 1 and 100
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+    
+    def encode_cursor(self, obj, direction):
+        values = [_serialize(getattr(obj, name)) for name, descending in self.fields]
+        return signing.dumps({'v': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+    
+    def decode_cursor(self, token):
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            values, direction = data['v'], data['d']
+            if direction not in ('next', 'prev') or len(values) != len(self.fields):
+                raise ValueError
+            model = self.queryset.model
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, descending), value in zip(self.fields, values)
+            ], direction
+        except Exception:
+            raise InvalidCursor(token)
+    
+    def _after(self, values, backwards):
+        """Q matching rows strictly after `values` in the ordering (before, if backwards)"""
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous in range(index):
+                clause &= Q(**{self.fields[previous][0]: values[previous]})
+            condition |= clause
+        return condition
+    
+    def page(self, cursor=None):
+        """
+        Fetch the page identified by a cursor token (the first page if None or invalid).
+        
+        Returns:
+            CursorPage
+        """
+        values = direction = None
+        if cursor:
+            try:
+                values, direction = self.decode_cursor(cursor)
+            except InvalidCursor:
+                values = direction = None
+        
+        backwards = direction == 'prev'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        else:
+            ordering = self.ordering
+        
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        
+        if backwards:
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        
+        return CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor(rows[-1], 'next') if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], 'prev') if has_previous and rows else None,
+        )
+
+def cached_totals(queryset, **aggregates):
+    """
+    Aggregate a filtered queryset, caching the result briefly per filter set.
+    
+    Args:
+        queryset: The filtered listing queryset
+        **aggregates: Aggregate expressions; defaults to count=Count('pk')
+    
+    Returns:
+        dict: Aggregate values
+    """
+    aggregates = aggregates or {'count': Count('pk')}
+    sql, params = queryset.order_by().query.sql_with_params()
+    signature = repr((queryset.model._meta.label, sql, params, sorted(aggregates)))
+    key = hashlib.md5(signature.encode('utf-8')).hexdigest()
+    return total_cache.get_or_set(key, lambda: queryset.order_by().aggregate(**aggregates))
@@ -0,0 +1,285 @@
+"""
+Payment gateway: the one place the store talks to the Stripe API.
+
+The Stripe library's default HTTP client has an 80 second timeout and
+opens a fresh requests session per thread, so a slow Stripe call could tie
+up a gunicorn worker for over a minute. The gateway instead:
+
+* shares one pooled, keep-alive requests session across the process
+  (STRIPE_POOL_SIZE connections), so calls skip the TCP/TLS handshake
+* bounds every attempt with STRIPE_TIMEOUT and the whole call, retries
+  included, with STRIPE_TIMEOUT_BUDGET
+* retries connection errors, rate limits and 5xx responses itself
+  (STRIPE_MAX_RETRIES) with jittered exponential backoff, reusing one
+  idempotency key so a retried create never makes a second session
+* offers async variants for ASGI deployments (native with httpx, a worker
+  thread otherwise)
+
+Calls go through a StripeClient built for each attempt around the shared
+session, using only the library's public constructor arguments, and never
+touch the stripe module's global client.
+
+STRIPE_API_BASE points the gateway at another server, such as the local
+fake in store.tests.fake_stripe used by the tests and the checkout
+benchmark (store.tests.benchmark_checkout).
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urljoin
+
+import requests
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .renditions import image_url
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = 'https://api.stripe.com'
+DEFAULT_TIMEOUT = 10.0  # seconds per attempt
+DEFAULT_TIMEOUT_BUDGET = 20.0  # seconds per call, retries included
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_POOL_SIZE = 10
+RETRY_BACKOFF_BASE = 0.25  # seconds
+RETRY_BACKOFF_MAX = 2.0  # seconds
+
+_configure_lock = threading.Lock()
+_session = None
+_async_client = None
+
+###################
+# HTTP CLIENTS
+###################
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+def build_session(pool_size=None):
+    """Create a requests session with a keep-alive pool sized for the app's worker threads"""
+    pool_size = pool_size or _setting('STRIPE_POOL_SIZE', DEFAULT_POOL_SIZE)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def _client_options():
+    return {
+        'base_addresses': {'api': _setting('STRIPE_API_BASE', '') or DEFAULT_API_BASE},
+        # Retries are done by the gateway, within the timeout budget
+        'max_network_retries': 0,
+    }
+
+def _api_key():
+    return _setting('STRIPE_SECRET_KEY', '') or stripe.api_key or ''
+
+def get_client(timeout):
+    """
+    StripeClient for one attempt, bounded by timeout seconds.
+    
+    The client is cheap to build; the pooled requests session it wraps is
+    shared by every attempt in the process.
+    """
+    global _session
+    if _session is None:
+        with _configure_lock:
+            if _session is None:
+                _session = build_session()
+    http_client = stripe.RequestsClient(timeout=timeout, session=_session)
+    return stripe.StripeClient(_api_key(), http_client=http_client, **_client_options())
+
+def get_async_client():
+    """StripeClient on one httpx connection pool, or None without httpx"""
+    global _async_client
+    if httpx is None:
+        return None
+    with _configure_lock:
+        if _async_client is None:
+            http_client = stripe.HTTPXClient(timeout=_setting('STRIPE_TIMEOUT', DEFAULT_TIMEOUT))
+            _async_client = stripe.StripeClient(_api_key(), http_client=http_client, **_client_options())
+        return _async_client
+
+def reset_stripe():
+    """Drop the shared connection pools so the next call re-reads settings (used by tests)"""
+    global _session, _async_client
+    with _configure_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _async_client = None
+
+###################
+# RETRIES
+###################
+
+def is_retryable(error):
+    """Connection failures, rate limits and Stripe server errors are worth retrying"""
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return isinstance(error, stripe.error.APIError) and (error.http_status or 500) >= 500
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter, capped at RETRY_BACKOFF_MAX"""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+class _Budget:
+    """Retry schedule for one logical call"""
+    
+    def __init__(self, timeout=None, budget=None, max_retries=None):
+        self.timeout = timeout or _setting('STRIPE_TIMEOUT', DEFAULT_TIMEOUT)
+        self.deadline = time.monotonic() + (budget or _setting('STRIPE_TIMEOUT_BUDGET', DEFAULT_TIMEOUT_BUDGET))
+        self.max_retries = _setting('STRIPE_MAX_RETRIES', DEFAULT_MAX_RETRIES) if max_retries is None else max_retries
+    
+    def remaining(self):
+        return self.deadline - time.monotonic()
+    
+    def attempt_timeout(self):
+        return max(0.1, min(self.timeout, self.remaining()))
+    
+    def next_delay(self, attempt, error, operation):
+        """Seconds to wait before retrying, or None to give up and re-raise"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt)
+        if self.remaining() - delay <= 0.1:
+            return None
+        logger.warning(f"Stripe {operation} failed (attempt {attempt + 1}), retrying in {delay:.2f}s: {str(error)}")
+        return delay
+
+def call_with_retries(operation, func, timeout=None, budget=None, max_retries=None):
+    """
+    Call a Stripe API function with per-attempt timeouts and jittered retries.
+    
+    Args:
+        operation: Name used in log messages
+        func: Callable performing one attempt with the StripeClient it is given
+        timeout: Seconds per attempt (default STRIPE_TIMEOUT)
+        budget: Seconds for the whole call (default STRIPE_TIMEOUT_BUDGET)
+        max_retries: Retries after the first attempt (default STRIPE_MAX_RETRIES)
+    """
+    schedule = _Budget(timeout, budget, max_retries)
+    attempt = 0
+    while True:
+        try:
+            return func(get_client(schedule.attempt_timeout()))
+        except stripe.error.StripeError as e:
+            delay = schedule.next_delay(attempt, e, operation)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+async def acall_with_retries(operation, func, timeout=None, budget=None, max_retries=None):
+    """Async counterpart of call_with_retries(); func returns an awaitable"""
+    schedule = _Budget(timeout, budget, max_retries)
+    attempt = 0
+    while True:
+        attempt_timeout = schedule.attempt_timeout()
+        try:
+            try:
+                return await asyncio.wait_for(func(get_async_client()), attempt_timeout)
+            except asyncio.TimeoutError:
+                raise stripe.error.APIConnectionError(f"Request timed out after {attempt_timeout:.1f}s")
+        except stripe.error.StripeError as e:
+            delay = schedule.next_delay(attempt, e, operation)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+###################
+# CHECKOUT SESSIONS
+###################
+
+def build_line_items(lines, shipping_cost, base_url):
+    """
+    Build Stripe Checkout line items for order lines plus shipping.
+    
+    Args:
+        lines: Iterable of objects with product, quantity and size (OrderLine, CartItem)
+        shipping_cost: Shipping charge, added as its own line
+        base_url: Absolute site URL (e.g. request.build_absolute_uri('/')),
+            resolved once per checkout rather than once per image
+    """
+    line_items = []
+    for line in lines:
+        product = line.product
+        line_items.append({
+            'price_data': {
+                'currency': 'gbp',
+                'product_data': {
+                    'name': f"{product.name}{f' - {line.size}' if line.size else ''}",
+                    'images': [urljoin(base_url, image_url(product, 640))] if product.image else None,
+                },
+                'unit_amount': int(product.price * 100),  # Convert to pence
+            },
+            'quantity': line.quantity,
+        })
+    
+    line_items.append({
+        'price_data': {
+            'currency': 'gbp',
+            'product_data': {
+                'name': 'Shipping',
+            },
+            'unit_amount': int(shipping_cost * 100),  # Convert to pence
+        },
+        'quantity': 1,
+    })
+    return line_items
+
+def create_checkout_session(params, idempotency_key=None, **retry_options):
+    """
+    Create a Stripe Checkout Session.
+    
+    Args:
+        params: Session parameters (line_items, mode, success_url, ...)
+        idempotency_key: Key shared by every retry (generated if omitted)
+        **retry_options: timeout, budget and max_retries overrides
+    
+    Returns:
+        stripe.checkout.Session
+    """
+    idempotency_key = idempotency_key or f"checkout-{uuid.uuid4().hex}"
+    return call_with_retries(
+        'checkout session create',
+        lambda client: client.checkout.sessions.create(params, options={'idempotency_key': idempotency_key}),
+        **retry_options
+    )
+
+async def acreate_checkout_session(params, idempotency_key=None, **retry_options):
+    """
+    Async variant of create_checkout_session() for ASGI views.
+    
+    Uses Stripe's native async client when httpx is installed; otherwise
+    the synchronous call runs in a worker thread.
+    """
+    if httpx is None:
+        return await sync_to_async(create_checkout_session, thread_sensitive=False)(
+            params, idempotency_key=idempotency_key, **retry_options
+        )
+    idempotency_key = idempotency_key or f"checkout-{uuid.uuid4().hex}"
+    return await acall_with_retries(
+        'checkout session create',
+        lambda client: client.checkout.sessions.create_async(params, options={'idempotency_key': idempotency_key}),
+        **retry_options
+    )
+
+def expire_checkout_session(session_id, **retry_options):
+    """Expire an open Checkout Session so it can no longer be paid"""
+    return call_with_retries(
+        'checkout session expire',
+        lambda client: client.checkout.sessions.expire(session_id),
+        **retry_options
+    )
@@ -0,0 +1,207 @@
+"""
+Responsive image renditions for Product and Category images.
+
+Listing pages used to send every visitor the full uploaded photo, often
+several megabytes, to fill a 300px card. When an image is saved, this
+module writes fixed-width copies next to the original in the default
+storage (local MEDIA_ROOT or S3), each as WebP plus a JPEG/PNG fallback:
+
+    products/2024/05/cherry.jpg
+    products/2024/05/cherry.320w.webp
+    products/2024/05/cherry.320w.jpg
+    ...
+
+The generated names are recorded on the model's image_renditions field,
+so templates build srcset attributes without asking the storage whether
+files exist (an HTTP round trip per image on S3). A record whose source
+no longer matches the current image is ignored until it is regenerated.
+
+Widths are set with IMAGE_RENDITION_WIDTHS; images are never upscaled.
+Existing images are backfilled with the generate_image_renditions command.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+def get_widths():
+    """Configured rendition widths, smallest first"""
+    return tuple(sorted(set(getattr(settings, 'IMAGE_RENDITION_WIDTHS', DEFAULT_WIDTHS))))
+
+def rendition_name(source_name, width, extension):
+    """Storage name for one rendition, stored alongside the original"""
+    root, _ = os.path.splitext(source_name)
+    return f"{root}.{width}w.{extension}"
+
+def is_current(instance):
+    """True if the instance's renditions were generated from its current image"""
+    renditions = instance.image_renditions or {}
+    return bool(instance.image) and renditions.get('source') == instance.image.name
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+def _save(storage, name, content):
+    # FileSystemStorage would otherwise pick a new name rather than overwrite
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+def render(field_file, widths=None, storage=None):
+    """
+    Write WebP and fallback renditions of an image file.
+    
+    Args:
+        field_file: The ImageField file (e.g. product.image)
+        widths: Widths to render (default IMAGE_RENDITION_WIDTHS)
+        storage: Storage to write to (default: the field's storage)
+    
+    Returns:
+        dict: The record to store in image_renditions
+    """
+    storage = storage or field_file.storage
+    widths = widths or get_widths()
+    
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback_ext = 'png' if has_alpha else 'jpg'
+    
+    # Never upscale: widths beyond the original collapse into one full-size copy
+    targets = sorted({min(width, image.width) for width in widths})
+    
+    renditions = []
+    for width in targets:
+        if width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        else:
+            resized = image
+        
+        webp = _save(storage, rendition_name(field_file.name, width, 'webp'),
+                     _encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4))
+        if has_alpha:
+            fallback_content = _encode(resized, 'PNG', optimize=True)
+        else:
+            fallback_content = _encode(resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        fallback = _save(storage, rendition_name(field_file.name, width, fallback_ext), fallback_content)
+        renditions.append({'width': width, 'webp': webp, 'fallback': fallback})
+    
+    return {
+        'source': field_file.name,
+        'width': image.width,
+        'height': image.height,
+        'renditions': renditions,
+    }
+
+def delete_renditions(record, storage=None):
+    """Remove the files listed in an image_renditions record"""
+    storage = storage or default_storage
+    for rendition in (record or {}).get('renditions', []):
+        for name in (rendition['webp'], rendition['fallback']):
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.warning(f"Could not delete image rendition {name}: {str(e)}")
+
+def _delete_unshared(instance, record):
+    # Identical uploads share one stored file (see store.uploads)
+    model = type(instance)
+    if not model.objects.filter(image=record.get('source')).exclude(pk=instance.pk).exists():
+        delete_renditions(record, instance.image.storage)
+
+def generate_renditions(instance, force=False):
+    """
+    Generate renditions for a Product or Category and record them.
+    
+    Stale renditions of a replaced image are deleted. The record is written
+    with queryset.update(), so saving it does not fire the model's signals
+    again.
+    
+    Args:
+        instance: Product or Category with an image field
+        force: Regenerate even if the current renditions are up to date
+    
+    Returns:
+        int: Number of widths rendered (0 if nothing was done)
+    """
+    if not instance.image or (is_current(instance) and not force):
+        return 0
+    
+    previous = instance.image_renditions or {}
+    try:
+        record = render(instance.image)
+    except Exception as e:
+        logger.warning(f"Could not render images for {instance._meta.model_name} #{instance.pk}: {str(e)}")
+        return 0
+    
+    if previous.get('source') and previous.get('source') != record['source']:
+        _delete_unshared(instance, previous)
+    
+    type(instance).objects.filter(pk=instance.pk).update(image_renditions=record)
+    instance.image_renditions = record
+    return len(record['renditions'])
+
+def clear_stale_renditions(instance):
+    """Drop the record and files when an instance's image has been removed"""
+    if instance.image or not instance.image_renditions:
+        return
+    _delete_unshared(instance, instance.image_renditions)
+    type(instance).objects.filter(pk=instance.pk).update(image_renditions={})
+    instance.image_renditions = {}
+
+###################
+# URLS
+###################
+
+def image_sources(instance):
+    """
+    URLs for responsive markup.
+    
+    Returns:
+        dict with 'src', 'srcset' and 'webp_srcset' ('' when there are no
+        current renditions), or None if the instance has no image
+    """
+    if not instance.image:
+        return None
+    if not is_current(instance):
+        return {'src': instance.image.url, 'srcset': '', 'webp_srcset': ''}
+    
+    storage = instance.image.storage
+    renditions = instance.image_renditions['renditions']
+    srcset = ', '.join(f"{storage.url(r['fallback'])} {r['width']}w" for r in renditions)
+    webp_srcset = ', '.join(f"{storage.url(r['webp'])} {r['width']}w" for r in renditions)
+    # Middle rendition is a sensible default for browsers ignoring srcset
+    default = renditions[len(renditions) // 2]
+    return {'src': storage.url(default['fallback']), 'srcset': srcset, 'webp_srcset': webp_srcset}
+
+def image_url(instance, width):
+    """
+    URL of the smallest fallback rendition at least `width` wide.
+    
+    Falls back to the largest rendition, then to the original image. Used
+    where WebP may not be supported, such as Stripe Checkout images.
+    """
+    if not instance.image:
+        return None
+    if not is_current(instance):
+        return instance.image.url
+    renditions = instance.image_renditions['renditions']
+    chosen = next((r for r in renditions if r['width'] >= width), renditions[-1])
+    return instance.image.storage.url(chosen['fallback'])
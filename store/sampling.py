@@ -0,0 +1,55 @@
+"""
+Cheap random product sampling.
+
+``order_by('?')`` makes the database sort the whole filtered set randomly on
+every request. Instead, the ids of available products are cached per pool
+(featured products, or products in one category) and sampled in Python, so
+a random pick costs one primary-key lookup. Pools are invalidated by the
+Product signal handlers whenever stock or availability may have changed.
+"""
+import random
+
+from .cache import CacheNamespace
+from .models import Product
+
+POOL_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+pool_cache = CacheNamespace('product_pools', POOL_CACHE_TIMEOUT)
+
+def invalidate_product_pools():
+    """Invalidate every cached product id pool"""
+    pool_cache.invalidate()
+
+def get_product_pool(category_id=None, featured=False):
+    """
+    Return the cached list of available product ids for a pool.
+    
+    Args:
+        category_id: Restrict the pool to one category
+        featured: Restrict the pool to featured products
+    """
+    def load_pool():
+        products = Product.objects.filter(available=True)
+        if category_id is not None:
+            products = products.filter(category_id=category_id)
+        if featured:
+            products = products.filter(featured=True)
+        return list(products.order_by().values_list('id', flat=True))
+    
+    return pool_cache.get_or_set(f"{category_id or 'all'}:{int(featured)}", load_pool)
+
+def sample_products(count, category_id=None, featured=False, exclude_ids=()):
+    """
+    Return up to ``count`` random available products (with category) from a pool.
+    
+    Products are returned in random order. Only the sampled rows are read
+    from the database.
+    """
+    excluded = set(exclude_ids)
+    pool = [product_id for product_id in get_product_pool(category_id, featured) if product_id not in excluded]
+    if not pool:
+        return []
+    
+    sample_ids = random.sample(pool, min(count, len(pool)))
+    products = Product.objects.filter(id__in=sample_ids, available=True).select_related('category').in_bulk()
+    return [products[product_id] for product_id in sample_ids if product_id in products]
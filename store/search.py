@@ -0,0 +1,268 @@
+"""
+Full-text product search.
+
+Two index implementations sit behind the same backend interface:
+
+- PostgreSQL: a weighted ``Product.search_vector`` tsvector column with a
+  GIN index, ranked with ``ts_rank`` and highlighted with ``ts_headline``.
+- SQLite: an FTS5 virtual table (``store_product_fts``) keyed by product id,
+  ranked with ``bm25`` and highlighted with ``snippet``.
+
+Other databases fall back to ``icontains`` matching. The index is kept in
+step by the Product signal handlers and can be rebuilt with the
+``rebuild_search_index`` management command.
+"""
+import logging
+import re
+
+from django.db import connection
+from django.db.models import Case, FloatField, Q, TextField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of ranked hits returned for a single search
+SEARCH_RESULT_LIMIT = 500
+
+# Sentinels wrapped around matched terms by the database; they are swapped
+# for <mark> tags only after the snippet has been HTML-escaped
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def format_snippet(snippet):
+    """Escape a raw search snippet and turn the match sentinels into <mark> tags"""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+def _ranked(queryset, hits):
+    """
+    Restrict a queryset to the given hits, annotated with search_rank and
+    search_snippet and ordered by relevance.
+    
+    Args:
+        hits: list of (product_id, rank, snippet) tuples, best match first
+    """
+    if not hits:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value('', output_field=TextField()),
+        )
+    
+    return queryset.filter(id__in=[hit[0] for hit in hits]).annotate(
+        search_rank=Case(
+            *[When(id=product_id, then=Value(float(rank))) for product_id, rank, _ in hits],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        search_snippet=Case(
+            *[When(id=product_id, then=Value(snippet or '')) for product_id, _, snippet in hits],
+            default=Value(''),
+            output_field=TextField(),
+        ),
+    ).order_by('-search_rank', 'name')
+
+class BaseSearchBackend:
+    """Interface shared by the product search backends"""
+    
+    def setup(self):
+        """Create any database structures the backend needs (idempotent)"""
+    
+    def index_products(self, products):
+        """Add or refresh the index entries for the given products"""
+    
+    def remove_products(self, product_ids):
+        """Drop the index entries for the given product ids"""
+    
+    def rebuild(self, batch_size=500):
+        """
+        Rebuild the whole index from the Product table.
+        
+        Returns:
+            int: number of products indexed
+        """
+        self.setup()
+        count = 0
+        batch = []
+        for product in Product.objects.only('id', 'name', 'description').order_by('id').iterator(chunk_size=batch_size):
+            batch.append(product)
+            if len(batch) >= batch_size:
+                self.index_products(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.index_products(batch)
+            count += len(batch)
+        return count
+    
+    def filter(self, queryset, query):
+        """Restrict a Product queryset to rows matching the query"""
+        raise NotImplementedError
+    
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        """
+        Restrict a Product queryset to rows matching the query, annotated with
+        ``search_rank`` (higher is better) and ``search_snippet`` and ordered
+        by relevance.
+        """
+        raise NotImplementedError
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Fallback backend using icontains matching (no index)"""
+    
+    def _q(self, query):
+        return Q(name__icontains=query) | Q(description__icontains=query)
+    
+    def filter(self, queryset, query):
+        return queryset.filter(self._q(query))
+    
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        lowered = query.lower()
+        hits = []
+        for product_id, name, description in queryset.filter(self._q(query)).values_list('id', 'name', 'description')[:limit]:
+            # Name matches outrank description-only matches
+            rank = 2.0 if lowered in name.lower() else 1.0
+            start = description.lower().find(lowered)
+            if start >= 0:
+                snippet = (
+                    description[max(0, start - 40):start]
+                    + MARK_START + description[start:start + len(query)] + MARK_END
+                    + description[start + len(query):start + len(query) + 80]
+                )
+            else:
+                snippet = description[:120]
+            hits.append((product_id, rank, snippet))
+        hits.sort(key=lambda hit: -hit[1])
+        return _ranked(queryset, hits)
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 backend using a product_id-keyed virtual table"""
+    
+    table = 'store_product_fts'
+    
+    def setup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                "USING fts5(name, description, tokenize='porter unicode61')"
+            )
+    
+    def _match_expression(self, query):
+        """Build a safe FTS5 MATCH expression: every term must prefix-match"""
+        terms = TOKEN_RE.findall(query.lower())
+        return ' '.join(f'"{term}"*' for term in terms)
+    
+    def index_products(self, products):
+        rows = [(p.id, p.name, p.description or '') for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+    
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in product_ids])
+    
+    def rebuild(self, batch_size=500):
+        self.setup()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        return super().rebuild(batch_size=batch_size)
+    
+    def filter(self, queryset, query):
+        expression = self._match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression]
+        ))
+    
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        expression = self._match_expression(query)
+        if not expression:
+            return _ranked(queryset, [])
+        with connection.cursor() as cursor:
+            # Name matches are weighted above description matches; bm25 is
+            # negative with better matches lower, so flip the sign
+            cursor.execute(
+                f"SELECT rowid, -bm25({self.table}, 10.0, 1.0), "
+                f"snippet({self.table}, 1, %s, %s, '…', 16) "
+                f"FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, 10.0, 1.0) LIMIT %s",
+                [MARK_START, MARK_END, expression, limit]
+            )
+            hits = cursor.fetchall()
+        return _ranked(queryset, hits)
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL backend using the GIN-indexed Product.search_vector column"""
+    
+    config = 'english'
+    
+    def _vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector('description', weight='B', config=self.config)
+        )
+    
+    def _query(self, query):
+        from django.contrib.postgres.search import SearchQuery
+        return SearchQuery(query, search_type='websearch', config=self.config)
+    
+    def index_products(self, products):
+        product_ids = [p.id for p in products]
+        if product_ids:
+            Product.objects.filter(id__in=product_ids).update(search_vector=self._vector())
+    
+    def rebuild(self, batch_size=500):
+        # A single set-based UPDATE is faster than batching through Python
+        return Product.objects.update(search_vector=self._vector())
+    
+    def filter(self, queryset, query):
+        return queryset.filter(search_vector=self._query(query))
+    
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        from django.contrib.postgres.search import SearchHeadline, SearchRank
+        from django.db.models import F
+        search_query = self._query(query)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+            search_snippet=SearchHeadline(
+                'description', search_query, config=self.config,
+                start_sel=MARK_START, stop_sel=MARK_END, max_words=25, min_words=10,
+            ),
+        ).order_by('-search_rank', 'name')
+
+_backends = {}
+
+def get_search_backend():
+    """Return the search backend for the default database connection"""
+    vendor = connection.vendor
+    if vendor not in _backends:
+        if vendor == 'postgresql':
+            _backends[vendor] = PostgresSearchBackend()
+        elif vendor == 'sqlite' and _sqlite_has_fts5():
+            _backends[vendor] = SQLiteSearchBackend()
+        else:
+            _backends[vendor] = SimpleSearchBackend()
+    return _backends[vendor]
+
+def _sqlite_has_fts5():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            return bool(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning(f"Could not detect SQLite FTS5 support: {str(e)}")
+        return False
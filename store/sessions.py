@@ -0,0 +1,99 @@
+"""
+Session middleware that only writes sessions when their data changed.
+
+Django's SESSION_SAVE_EVERY_REQUEST rewrites the whole session on every
+page view, which with the database backend means a write per request. This
+middleware replaces django.contrib.sessions' SessionMiddleware and saves a
+session only when it was modified (e.g. Cart.save() or login). To keep
+active visitors signed in, the expiry is refreshed lazily: at most once per
+SESSION_REFRESH_INTERVAL seconds a timestamp is stored in the session,
+which saves it and re-issues the cookie with a fresh expiry.
+
+Per-process counters of requests, session writes and expiry refreshes are
+kept for monitoring (see session_stats()).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+logger = logging.getLogger(__name__)
+
+REFRESHED_AT_KEY = '_refreshed_at'
+DEFAULT_REFRESH_INTERVAL = 60 * 60  # 1 hour
+
+_lock = threading.Lock()
+_stats = {'requests': 0, 'writes': 0, 'refreshes': 0}
+
+def _record(**counts):
+    with _lock:
+        for name, value in counts.items():
+            _stats[name] += value
+
+def session_stats():
+    """
+    Return session write counters for this process.
+    
+    Returns:
+        dict: requests, writes, refreshes and writes_per_request
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats['writes_per_request'] = round(stats['writes'] / stats['requests'], 3) if stats['requests'] else None
+    return stats
+
+def reset_session_stats():
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+def get_refresh_interval():
+    """Seconds between expiry refreshes, never more than half the session age"""
+    interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+    return max(0, min(interval, settings.SESSION_COOKIE_AGE // 2))
+
+class LazySessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware that persists sessions only when they changed, and
+    refreshes the expiry of existing sessions at most once per interval.
+    """
+    
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is None:
+            return response
+        
+        refreshed = self._refresh_expiry(request, session)
+        will_save = (
+            (session.modified or settings.SESSION_SAVE_EVERY_REQUEST)
+            and not session.is_empty()
+            and response.status_code < 500
+        )
+        _record(requests=1, writes=int(will_save), refreshes=int(refreshed))
+        if will_save:
+            logger.debug(f"Saving session ({'expiry refresh' if refreshed else 'data changed'})")
+        return super().process_response(request, response)
+    
+    def _refresh_expiry(self, request, session):
+        """Touch a session whose expiry was last refreshed over an interval ago"""
+        if session.modified:
+            # Saved anyway, so restart the interval at no extra cost
+            if not session.is_empty():
+                session[REFRESHED_AT_KEY] = int(time.time())
+            return False
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES and not session.accessed:
+            # Loading the session would mark it accessed, adding Vary: Cookie
+            # to pages that never looked at it
+            return False
+        # Loading drops the key of an expired or unknown session cookie, so this
+        # covers those as well as new visitors; neither gets a session created
+        refreshed_at = session.get(REFRESHED_AT_KEY)
+        if session.session_key is None or session.get_expire_at_browser_close():
+            return False
+        now = int(time.time())
+        if refreshed_at is None or now - refreshed_at >= get_refresh_interval():
+            session[REFRESHED_AT_KEY] = now
+            return True
+        return False
@@ -0,0 +1,139 @@
+"""
+Signal handlers for the store app.
+
+Keeps request-level and cached derived data in step with catalogue edits.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .analytics import record_order_change
+from .cart import invalidate_cart_counts, invalidate_cart_products, merge_session_cart
+from .context_processors import invalidate_nav_categories
+from .facets import invalidate_facets
+from .models import Category, Order, Product
+from .renditions import clear_stale_renditions, generate_renditions, is_current
+from .sampling import invalidate_product_pools
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_catalogue_caches():
+    """
+    Invalidate derived product data (cart product maps, facets, sampling pools).
+    
+    Called by the Product signal handlers, and directly by code paths that
+    change stock or availability with queryset.update() / bulk_update(),
+    which do not send model signals.
+    """
+    invalidate_cart_products()
+    invalidate_facets()
+    invalidate_product_pools()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_caches(sender, instance, **kwargs):
+    """Invalidate derived product data when a product changes"""
+    invalidate_catalogue_caches()
+
+
+def invalidate_category_data():
+    """
+    Invalidate derived category data (facets, the nav menu).
+    
+    Called by the Category signal handlers, and by Category.objects.reorder(),
+    which updates with queryset.update() and so sends no model signals.
+    """
+    invalidate_facets()
+    invalidate_nav_categories()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_caches(sender, instance, **kwargs):
+    """Invalidate derived category data when a category changes"""
+    invalidate_category_data()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search index current when a product is saved"""
+    if raw:
+        return
+    try:
+        # Savepoint so an index failure never poisons the caller's transaction
+        with transaction.atomic():
+            get_search_backend().index_products([instance])
+    except Exception as e:
+        logger.error(f"Failed to index product #{instance.pk} for search: {str(e)}")
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Remove a deleted product from the full-text search index"""
+    try:
+        with transaction.atomic():
+            get_search_backend().remove_products([instance.pk])
+    except Exception as e:
+        logger.error(f"Failed to remove product #{instance.pk} from search index: {str(e)}")
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def render_image_renditions(sender, instance, raw=False, **kwargs):
+    """Generate resized/WebP copies after an image is uploaded or replaced"""
+    if raw:
+        return
+    if not instance.image:
+        if instance.image_renditions:
+            transaction.on_commit(lambda: clear_stale_renditions(instance))
+        return
+    if is_current(instance):
+        return
+    # After commit, so resizing never holds the row locks of the save
+    transaction.on_commit(lambda: generate_renditions(instance))
+
+
+@receiver(post_delete, sender=Product)
+def drop_cart_counts(sender, instance, **kwargs):
+    """Deleting a product cascades to saved cart lines, so cached item counts are stale"""
+    invalidate_cart_counts()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """Move the anonymous session cart into the saved cart when database carts are enabled"""
+    if request is None or getattr(settings, 'CART_STORAGE', 'session') != 'database':
+        return
+    try:
+        merge_session_cart(request, user)
+    except Exception as e:
+        logger.error(f"Failed to merge session cart for user #{user.pk}: {str(e)}")
+
+
+@receiver(post_migrate)
+def setup_search_index(sender, **kwargs):
+    """Create search structures that are not managed by models (e.g. FTS5 tables)"""
+    if sender.name == 'store':
+        get_search_backend().setup()
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollup(sender, instance, raw=False, **kwargs):
+    """Add or remove an order from the daily sales rollup when it enters or leaves a sale status"""
+    if raw:
+        return
+    was_sale = getattr(instance, '_loaded_status', None) in Order.SALE_STATUSES
+    record_order_change(instance, was_sale, instance.status in Order.SALE_STATUSES)
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollup(sender, instance, **kwargs):
+    """Remove a deleted order from the rollup (before its items are deleted)"""
+    was_sale = getattr(instance, '_loaded_status', instance.status) in Order.SALE_STATUSES
+    record_order_change(instance, was_sale, False)
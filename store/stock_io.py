@@ -0,0 +1,336 @@
+"""
+Spreadsheet stock takes: streaming CSV/XLSX export and chunked import.
+
+Exports iterate the product table in chunks, so memory use does not grow with
+the catalogue. Imports read the uploaded file row by row and work through it
+in chunks: one locked fetch per chunk, validation with the same field rules
+as ProductForm (and Product.clean()), and one bulk_update per chunk in its
+own transaction. A dry run computes the same diff without writing.
+"""
+import csv
+import logging
+import os
+import tempfile
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import ProductForm
+from .inventory import stock_changed
+from .models import Product, StockMovement
+
+try:
+    import openpyxl
+except ImportError:  # XLSX support is optional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['id', 'name', 'category', 'stock', 'price', 'available']
+IMPORT_FIELDS = ['stock', 'price', 'available']
+CHUNK_SIZE = 1000
+# Caps on what an import report keeps in memory, however large the file
+MAX_REPORTED_CHANGES = 200
+MAX_REPORTED_ERRORS = 100
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+RowChange = namedtuple('RowChange', ['row', 'product_id', 'name', 'changes'])
+
+class StockImportError(Exception):
+    """Raised when an uploaded stock file cannot be read at all"""
+    pass
+
+def xlsx_supported():
+    return openpyxl is not None
+
+###################
+# Export
+###################
+
+def _export_values(queryset):
+    return (
+        queryset.order_by('id')
+        .values_list('id', 'name', 'category__name', 'stock', 'price', 'available')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming"""
+    def write(self, value):
+        return value
+
+def iter_csv_export(queryset):
+    """Yield CSV lines (header first) for the given products"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for product_id, name, category, stock, price, available in _export_values(queryset):
+        yield writer.writerow([product_id, name, category or '', stock, price, 'yes' if available else 'no'])
+
+def iter_xlsx_export(queryset, chunk_size=64 * 1024):
+    """
+    Yield an XLSX workbook of the given products in byte chunks.
+    
+    The workbook is built with openpyxl's write-only mode (rows are flushed
+    to a temporary file as they are written) and then streamed from disk.
+    """
+    if openpyxl is None:
+        raise StockImportError('XLSX export requires the openpyxl package.')
+    
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Stock')
+    sheet.append(EXPORT_COLUMNS)
+    for product_id, name, category, stock, price, available in _export_values(queryset):
+        sheet.append([product_id, name, category or '', stock, price, 'yes' if available else 'no'])
+    
+    with tempfile.TemporaryFile() as buffer:
+        workbook.save(buffer)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+###################
+# Import
+###################
+
+def _file_format(uploaded_file):
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension == '.xlsx':
+        if openpyxl is None:
+            raise StockImportError('XLSX import requires the openpyxl package.')
+        return 'xlsx'
+    raise StockImportError('Upload a .csv or .xlsx file.')
+
+def _normalise_header(header):
+    return [str(column or '').strip().lower() for column in header]
+
+def _decode_lines(file):
+    for number, line in enumerate(file, start=1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError as e:
+            raise StockImportError(
+                f'Line {number} is not UTF-8 text ({e.reason} at byte {e.start}). Save the file as CSV UTF-8.'
+            )
+
+def iter_rows(uploaded_file):
+    """
+    Yield (row number, {column: value}) for each data row of an uploaded file.
+    
+    Rows are read lazily from the upload (which Django spools to disk for
+    large files), so only the current row is held in memory.
+    
+    Raises:
+        StockImportError: If the file is not a readable CSV or XLSX file
+    """
+    file_format = _file_format(uploaded_file)
+    uploaded_file.seek(0)
+    
+    if file_format == 'csv':
+        reader = csv.reader(_decode_lines(uploaded_file.file))
+        try:
+            header = _normalise_header(next(reader, []))
+            yield from _rows_with_header(header, reader)
+        except csv.Error as e:
+            raise StockImportError(f'Line {reader.line_num} could not be read: {str(e)}')
+    else:
+        try:
+            workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        except Exception as e:
+            raise StockImportError(f'Could not read the spreadsheet: {str(e)}')
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = _normalise_header(next(rows, []))
+            yield from _rows_with_header(header, rows)
+        finally:
+            workbook.close()
+
+def _rows_with_header(header, rows):
+    if 'id' not in header:
+        raise StockImportError('The file must have an "id" column (use the export as a template).')
+    for number, values in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in values):
+            continue  # Skip blank lines
+        yield number, dict(zip(header, values))
+
+def _parse_available(value):
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValidationError('Enter yes or no.')
+
+def _clean_row(values, product):
+    """
+    Validate a row against ProductForm's field rules and Product.clean().
+    
+    Returns:
+        dict: {field: new value} for the importable fields present in the row
+    
+    Raises:
+        ValidationError: If any value is invalid
+    """
+    cleaned = {}
+    errors = {}
+    for field in IMPORT_FIELDS:
+        raw = values.get(field)
+        if raw is None or str(raw).strip() == '':
+            continue
+        try:
+            if field == 'available':
+                cleaned[field] = _parse_available(raw)
+            else:
+                # Spreadsheet cells may hold floats such as 12.0
+                if field == 'stock' and isinstance(raw, float) and raw.is_integer():
+                    raw = int(raw)
+                cleaned[field] = ProductForm.base_fields[field].clean(str(raw).strip())
+        except ValidationError as e:
+            errors[field] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    
+    # Model-level limits (price cap, stock cap) on a throwaway copy
+    candidate = Product(name=product.name, price=product.price, stock=product.stock)
+    for field, value in cleaned.items():
+        setattr(candidate, field, value)
+    candidate.clean()
+    return cleaned
+
+def _format_errors(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{field}: {', '.join(messages)}" for field, messages in error.message_dict.items())
+    return '; '.join(error.messages)
+
+class StockImportReport:
+    """Running totals for an import, with bounded samples of changes and errors"""
+    
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.changes = []
+        self.errors = []
+    
+    def add_change(self, change):
+        self.changed += 1
+        if len(self.changes) < MAX_REPORTED_CHANGES:
+            self.changes.append(change)
+    
+    def add_error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+    
+    @property
+    def truncated(self):
+        return self.changed > len(self.changes) or self.error_count > len(self.errors)
+
+def _process_chunk(chunk, report, user):
+    ids = {}
+    for number, values in chunk:
+        try:
+            ids[number] = int(float(values.get('id')))
+        except (TypeError, ValueError):
+            report.add_error(number, f"Invalid product id: {values.get('id')}")
+    
+    now = timezone.now()
+    with transaction.atomic():
+        products = Product.objects.all()
+        if not report.dry_run:
+            products = products.select_for_update()
+        products = products.in_bulk(set(ids.values()))
+        
+        updated = {}
+        movements = []
+        for number, values in chunk:
+            if number not in ids:
+                continue
+            product = products.get(ids[number])
+            if product is None:
+                report.add_error(number, f"Product {ids[number]} does not exist")
+                continue
+            
+            try:
+                cleaned = _clean_row(values, product)
+            except ValidationError as e:
+                report.add_error(number, _format_errors(e))
+                continue
+            
+            if cleaned.get('stock', product.stock) <= 0:
+                # Sold-out products are never left available (as in Product.save())
+                cleaned['available'] = False
+            changes = {
+                field: (getattr(product, field), value)
+                for field, value in cleaned.items()
+                if getattr(product, field) != value
+            }
+            if not changes:
+                report.unchanged += 1
+                continue
+            
+            report.add_change(RowChange(number, product.id, product.name, changes))
+            if 'stock' in changes:
+                old_stock, new_stock = changes['stock']
+                movements.append(StockMovement(
+                    product=product, user=user, reason=StockMovement.REASON_IMPORT,
+                    previous_stock=old_stock, new_stock=new_stock, change=new_stock - old_stock,
+                ))
+            for field, (old, new) in changes.items():
+                setattr(product, field, new)
+            product.updated_at = now
+            updated[product.id] = product
+        
+        if updated and not report.dry_run:
+            Product.objects.bulk_update(
+                list(updated.values()), IMPORT_FIELDS + ['updated_at'], batch_size=CHUNK_SIZE
+            )
+            StockMovement.objects.bulk_create(movements, batch_size=CHUNK_SIZE)
+            transaction.on_commit(stock_changed)
+
+def import_stock(uploaded_file, dry_run=True, user=None, chunk_size=CHUNK_SIZE):
+    """
+    Import stock, price and availability from an uploaded CSV or XLSX file.
+    
+    Rows are matched by product id; blank cells leave a field unchanged and
+    invalid rows are reported and skipped. Each chunk of rows is applied in
+    its own transaction, so memory stays bounded for very large files.
+    
+    Args:
+        uploaded_file: UploadedFile (.csv or .xlsx)
+        dry_run: If True, only compute the diff
+        user: Optional user recorded on stock movement audit rows
+        chunk_size: Rows validated and written per transaction
+    
+    Returns:
+        StockImportReport
+    
+    Raises:
+        StockImportError: If the file cannot be read
+    """
+    report = StockImportReport(dry_run)
+    chunk = []
+    for number, values in iter_rows(uploaded_file):
+        report.rows += 1
+        chunk.append((number, values))
+        if len(chunk) >= chunk_size:
+            _process_chunk(chunk, report, user)
+            chunk = []
+    if chunk:
+        _process_chunk(chunk, report, user)
+    
+    logger.info(
+        f"Stock import ({'dry run' if dry_run else 'applied'}): {report.rows} rows, "
+        f"{report.changed} changed, {report.error_count} errors"
+    )
+    return report
@@ -0,0 +1,54 @@
+"""
+Template tags for responsive product and category images.
+
+Usage:
+    {% load store_images %}
+    {% responsive_image product sizes="(max-width: 576px) 100vw, 300px" class="product-image" %}
+"""
+from django import template
+from django.utils.html import format_html
+
+from store.renditions import image_sources, image_url
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 300px'
+
+@register.simple_tag
+def responsive_image(instance, sizes=DEFAULT_SIZES, alt=None, css_class='', loading='lazy', **attrs):
+    """
+    Render a <picture> with WebP and fallback srcsets for a Product or Category.
+    
+    Args:
+        instance: Object with image and image_renditions fields
+        sizes: The sizes attribute describing the rendered width
+        alt: Alt text (defaults to the instance's name)
+        css_class: Class for the <img>; `class="..."` is accepted too
+        loading: The img loading attribute ('lazy' or 'eager')
+    
+    Returns:
+        The markup, or '' if the instance has no image
+    """
+    sources = image_sources(instance)
+    if sources is None:
+        return ''
+    alt = getattr(instance, 'name', '') if alt is None else alt
+    css_class = attrs.pop('class', css_class)
+    
+    if not sources['srcset']:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">',
+                           sources['src'], alt, css_class, loading)
+    
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        sources['webp_srcset'], sizes,
+        sources['src'], sources['srcset'], sizes, alt, css_class, loading,
+    )
+
+@register.simple_tag
+def image_rendition_url(instance, width=640):
+    """URL of the rendition closest to `width` (original image if none)"""
+    return image_url(instance, int(width)) or ''
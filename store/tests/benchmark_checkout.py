@@ -0,0 +1,103 @@
+"""
+Benchmark Stripe Checkout Session creation offline, against the fake
+Stripe server in store.tests.fake_stripe.
+
+Usage:
+    python -m store.tests.benchmark_checkout --requests 500 --concurrency 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SESSION_PARAMS = {
+    'payment_method_types': ['card'],
+    'mode': 'payment',
+    'line_items': [{
+        'price_data': {'currency': 'gbp', 'product_data': {'name': 'Benchmark'}, 'unit_amount': 300},
+        'quantity': 1,
+    }],
+    'success_url': 'https://example.com/success/',
+    'cancel_url': 'https://example.com/cancel/',
+}
+
+
+def run_benchmark(count=200, concurrency=8, latency=0.05, fail_first=0, use_async=False, stdout=None):
+    """
+    Create count sessions with concurrency workers and print latency,
+    throughput, worker occupancy and connection reuse.
+    """
+    from django.test import override_settings
+
+    from store import payments
+    from store.tests.fake_stripe import FakeStripeServer
+
+    stdout = stdout or sys.stdout
+    count = max(1, count)
+    concurrency = max(1, concurrency)
+
+    def timed(func):
+        started = time.perf_counter()
+        func(SESSION_PARAMS)
+        return time.perf_counter() - started
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await payments.acreate_checkout_session(SESSION_PARAMS)
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(one() for i in range(count)))
+
+    with FakeStripeServer(latency=latency, fail_first=fail_first) as server:
+        with override_settings(STRIPE_API_BASE=server.url, STRIPE_SECRET_KEY='sk_test_benchmark',
+                               STRIPE_POOL_SIZE=concurrency):
+            payments.reset_stripe()
+            try:
+                started = time.perf_counter()
+                if use_async:
+                    latencies = asyncio.run(run_async())
+                else:
+                    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                        latencies = list(pool.map(lambda i: timed(payments.create_checkout_session), range(count)))
+                elapsed = time.perf_counter() - started
+            finally:
+                payments.reset_stripe()
+
+    latencies = sorted(latencies)
+    busy = sum(latencies)
+    stdout.write(f"Sessions:          {count} ({concurrency} concurrent)\n")
+    stdout.write(f"Throughput:        {count / elapsed:.1f}/s\n")
+    stdout.write(f"Latency p50/p95:   {statistics.median(latencies) * 1000:.1f} / "
+                 f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms\n")
+    stdout.write(f"Worker occupancy:  {busy:.2f} worker-seconds "
+                 f"({busy / count * 1000:.1f} ms per checkout)\n")
+    stdout.write(f"HTTP requests:     {len(server.requests)} over {server.connections} connections\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark checkout session creation against a fake Stripe')
+    parser.add_argument('--requests', type=int, default=200, help='Sessions to create (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent workers (default: 8)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Simulated Stripe latency in seconds (default: 0.05)')
+    parser.add_argument('--fail-first', type=int, default=0,
+                        help='Answer the first N requests with errors to exercise retries')
+    parser.add_argument('--async', action='store_true', dest='use_async',
+                        help='Use the async gateway instead of a thread pool')
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
+    import django
+    django.setup()
+    run_benchmark(options.requests, options.concurrency, options.latency, options.fail_first, options.use_async)
+
+
+if __name__ == '__main__':
+    main()
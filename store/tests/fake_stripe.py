@@ -0,0 +1,146 @@
+"""
+A local stand-in for the Stripe API, for tests and the offline checkout
+benchmark (store.tests.benchmark_checkout).
+
+Implements just enough of the Checkout Sessions API for the gateway in
+store.payments: creating and expiring sessions. Responses can be delayed
+and the first requests can be made to fail, and the server counts the
+connections it accepts, so connection reuse can be verified.
+
+Usage:
+    with FakeStripeServer(latency=0.05) as server:
+        with override_settings(STRIPE_API_BASE=server.url):
+            ...
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+    
+    def setup(self):
+        super().setup()
+        self.server.fake.record_connection()
+    
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+    
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode('utf-8'), keep_blank_values=True))
+        status, body = fake.handle('POST', self.path, params, self.headers.get('Idempotency-Key'))
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        pass  # Clients that time out drop their connection mid-response
+
+class FakeStripeServer:
+    """
+    Threaded HTTP server answering Checkout Session requests like Stripe.
+    
+    Args:
+        latency: Seconds to wait before answering each request
+        fail_first: Number of initial requests answered with a 500 error
+    """
+    
+    def __init__(self, latency=0.0, fail_first=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.requests = []
+        self.connections = 0
+        self.sessions = {}
+        self._idempotent = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+    
+    def handle(self, method, path, params, idempotency_key):
+        """Return (status, body) for a request"""
+        with self._lock:
+            self.requests.append((method, path, params, idempotency_key))
+            failing = len(self.requests) <= self.fail_first
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            return 500, {'error': {'type': 'api_error', 'message': 'Fake Stripe server error'}}
+        
+        if path == '/v1/checkout/sessions':
+            with self._lock:
+                # Stripe replays the original response for a repeated idempotency key
+                if idempotency_key in self._idempotent:
+                    return 200, self._idempotent[idempotency_key]
+                session = self._new_session(params)
+                if idempotency_key:
+                    self._idempotent[idempotency_key] = session
+            return 200, session
+        
+        if path.startswith('/v1/checkout/sessions/') and path.endswith('/expire'):
+            session_id = path.split('/')[4]
+            with self._lock:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    return 404, {'error': {'type': 'invalid_request_error',
+                                           'message': f"No such checkout.session: '{session_id}'"}}
+                session['status'] = 'expired'
+            return 200, session
+        
+        return 404, {'error': {'type': 'invalid_request_error', 'message': f"Unrecognized request URL ({path})"}}
+    
+    def _new_session(self, params):
+        session_id = f"cs_test_fake_{len(self.sessions) + 1}"
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'status': 'open',
+            'mode': params.get('mode', 'payment'),
+            'url': f"https://checkout.stripe.com/c/pay/{session_id}",
+            'expires_at': int(params['expires_at']) if params.get('expires_at') else None,
+            'metadata': {
+                key[len('metadata['):-1]: value
+                for key, value in params.items() if key.startswith('metadata[')
+            },
+            'line_item_count': len({key.split(']')[0] for key in params if key.startswith('line_items[')}),
+        }
+        self.sessions[session_id] = session
+        return session
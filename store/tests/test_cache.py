@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from unittest import skipUnless
+
+from store.cache import CacheNamespace, cache_stats
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+
+class CacheNamespaceBehaviour:
+    """Checks shared by every configured cache backend"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.namespace = CacheNamespace(f'test_{self.__class__.__name__}', timeout=60)
+        self.namespace.reset_stats()
+
+    def test_get_set_and_counters(self):
+        self.assertIsNone(self.namespace.get('missing'))
+        self.namespace.set('answer', {'value': 42})
+        self.assertEqual(self.namespace.get('answer'), {'value': 42})
+        self.assertEqual(self.namespace.stats()['hits'], 1)
+        self.assertEqual(self.namespace.stats()['misses'], 1)
+        self.assertIn(self.namespace.name, cache_stats())
+
+    def test_get_or_set_only_computes_once(self):
+        calls = []
+        for _ in range(3):
+            value = self.namespace.get_or_set('computed', lambda: calls.append(1) or 'value')
+        self.assertEqual(value, 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidate_switches_version(self):
+        self.namespace.set('key', 'old')
+        self.namespace.invalidate()
+        self.assertIsNone(self.namespace.get('key'))
+
+    def test_namespaces_are_isolated(self):
+        other = CacheNamespace(f'{self.namespace.name}_other')
+        self.namespace.set('key', 'mine')
+        other.invalidate()
+        self.assertIsNone(other.get('key'))
+        self.assertEqual(self.namespace.get('key'), 'mine')
+
+    def test_incr_is_a_counter(self):
+        self.assertEqual(self.namespace.incr('hits'), 1)
+        self.assertEqual(self.namespace.incr('hits'), 2)
+        self.assertEqual(self.namespace.incr('hits', 3), 5)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'store-cache-tests',
+}})
+class LocMemCacheNamespaceTest(CacheNamespaceBehaviour, TestCase):
+    pass
+
+
+class FileCacheNamespaceTest(CacheNamespaceBehaviour, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cls.cache_dir,
+        }})
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'store_cache_test',
+}})
+class DatabaseCacheNamespaceTest(CacheNamespaceBehaviour, TestCase):
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        super().setUp()
+
+
+@skipUnless(fakeredis, 'fakeredis is not installed')
+class RedisCacheNamespaceTest(CacheNamespaceBehaviour, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:6379/1',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        }})
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
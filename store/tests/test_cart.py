@@ -263,4 +263,57 @@ class TestCartIntegration(TestCase):
         self.assertEqual(len(cart), 1)
         items = cart.get_cart_items()
         self.assertEqual(len(items), 1)
-        self.assertEqual(items[0].product, self.product)
\ No newline at end of file
+        self.assertEqual(items[0].product, self.product)
+
+
+class CartProductResolverQueryTest(TestCase):
+    """Cart lines are resolved with a single, memoized product query"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.category = Category.objects.create(name='Plants', slug='plants')
+        self.products = [
+            Product.objects.create(
+                name=f'Plant {i}',
+                slug=f'plant-{i}',
+                price=Decimal('4.00'),
+                category=self.category,
+                stock=10,
+            )
+            for i in range(15)
+        ]
+        request = self.factory.get('/')
+        SessionMiddleware(lambda req: None).process_request(request)
+        request.session.save()
+        self.cart = Cart(request)
+        for product in self.products:
+            self.cart.add(product, quantity=1)
+
+    def test_cart_page_lookups_use_one_query(self):
+        """get_cart_items and get_shipping_cost share one product query"""
+        with self.assertNumQueries(1):
+            items = self.cart.get_cart_items()
+            self.cart.get_shipping_cost()
+            self.cart.get_cart_items()
+            for item in items:
+                item.product.category.name
+        self.assertEqual(len(items), 15)
+
+    def test_product_edit_invalidates_memoized_products(self):
+        """Saving a product forces the next lookup to re-fetch"""
+        self.cart.get_cart_items()
+        product = self.products[0]
+        product.price = Decimal('9.00')
+        product.save()
+
+        with self.assertNumQueries(1):
+            items = self.cart.get_cart_items()
+        prices = {item.product.id: item.price for item in items}
+        self.assertEqual(prices[product.id], Decimal('9.00'))
+
+    def test_deleted_product_is_skipped(self):
+        """Lines for deleted products are dropped without extra queries"""
+        self.products[0].delete()
+        with self.assertNumQueries(1):
+            items = self.cart.get_cart_items()
+        self.assertEqual(len(items), 14)
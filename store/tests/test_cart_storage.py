@@ -0,0 +1,112 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.test import RequestFactory, TestCase, override_settings
+from decimal import Decimal
+
+from store.cart import (
+    Cart, DatabaseCartStorage, SessionCartStorage, cart_count_cache, get_cart_item_count
+)
+from store.models import CartLine, Category, Product
+
+
+class CartStorageTestCase(TestCase):
+    def setUp(self):
+        cart_count_cache.invalidate()
+        self.factory = RequestFactory()
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                             stock=10, category=self.category)
+        self.amano = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'),
+                                            stock=10, category=self.category)
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+
+    def make_request(self, user=None):
+        request = self.factory.get('/')
+        SessionMiddleware(lambda req: None).process_request(request)
+        request.session.save()
+        request.user = user or AnonymousUser()
+        return request
+
+
+class SessionCartStorageTest(CartStorageTestCase):
+    """Test the default session backend"""
+
+    def test_unchanged_lines_do_not_modify_session(self):
+        request = self.make_request()
+        cart = Cart(request)
+        self.assertIsInstance(cart.storage, SessionCartStorage)
+        cart.add(self.cherry, quantity=2, override_quantity=True)
+        request.session.modified = False
+
+        cart.add(self.cherry, quantity=2, override_quantity=True)
+        self.assertTrue(cart.update(self.cherry.id, 2))
+        self.assertFalse(request.session.modified)
+
+        cart.update(self.cherry.id, 3)
+        self.assertTrue(request.session.modified)
+        self.assertEqual(get_cart_item_count(request), 3)
+
+    @override_settings(CART_STORAGE='database')
+    def test_anonymous_users_keep_session_carts(self):
+        self.assertIsInstance(Cart(self.make_request()).storage, SessionCartStorage)
+
+
+@override_settings(CART_STORAGE='database')
+class DatabaseCartStorageTest(CartStorageTestCase):
+    """Test the CartLine backend"""
+
+    def test_only_changed_lines_are_written(self):
+        request = self.make_request(self.user)
+        cart = Cart(request)
+        self.assertIsInstance(cart.storage, DatabaseCartStorage)
+        cart.add(self.cherry, quantity=2)
+        cart.add(self.amano, quantity=1, size='M')
+        self.assertNotIn('cart', request.session)
+
+        cart = Cart(request)
+        self.assertEqual(cart.get_item_count(), 3)
+        self.assertEqual(cart.cart[f'{self.amano.id}_M']['size'], 'M')
+        with self.assertNumQueries(0):
+            cart.update(self.cherry.id, 2)
+
+        cart.update(self.cherry.id, 5)
+        line = CartLine.objects.get(user=self.user, product=self.cherry)
+        self.assertEqual((line.quantity, line.price), (5, Decimal('3.00')))
+
+        cart.remove(self.amano, size='M')
+        self.assertEqual(CartLine.objects.filter(user=self.user).count(), 1)
+
+    def test_item_count_is_served_from_cache(self):
+        request = self.make_request(self.user)
+        Cart(request).add(self.cherry, quantity=4)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cart_item_count(request), 4)
+
+        cart_count_cache.invalidate()
+        self.assertEqual(get_cart_item_count(request), 4)
+        Cart(request).clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cart_item_count(request), 0)
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_deleting_a_product_drops_cached_counts(self):
+        request = self.make_request(self.user)
+        Cart(request).add(self.amano, quantity=2)
+        self.amano.delete()
+        self.assertEqual(get_cart_item_count(request), 0)
+
+    def test_session_cart_is_merged_on_login(self):
+        CartLine.objects.create(user=self.user, product=self.cherry, quantity=1, price=Decimal('3.00'))
+        session = self.client.session
+        session['cart'] = {
+            str(self.cherry.id): {'id': str(self.cherry.id), 'name': 'Cherry Shrimp',
+                                  'price': '3.00', 'quantity': 2, 'size': None},
+            str(self.amano.id): {'id': str(self.amano.id), 'name': 'Amano Shrimp',
+                                 'price': '4.00', 'quantity': 1, 'size': None},
+        }
+        session.save()
+
+        self.client.login(username='customer', password='password')
+        lines = dict(CartLine.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+        self.assertEqual(lines, {self.cherry.id: 3, self.amano.id: 1})
+        self.assertNotIn('cart', self.client.session)
@@ -0,0 +1,152 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from store.catalogue import CatalogueImporter, iter_records
+from store.models import SHIPPING_CLASS_LIVE, SHIPPING_CLASS_STANDARD, Category, Product
+
+
+def jsonl(*records):
+    return io.StringIO('\n'.join(json.dumps(record) for record in records) + '\n')
+
+
+class CatalogueImportTest(TestCase):
+    """Test the streaming catalogue importer"""
+
+    def setUp(self):
+        self.shrimp = Category.objects.create(name='Live Shrimp', slug='live-shrimp', order=10)
+        Category.objects.create(name='Shrimp Food', slug='shrimp-food', order=20)
+
+    def run_import(self, file, fmt='jsonl', **options):
+        return CatalogueImporter(index=False, **options).run(iter_records(file, fmt))
+
+    def test_rows_without_a_slug_match_by_name_or_get_allocated_slugs(self):
+        Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'), stock=5, category=self.shrimp)
+        records = [
+            {'name': 'Cherry Shrimp', 'category': 'live-shrimp', 'price': '3.99', 'stock': 10},
+            {'name': 'Cherry Shrimp', 'category': 'live-shrimp', 'price': '4.99', 'stock': 0},
+            {'name': 'Shrimp Food Pellets', 'category': 'shrimp-food', 'price': '2.50', 'stock': 3},
+            {'name': 'Cherry Shrimp', 'category': 'live-shrimp', 'price': '6.99', 'stock': 4},
+        ]
+
+        report = self.run_import(jsonl(*records), chunk_size=2)
+        self.assertEqual((report.rows, report.created, report.updated, report.error_count), (4, 3, 1, 0))
+        rows = Product.objects.filter(name='Cherry Shrimp').order_by('id')
+        self.assertEqual([(p.slug, p.price) for p in rows], [
+            ('cherry-shrimp', Decimal('3.99')), ('cherry-shrimp-1', Decimal('4.99')),
+            ('cherry-shrimp-2', Decimal('6.99')),
+        ])
+        self.assertFalse(Product.objects.get(slug='cherry-shrimp-1').available)
+        self.assertEqual(Product.objects.get(slug='cherry-shrimp-1').shipping_class, SHIPPING_CLASS_LIVE)
+        self.assertEqual(Product.objects.get(slug='shrimp-food-pellets').shipping_class, SHIPPING_CLASS_STANDARD)
+
+        # Re-running the file updates the same products
+        report = self.run_import(jsonl(*records), chunk_size=3)
+        self.assertEqual((report.created, report.updated), (0, 4))
+        self.assertEqual(Product.objects.count(), 4)
+
+    def test_repeated_slug_is_reported(self):
+        report = self.run_import(jsonl(
+            {'slug': 'cherry-shrimp', 'name': 'Cherry Shrimp', 'category': 'live-shrimp', 'price': '3.99',
+             'stock': 10},
+            {'slug': 'cherry-shrimp', 'name': 'Cherry Shrimp', 'category': 'live-shrimp', 'price': '4.99'},
+        ))
+
+        self.assertEqual((report.rows, report.created, report.error_count), (2, 1, 1))
+        self.assertEqual(report.errors[0], (2, "product 'cherry-shrimp' was already imported from line 1"))
+        product = Product.objects.get()
+        self.assertEqual((product.price, product.stock), (Decimal('3.99'), 10))
+
+    def test_reimport_updates_only_the_columns_present(self):
+        Product.objects.create(name='Amano Shrimp', slug='amano-shrimp', price=Decimal('5.00'),
+                               stock=40, description='Algae eaters', category=self.shrimp)
+        csv_file = io.StringIO('slug,name,category,price\namano-shrimp,Amano Shrimp XL,live-shrimp,6.50\n')
+
+        # Category map, existing slug check and the upsert (in a savepoint pair)
+        with self.assertNumQueries(5):
+            report = self.run_import(csv_file, fmt='csv')
+
+        self.assertEqual((report.created, report.updated), (0, 1))
+        product = Product.objects.get(slug='amano-shrimp')
+        self.assertEqual((product.name, product.price, product.stock, product.description),
+                         ('Amano Shrimp XL', Decimal('6.50'), 40, 'Algae eaters'))
+
+    def test_available_column_without_stock_keeps_stock(self):
+        Product.objects.create(name='Amano Shrimp', slug='amano-shrimp', price=Decimal('5.00'),
+                               stock=10, available=False, category=self.shrimp)
+        Product.objects.create(name='Ghost Shrimp', slug='ghost-shrimp', price=Decimal('2.00'),
+                               stock=8, category=self.shrimp)
+        csv_file = io.StringIO('slug,name,category,price,available\n'
+                               'amano-shrimp,Amano Shrimp,live-shrimp,5.00,yes\n'
+                               'ghost-shrimp,Ghost Shrimp,live-shrimp,2.00,yes\n')
+
+        report = self.run_import(csv_file, fmt='csv')
+
+        self.assertEqual((report.created, report.updated), (0, 2))
+        for product in Product.objects.all():
+            self.assertTrue(product.available)
+            self.assertGreater(product.stock, 0)
+
+    def test_category_records_and_invalid_rows(self):
+        report = self.run_import(jsonl(
+            {'type': 'category', 'slug': 'live-snails', 'name': 'Live Snails', 'order': 20},
+            {'name': 'Nerite Snail', 'category': 'live-snails', 'price': '3.49'},
+            {'name': 'Mystery Snail', 'category': 'live-snails', 'price': '-1'},
+            {'name': 'Crab', 'category': 'crabs', 'price': '9.99'},
+        ))
+
+        self.assertEqual((report.categories, report.created, report.error_count), (1, 1, 2))
+        self.assertEqual(Product.objects.get(slug='nerite-snail').category.slug, 'live-snails')
+        self.assertIn('price', report.errors[0][1])
+        self.assertIn("unknown category 'crabs'", report.errors[1][1])
+
+    def test_command_imports_the_sample_catalogue(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'catalogue', 'aquarium.jsonl')
+        out = StringIO()
+        call_command('import_catalogue', path, '--skip-index', stdout=out)
+        call_command('import_catalogue', path, '--skip-index', stdout=out)
+
+        self.assertEqual(Category.objects.count(), 8)
+        self.assertEqual(Product.objects.count(), 24)
+        self.assertIn('(0 created, 24 updated)', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+    def test_command_creates_missing_categories(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('name,category,price,stock\nJava Moss,plants-moss,7.99,4\n')
+        self.addCleanup(os.remove, file.name)
+
+        call_command('import_catalogue', file.name, '--create-categories', '--skip-index', stdout=StringIO())
+        self.assertEqual(Product.objects.get(slug='java-moss').category.name, 'Plants Moss')
+
+    def write_file(self, content, suffix='.csv'):
+        with tempfile.NamedTemporaryFile('wb', suffix=suffix, delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_command_reports_unreadable_lines(self):
+        header = b'name,category,price\nJava Moss,live-shrimp,7.99\n'
+        cases = [
+            (header + 'Caf\xe9 Moss,live-shrimp,7.99\n'.encode('latin-1'), 'Line 3: not UTF-8 text'),
+            (header + b'Big Moss,live-shrimp,' + b'9' * 200000 + b'\nAmano Shrimp,live-shrimp,5.99\n',
+             'Line 3: field larger than field limit'),
+        ]
+        for content, message in cases:
+            with self.subTest(message=message), self.assertRaisesMessage(CommandError, message):
+                call_command('import_catalogue', self.write_file(content), '--skip-index', stdout=StringIO())
+
+    def test_command_reports_the_lines_of_a_failed_chunk(self):
+        path = self.write_file(b'name,category,price\nJava Moss,live-shrimp,7.99\nAmano Shrimp,live-shrimp,5.99\n')
+
+        with patch.object(Product.objects, 'bulk_create', side_effect=DatabaseError('disk I/O error')):
+            with self.assertRaisesMessage(CommandError, 'Lines 2-3: disk I/O error'):
+                call_command('import_catalogue', path, '--skip-index', stdout=StringIO())
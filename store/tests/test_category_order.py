@@ -0,0 +1,60 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.context_processors import get_nav_categories, nav_cache
+from store.models import Category
+
+
+class CategoryReorderTest(TestCase):
+    """Test bulk category reordering"""
+
+    def setUp(self):
+        cache.clear()
+        self.shrimp = Category.objects.create(name='Shrimp', slug='shrimp', order=10)
+        self.plants = Category.objects.create(name='Plants', slug='plants', order=20)
+        self.snails = Category.objects.create(name='Snails', slug='snails', order=30)
+
+    def orders(self):
+        return list(Category.objects.order_by('order').values_list('slug', flat=True))
+
+    def test_reorder_validates_ids_and_updates_once(self):
+        with self.assertNumQueries(2):
+            result = Category.objects.reorder({
+                self.snails.pk: 5, self.shrimp.pk: 15, self.plants.pk: 20, 999: 40,
+            })
+        self.assertEqual((result.updated, result.unchanged, result.missing), (2, 1, [999]))
+        self.assertEqual(self.orders(), ['snails', 'shrimp', 'plants'])
+
+    def test_reorder_bumps_the_nav_cache_once(self):
+        get_nav_categories()
+        version = nav_cache.get_version()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Category.objects.reorder({self.snails.pk: 5, self.plants.pk: 15})
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(nav_cache.get_version(), version)
+        self.assertEqual([c['slug'] for c in get_nav_categories()], ['snails', 'shrimp', 'plants'])
+
+    def test_update_category_order_view(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+        payload = {'categories': [
+            {'id': self.plants.pk, 'order': 10},
+            {'id': self.shrimp.pk, 'order': 20},
+            {'id': self.snails.pk, 'order': 30},
+            {'id': 'bad', 'order': 40},
+        ]}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('store:update_category_order'), json.dumps(payload),
+                                        content_type='application/json')
+        # One query to check the ids, one CASE WHEN update
+        self.assertEqual(len([q for q in queries if 'store_category' in q['sql']]), 2)
+        self.assertEqual(response.json()['updated_count'], 2)
+        self.assertEqual(self.orders(), ['plants', 'shrimp', 'snails'])
@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from store.context_processors import categories_context
+from store.models import Category
+
+
+class CategoriesContextTest(TestCase):
+    """Test the cached, lazy nav_categories context processor"""
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        Category.objects.create(name='Shrimp', slug='shrimp', order=20)
+        Category.objects.create(name='Plants', slug='plants', order=10)
+
+    def test_unused_nav_categories_issue_no_queries(self):
+        with self.assertNumQueries(0):
+            categories_context(self.request)
+
+    def test_nav_categories_are_ordered_and_cached(self):
+        nav = categories_context(self.request)['nav_categories']
+        self.assertEqual([c['name'] for c in nav], ['Plants', 'Shrimp'])
+
+        with self.assertNumQueries(0):
+            nav = categories_context(self.request)['nav_categories']
+            self.assertEqual(len(nav), 2)
+
+    def test_category_changes_bump_version(self):
+        list(categories_context(self.request)['nav_categories'])
+
+        category = Category.objects.get(slug='shrimp')
+        category.order = 5
+        category.save()
+        nav = categories_context(self.request)['nav_categories']
+        self.assertEqual([c['slug'] for c in nav], ['shrimp', 'plants'])
+
+        category.delete()
+        nav = categories_context(self.request)['nav_categories']
+        self.assertEqual([c['slug'] for c in nav], ['plants'])
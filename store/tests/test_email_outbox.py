@@ -0,0 +1,106 @@
+import json
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from store.models import Category, Order, OrderItem, OutboundEmail, Product
+from store.outbox import claim_batch, deliver_batch, enqueue_order_emails, process_outbox, retry_delay
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAIL='owner@example.com',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_BACKOFF_BASE=60,
+)
+class EmailOutboxTest(TestCase):
+    """Test queued order email delivery"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.product = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                              stock=5, category=category)
+        self.order = Order.objects.create(email='customer@example.com', stripe_checkout_id='cs_test_outbox',
+                                          total_amount=Decimal('6.00'), shipping_name='Jane Doe')
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal('3.00'))
+
+    def test_enqueue_and_deliver_over_one_connection(self):
+        enqueue_order_emails(self.order)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 2)
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.open') as mock_open:
+            sent, failed = process_outbox()
+        self.assertEqual((sent, failed), (2, 0))
+        self.assertEqual(mock_open.call_count, 1)
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['customer@example.com', 'owner@example.com'])
+        self.assertTrue(all(m.alternatives[0][1] == 'text/html' for m in mail.outbox))
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(), 2)
+
+    def test_failure_backs_off_then_dead_letters(self):
+        enqueue_order_emails(self.order)
+        with patch('django.core.mail.EmailMessage.send', side_effect=ConnectionError('smtp down')):
+            self.assertEqual(process_outbox(), (0, 2))
+
+            email = OutboundEmail.objects.first()
+            self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('smtp down', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            # Not due yet, so nothing is claimed
+            self.assertEqual(claim_batch(), [])
+
+            for _ in range(2):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                process_outbox()
+
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_DEAD).count(), 2)
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_retry_delay_grows_and_is_capped(self):
+        with patch('store.outbox.random.uniform', return_value=1.0):
+            self.assertEqual(retry_delay(1), timedelta(seconds=60))
+            self.assertEqual(retry_delay(3), timedelta(seconds=240))
+            with override_settings(EMAIL_OUTBOX_BACKOFF_MAX=300):
+                self.assertEqual(retry_delay(10), timedelta(seconds=300))
+
+    def test_claimed_rows_are_not_claimed_twice_until_stale(self):
+        enqueue_order_emails(self.order)
+        self.assertEqual(len(claim_batch()), 2)
+        self.assertEqual(claim_batch(), [])
+
+        OutboundEmail.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        emails = claim_batch()
+        self.assertEqual(len(emails), 2)
+        self.assertEqual(deliver_batch(emails), (2, 0))
+
+    def test_command_drains_outbox(self):
+        enqueue_order_emails(self.order)
+        out = StringIO()
+        call_command('process_email_outbox', '--batch-size', '1', stdout=out)
+        self.assertIn('Sent 2 emails', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+
+    @patch('store.views.stripe.Webhook.construct_event')
+    def test_webhook_only_enqueues(self, mock_construct_event):
+        mock_construct_event.return_value = type('Event', (), {
+            'id': 'evt_test_outbox',
+            'type': 'checkout.session.completed',
+            'data': type('Data', (), {'object': type('Session', (), {'id': 'cs_test_outbox', 'shipping': None})()})(),
+        })()
+
+        response = self.client.post(reverse('store:stripe_webhook'), data=json.dumps({}),
+                                    content_type='application/json', HTTP_STRIPE_SIGNATURE='sig')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(self.order.outbound_emails.count(), 2)
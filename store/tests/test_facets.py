@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+
+from store.facets import get_facets, normalize_filters
+from store.models import Category, Product
+
+
+class ProductFacetsTest(TestCase):
+    """Test the single-query facet engine used by product_list"""
+
+    def setUp(self):
+        cache.clear()
+        self.shrimp = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.plants = Category.objects.create(name='Plants', slug='plants')
+        Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'), stock=10,
+                               size='small', category=self.shrimp)
+        Product.objects.create(name='Blue Dream Shrimp', price=Decimal('5.00'), stock=4,
+                               size='medium', category=self.shrimp)
+        Product.objects.create(name='Java Fern', price=Decimal('7.50'), stock=2,
+                               category=self.plants)
+        # stock=0 makes the product unavailable on save
+        Product.objects.create(name='Anubias', price=Decimal('9.00'), stock=0,
+                               available=True, category=self.plants)
+        Product.objects.create(name='Hidden Moss', price=Decimal('1.00'), stock=1,
+                               available=False, category=self.plants)
+
+    def test_facets_without_filters(self):
+        facets = get_facets(normalize_filters({}))
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(
+            [(c['name'], c['count']) for c in facets['categories']],
+            [('Plants', 1), ('Shrimp', 2)]
+        )
+        self.assertEqual(facets['price_range'], {
+            'min_price': Decimal('3.00'), 'max_price': Decimal('7.50')
+        })
+        self.assertEqual(facets['in_stock'], 3)
+        self.assertEqual(
+            [(s['value'], s['count']) for s in facets['sizes']],
+            [('small', 1), ('medium', 1)]
+        )
+
+    def test_category_filter_keeps_other_category_counts(self):
+        facets = get_facets(normalize_filters({'category': 'shrimp'}))
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(len(facets['categories']), 2)
+        self.assertEqual(facets['price_range']['max_price'], Decimal('5.00'))
+
+    def test_facets_follow_price_filter(self):
+        facets = get_facets(normalize_filters({'min_price': '4', 'max_price': 'abc'}))
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['price_range']['min_price'], Decimal('5.00'))
+
+    def test_facets_are_cached_and_invalidated(self):
+        filters = normalize_filters({'search': 'shrimp'})
+        get_facets(filters)
+        with self.assertNumQueries(0):
+            get_facets(normalize_filters({'search': '  shrimp '}))
+
+        Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'), stock=3,
+                               category=self.shrimp)
+        with self.assertNumQueries(1):
+            facets = get_facets(filters)
+        self.assertEqual(facets['total'], 3)
+
+    def test_product_list_uses_facet_total(self):
+        response = self.client.get(reverse('store:product_list'), {'category': 'plants'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['products'].paginator.count, 1)
+        self.assertEqual(response.context['total_products'], 3)
@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from store.inventory import (
+    InsufficientStock, apply_stock_levels, check_available, convert_reservations, decrement_stock,
+    parse_stock_levels, release_reservations, reserve_stock, with_available_to_sell
+)
+from store.models import Category, Order, OrderItem, Product, StockMovement, StockReservation
+
+
+class DecrementStockTest(TestCase):
+    """Test conditional stock decrements"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                             stock=5, category=self.category)
+        self.amano = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'),
+                                            stock=1, category=self.category)
+
+    def test_decrements_and_reports_per_line(self):
+        # One UPDATE per product, plus the savepoint pair from atomic()
+        with self.assertNumQueries(4):
+            results = decrement_stock([(self.cherry.id, 2), (self.amano.id, 3)])
+        self.assertEqual([r.decremented for r in results], [True, False])
+
+        self.cherry.refresh_from_db()
+        self.amano.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 3)
+        self.assertEqual(self.amano.stock, 1)
+
+    def test_selling_out_flips_available(self):
+        decrement_stock([(self.amano.id, 1)])
+        self.amano.refresh_from_db()
+        self.assertEqual(self.amano.stock, 0)
+        self.assertFalse(self.amano.available)
+
+    def test_lines_for_same_product_are_combined(self):
+        results = decrement_stock([(self.cherry.id, 3), (self.cherry.id, 3)])
+        self.assertEqual([r.decremented for r in results], [False, False])
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 5)
+
+    @patch('store.views.stripe.Webhook.construct_event')
+    def test_webhook_decrements_stock(self, mock_construct_event):
+        order = Order.objects.create(email='test@example.com', stripe_checkout_id='cs_test_stock',
+                                     total_amount=Decimal('6.00'))
+        OrderItem.objects.create(order=order, product=self.cherry, quantity=2, price=Decimal('3.00'))
+        mock_construct_event.return_value = type('Event', (), {
+            'id': 'evt_test_stock',
+            'type': 'checkout.session.completed',
+            'data': type('Data', (), {'object': type('Session', (), {'id': 'cs_test_stock', 'shipping': None})()})(),
+        })()
+
+        response = self.client.post(reverse('store:stripe_webhook'), data=json.dumps({}),
+                                    content_type='application/json', HTTP_STRIPE_SIGNATURE='sig')
+        self.assertEqual(response.status_code, 200)
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 3)
+
+
+class StockReservationTest(TestCase):
+    """Test checkout stock holds"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                             stock=5, category=self.category)
+        self.amano = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'),
+                                            stock=2, category=self.category)
+
+    def test_holds_reduce_available_to_sell(self):
+        reserve_stock('cs_hold_1', {self.cherry.id: 3, self.amano.id: 2})
+        # Expired holds no longer count, even before they are reaped
+        StockReservation.objects.create(product=self.cherry, stripe_checkout_id='cs_old', quantity=2,
+                                        expires_at=timezone.now() - timedelta(minutes=1))
+
+        with self.assertNumQueries(1):
+            available = dict(with_available_to_sell(Product.objects.all()).values_list('id', 'available_to_sell'))
+        self.assertEqual(available, {self.cherry.id: 2, self.amano.id: 0})
+
+        shortages = check_available({self.cherry.id: 3, self.amano.id: 1})
+        self.assertEqual([(s.product_id, s.available) for s in shortages], [(self.cherry.id, 2), (self.amano.id, 0)])
+
+    def test_reservation_is_all_or_nothing(self):
+        reserve_stock('cs_hold_1', {self.amano.id: 2})
+        with self.assertRaises(InsufficientStock):
+            reserve_stock('cs_hold_2', {self.cherry.id: 1, self.amano.id: 1})
+        self.assertFalse(StockReservation.objects.filter(stripe_checkout_id='cs_hold_2').exists())
+
+        release_reservations('cs_hold_1')
+        self.assertEqual(len(reserve_stock('cs_hold_2', {self.cherry.id: 1, self.amano.id: 1})), 2)
+
+    def test_conversion_decrements_stock_once(self):
+        reserve_stock('cs_paid', {self.cherry.id: 2})
+        results = convert_reservations('cs_paid', [(self.cherry.id, 2)])
+        self.assertTrue(results[0].decremented)
+
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 3)
+        self.assertEqual(check_available({self.cherry.id: 3}), [])
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_CONVERTED)
+
+    def test_reaper_expires_lapsed_holds_in_batches(self):
+        past = timezone.now() - timedelta(minutes=5)
+        for i in range(3):
+            StockReservation.objects.create(product=self.cherry, stripe_checkout_id=f'cs_lapsed_{i}',
+                                            quantity=1, expires_at=past)
+        reserve_stock('cs_live', {self.cherry.id: 1})
+
+        out = StringIO()
+        call_command('expire_stock_reservations', '--batch-size', '2', stdout=out)
+        self.assertIn('Expired 3 stock reservations', out.getvalue())
+        self.assertEqual(StockReservation.objects.filter(status=StockReservation.STATUS_EXPIRED).count(), 3)
+        self.assertEqual(StockReservation.objects.active().get().stripe_checkout_id, 'cs_live')
+
+    @override_settings(STOCK_RESERVATION_TTL=30 * 60)
+    @patch('store.views.payments.create_checkout_session')
+    def test_checkout_session_expires_beyond_stripes_minimum(self, mock_create):
+        mock_create.return_value = Mock(id='cs_expiry', url='https://checkout.stripe.com/pay/cs_expiry')
+        self.client.post(reverse('store:add_to_cart', args=[self.cherry.id]), {'quantity': 1})
+
+        response = self.client.post(reverse('store:checkout_cart'),
+                                    {'email': 'test@example.com', 'agree_to_terms': True})
+        self.assertEqual(response.status_code, 302)
+
+        # Stripe rejects sessions expiring under 30 minutes after it receives the request
+        expires_at = mock_create.call_args[0][0]['expires_at']
+        self.assertGreaterEqual(expires_at, time.time() + 30 * 60 + 30)
+        hold = StockReservation.objects.get(stripe_checkout_id='cs_expiry')
+        self.assertEqual(hold.expires_at.timestamp(), expires_at)
+
+    @patch('store.views.stripe.Webhook.construct_event')
+    def test_expired_session_webhook_releases_holds(self, mock_construct_event):
+        reserve_stock('cs_abandoned', {self.amano.id: 2})
+        mock_construct_event.return_value = type('Event', (), {
+            'id': 'evt_test_expired',
+            'type': 'checkout.session.expired',
+            'data': type('Data', (), {'object': type('Session', (), {'id': 'cs_abandoned'})()})(),
+        })()
+
+        response = self.client.post(reverse('store:stripe_webhook'), data=json.dumps({}),
+                                    content_type='application/json', HTTP_STRIPE_SIGNATURE='sig')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check_available({self.amano.id: 2}), [])
+
+
+class BulkStockUpdateTest(TestCase):
+    """Test the batched stock take engine and endpoint"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.products = [
+            Product.objects.create(name=f'Shrimp {i}', price=Decimal('3.00'), stock=10, category=self.category)
+            for i in range(5)
+        ]
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_parse_skips_invalid_fields(self):
+        levels = parse_stock_levels({'stock_1': '5', 'stock_x': '3', 'stock_2': '-1',
+                                     'stock_3': 'abc', 'csrfmiddlewaretoken': 'token'})
+        self.assertEqual(levels, {1: 5})
+
+    def test_apply_writes_changes_in_one_batch(self):
+        levels = {product.id: 10 for product in self.products}
+        levels[self.products[0].id] = 25
+        levels[self.products[1].id] = 0
+        levels[999999] = 4
+
+        # Lock-and-fetch, one UPDATE, one INSERT, plus the savepoint pair
+        with self.assertNumQueries(5):
+            changes = apply_stock_levels(levels, user=self.admin)
+        self.assertEqual([(c.product.id, c.previous_stock, c.change) for c in changes],
+                         [(self.products[0].id, 10, 15), (self.products[1].id, 10, -10)])
+
+        self.products[1].refresh_from_db()
+        self.assertEqual(self.products[1].stock, 0)
+        self.assertFalse(self.products[1].available)
+        movement = StockMovement.objects.get(product=self.products[0])
+        self.assertEqual((movement.previous_stock, movement.new_stock, movement.change), (10, 25, 15))
+        self.assertEqual(movement.user, self.admin)
+        self.assertEqual(StockMovement.objects.count(), 2)
+
+    def test_bulk_endpoint_returns_per_row_results(self):
+        self.client.login(username='admin', password='password')
+        data = {f'stock_{product.id}': '10' for product in self.products}
+        data[f'stock_{self.products[2].id}'] = '3'
+
+        response = self.client.post(reverse('store:update_stock_bulk'), data,
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'success': True,
+            'updated': 1,
+            'results': [{'id': self.products[2].id, 'stock': 3, 'change': -7, 'status': 'low'}],
+        })
+        self.assertEqual(StockMovement.objects.get().reason, StockMovement.REASON_BULK_UPDATE)
+
+
+class ConcurrentDecrementStockTest(TransactionTestCase):
+    """Concurrent decrements never oversell"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.product = Product.objects.create(name='Blue Dream Shrimp', price=Decimal('5.00'),
+                                              stock=10, category=category)
+
+    def test_threads_never_drive_stock_negative(self):
+        results = []
+        barrier = threading.Barrier(8)
+
+        def buy():
+            try:
+                barrier.wait()
+                for _ in range(20):
+                    try:
+                        results.extend(decrement_stock([(self.product.id, 3)]))
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.product.refresh_from_db()
+        succeeded = sum(1 for r in results if r.decremented)
+        self.assertEqual(succeeded, 3)
+        self.assertEqual(self.product.stock, 1)
+        self.assertGreaterEqual(self.product.stock, 0)
@@ -0,0 +1,43 @@
+from django.test import TestCase
+from decimal import Decimal
+
+from store.models import Order
+from store.order_search import plan_order_search, search_orders
+
+
+class OrderSearchPlannerTest(TestCase):
+    """Test order search planning"""
+
+    def setUp(self):
+        self.alice = Order.objects.create(email='alice@example.com', stripe_checkout_id='cs_search_1',
+                                          shipping_name='Alice Smith', order_reference='SSS-AB12CD34',
+                                          total_amount=Decimal('10.00'))
+        self.bob = Order.objects.create(email='bob@shrimp.test', stripe_checkout_id='cs_search_2',
+                                        shipping_name='Bob Jones', order_reference='SSS-1234ABCD',
+                                        total_amount=Decimal('12.00'))
+
+    def search(self, query):
+        return set(search_orders(Order.objects.all(), query).values_list('id', flat=True))
+
+    def test_strategies_follow_query_shape(self):
+        self.assertEqual(plan_order_search('  ').strategy, 'none')
+        self.assertEqual(plan_order_search('sss-ab12').strategy, 'reference')
+        self.assertEqual(plan_order_search('42').strategy, 'id')
+        self.assertEqual(plan_order_search('bob@shrimp').strategy, 'email')
+        self.assertEqual(plan_order_search('Al').strategy, 'text_prefix')
+        self.assertEqual(plan_order_search('Smith').strategy, 'text')
+
+    def test_reference_lookup_is_case_insensitive_prefix(self):
+        self.assertEqual(self.search('sss-ab12'), {self.alice.id})
+        self.assertEqual(self.search('SSS-AB12CD34'), {self.alice.id})
+
+    def test_digits_match_id_or_reference(self):
+        self.assertEqual(self.search(str(self.bob.id)), {self.bob.id})
+        self.assertEqual(self.search('1234'), {self.bob.id})
+        self.assertEqual(self.search('9' * 30), set())
+
+    def test_text_searches_email_and_name(self):
+        self.assertEqual(self.search('JONES'), {self.bob.id})
+        self.assertEqual(self.search('example.com'), {self.alice.id})
+        self.assertEqual(self.search('Bo'), {self.bob.id})
+        self.assertEqual(self.search('shrimp.test'), {self.bob.id})
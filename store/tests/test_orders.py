@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from decimal import Decimal
+
+from store.models import Category, Order, Product, StockReservation
+from store.inventory import InsufficientStock
+from store.orders import OrderBuilder, OrderLine
+
+
+class OrderBuilderTest(TestCase):
+    """Test the checkout order builder"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                             stock=5, category=self.category)
+        self.amano = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'),
+                                            stock=2, category=self.category)
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+
+    def builder(self, *lines):
+        return OrderBuilder(lines, 'customer@example.com', user=self.user, shipping_cost=Decimal('12.00'))
+
+    def test_stock_is_checked_per_product_in_one_query(self):
+        builder = self.builder(
+            OrderLine(self.cherry, 3, Decimal('3.00'), 'S'),
+            OrderLine(self.cherry, 3, Decimal('3.00'), 'M'),
+            OrderLine(self.amano, 2, Decimal('4.00'), None),
+        )
+        with self.assertNumQueries(1):
+            shortages = builder.check_stock()
+        self.assertEqual([(s.product_id, s.requested, s.available) for s in shortages], [(self.cherry.id, 6, 5)])
+
+    def test_create_inserts_order_and_items_with_totals(self):
+        builder = self.builder(
+            OrderLine(self.cherry, 2, Decimal('3.00'), 'S'),
+            OrderLine(self.amano, 1, Decimal('4.00'), None),
+        )
+        # Locked stock check, holds insert, order insert and items bulk insert (plus savepoints)
+        with self.assertNumQueries(8):
+            order = builder.create(stripe_checkout_id='cs_builder_1')
+        self.assertEqual(
+            sorted(StockReservation.objects.values_list('product_id', 'quantity', 'stripe_checkout_id')),
+            sorted([(self.cherry.id, 2, 'cs_builder_1'), (self.amano.id, 1, 'cs_builder_1')]),
+        )
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('22.00'))
+        self.assertEqual((order.user, order.status), (self.user, 'pending'))
+        self.assertTrue(order.order_reference.startswith('SSS-'))
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price', 'size')),
+            sorted([(self.cherry.id, 2, Decimal('3.00'), 'S'), (self.amano.id, 1, Decimal('4.00'), None)]),
+        )
+
+    def test_create_rejects_lines_that_sold_out(self):
+        builder = self.builder(OrderLine(self.amano, 2, Decimal('4.00'), None))
+        self.assertEqual(builder.check_stock(), [])
+        Product.objects.filter(pk=self.amano.pk).update(stock=1)
+
+        with self.assertRaises(InsufficientStock) as raised:
+            builder.create(stripe_checkout_id='cs_builder_2')
+        self.assertEqual(raised.exception.shortages[0].available, 1)
+        self.assertFalse(Order.objects.exists())
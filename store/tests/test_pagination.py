@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+
+from store.models import Category, Order, Product
+from store.pagination import CursorPaginator, cached_totals, total_cache
+
+
+class CursorPaginatorTest(TestCase):
+    """Test keyset pagination"""
+
+    def setUp(self):
+        total_cache.invalidate()
+        created = timezone.now()
+        for i in range(7):
+            order = Order.objects.create(email=f'customer{i}@example.com', stripe_checkout_id=f'cs_page_{i}',
+                                         total_amount=Decimal('10.00'), status='paid' if i % 2 else 'pending')
+            # Ties on created_at must be broken by id
+            Order.objects.filter(pk=order.pk).update(created_at=created)
+        self.expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def paginator(self):
+        return CursorPaginator(Order.objects.all(), ['-created_at', '-id'], per_page=3)
+
+    def test_walks_forward_and_back(self):
+        paginator = self.paginator()
+        with self.assertNumQueries(1):
+            first = paginator.page()
+        self.assertEqual([o.id for o in first], self.expected[:3])
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+        with self.assertNumQueries(1):
+            second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertEqual([o.id for o in second], self.expected[3:6])
+        self.assertEqual([o.id for o in third], self.expected[6:])
+        self.assertFalse(third.has_next)
+        self.assertIsNone(third.next_cursor)
+
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual([o.id for o in back], self.expected[3:6])
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+        self.assertEqual([o.id for o in paginator.page(back.previous_cursor)], self.expected[:3])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        page = self.paginator().page('not-a-cursor')
+        self.assertEqual([o.id for o in page], self.expected[:3])
+
+    def test_totals_are_cached(self):
+        orders = Order.objects.filter(status='paid')
+        self.assertEqual(cached_totals(orders)['count'], 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_totals(orders)['count'], 3)
+
+    def test_admin_listings_use_cursor_pages(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        response = self.client.get(reverse('store:order_management'), {'status': 'pending'})
+        page = response.context['orders']
+        self.assertEqual(response.context['order_count'], 4)
+        self.assertEqual(response.context['total_revenue'], Decimal('0'))
+        self.assertEqual(len(page), 4)
+        self.assertFalse(page.has_other_pages())
+
+        Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'), stock=3,
+                               category=Category.objects.create(name='Shrimp', slug='shrimp'))
+        response = self.client.get(reverse('store:stock_management'))
+        self.assertEqual(response.context['product_count'], 1)
+        self.assertIn('status=pending', self.client.get(
+            reverse('store:order_management'), {'status': 'pending', 'cursor': 'x'}
+        ).context['orders'].first_query)
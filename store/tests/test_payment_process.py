@@ -131,7 +131,7 @@ class PaymentProcessTest(TestCase):
         self.assertRedirects(response, reverse('store:cart_view'))
         print("✓ Empty cart redirects correctly")
     
-    @patch('stripe.checkout.Session.create')
+    @patch('stripe.checkout.SessionService.create')
     def test_stripe_integration(self, mock_stripe_create):
         """Test Stripe integration (mocked)"""
         print("\n=== TESTING STRIPE INTEGRATION ===")
@@ -395,7 +395,7 @@ class PaymentProcessTest(TestCase):
         print("✓ Checkout form displayed")
         
         # Step 4: Mock Stripe payment processing
-        with patch('stripe.checkout.Session.create') as mock_stripe:
+        with patch('stripe.checkout.SessionService.create') as mock_stripe:
             mock_session = MagicMock()
             mock_session.id = 'cs_test_complete_flow'
             mock_session.url = 'https://checkout.stripe.com/pay/test'
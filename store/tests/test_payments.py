@@ -0,0 +1,83 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from io import StringIO
+from unittest.mock import patch
+
+import stripe
+
+from store import payments
+from store.tests.benchmark_checkout import run_benchmark
+from store.tests.fake_stripe import FakeStripeServer
+
+PARAMS = {
+    'mode': 'payment',
+    'line_items': [{'price_data': {'currency': 'gbp', 'product_data': {'name': 'Cherry Shrimp'},
+                                   'unit_amount': 300}, 'quantity': 2}],
+    'metadata': {'cart': 'true'},
+    'success_url': 'https://example.com/success/',
+    'cancel_url': 'https://example.com/cancel/',
+}
+
+
+class PaymentGatewayTest(SimpleTestCase):
+    """Test the Stripe gateway against a local fake Stripe server"""
+
+    def setUp(self):
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+        self.settings = override_settings(STRIPE_API_BASE=self.server.url, STRIPE_SECRET_KEY='sk_test_fake',
+                                          STRIPE_TIMEOUT=2, STRIPE_TIMEOUT_BUDGET=5, STRIPE_MAX_RETRIES=2)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.original_api_key = stripe.api_key
+        self.addCleanup(setattr, stripe, 'api_key', self.original_api_key)
+        payments.reset_stripe()
+        self.addCleanup(payments.reset_stripe)
+
+    def test_sessions_reuse_one_connection(self):
+        for i in range(3):
+            session = payments.create_checkout_session(PARAMS)
+        self.assertEqual(session.id, 'cs_test_fake_3')
+        self.assertEqual(session.metadata['cart'], 'true')
+        self.assertEqual(self.server.sessions[session.id]['line_item_count'], 1)
+        self.assertEqual(self.server.connections, 1)
+        # The stripe module's global client is left alone
+        self.assertIsNone(stripe.default_http_client)
+
+    @patch('store.payments.backoff_delay', return_value=0)
+    def test_retries_reuse_the_idempotency_key(self, mock_delay):
+        self.server.fail_first = 2
+        session = payments.create_checkout_session(PARAMS)
+        self.assertEqual(session.id, 'cs_test_fake_1')
+        keys = {key for method, path, params, key in self.server.requests}
+        self.assertEqual((len(self.server.requests), len(keys)), (3, 1))
+
+    @patch('store.payments.backoff_delay', return_value=0)
+    def test_gives_up_after_max_retries(self, mock_delay):
+        self.server.fail_first = 10
+        with self.assertRaises(stripe.error.APIError):
+            payments.create_checkout_session(PARAMS, max_retries=1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_attempt_client_gets_the_attempt_timeout(self):
+        client = payments.get_client(1.5)
+        self.assertIsInstance(client, stripe.StripeClient)
+        with patch('stripe.RequestsClient', wraps=stripe.RequestsClient) as requests_client:
+            payments.create_checkout_session(PARAMS, timeout=1.5)
+        self.assertEqual(requests_client.call_args.kwargs['timeout'], 1.5)
+
+    def test_attempts_are_bounded_by_the_timeout(self):
+        self.server.latency = 1
+        with self.assertRaises(stripe.error.APIConnectionError):
+            payments.create_checkout_session(PARAMS, timeout=0.2, budget=0.5)
+        self.assertLessEqual(len(self.server.requests), 2)
+
+    def test_async_variant_and_expire(self):
+        session = async_to_sync(payments.acreate_checkout_session)(PARAMS)
+        expired = payments.expire_checkout_session(session.id)
+        self.assertEqual(expired.status, 'expired')
+
+    def test_benchmark(self):
+        out = StringIO()
+        run_benchmark(count=6, concurrency=2, latency=0, stdout=out)
+        self.assertIn('HTTP requests:     6 over', out.getvalue())
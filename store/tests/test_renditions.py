@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from store.models import Category, Product
+from store.renditions import generate_renditions, image_url, is_current
+
+
+def make_image(name='photo.jpg', size=(1200, 800), fmt='JPEG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+class ImageRenditionTest(TestCase):
+    """Test responsive image renditions"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.settings = override_settings(MEDIA_ROOT=media_root, IMAGE_RENDITION_WIDTHS=(320, 640, 1024))
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+
+    def create_product(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'), stock=5,
+                                             category=self.category, image=image)
+        product.refresh_from_db()
+        return product
+
+    def test_renditions_are_generated_on_save(self):
+        product = self.create_product(make_image())
+
+        self.assertTrue(is_current(product))
+        renditions = product.image_renditions['renditions']
+        self.assertEqual([r['width'] for r in renditions], [320, 640, 1024])
+        for rendition in renditions:
+            self.assertTrue(rendition['webp'].endswith(f".{rendition['width']}w.webp"))
+            self.assertTrue(rendition['fallback'].endswith(f".{rendition['width']}w.jpg"))
+            with default_storage.open(rendition['webp']) as f:
+                image = Image.open(f)
+                self.assertEqual((image.format, image.width), ('WEBP', rendition['width']))
+
+    def test_small_images_are_not_upscaled_and_keep_transparency(self):
+        category = Category(name='Plants', slug='plants', image=make_image('leaf.png', (500, 500), 'PNG', 'RGBA'))
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        category.refresh_from_db()
+
+        renditions = category.image_renditions['renditions']
+        self.assertEqual([r['width'] for r in renditions], [320, 500])
+        self.assertTrue(renditions[0]['fallback'].endswith('.png'))
+
+    def test_replacing_the_image_removes_old_renditions(self):
+        product = self.create_product(make_image('first.jpg'))
+        old = product.image_renditions['renditions'][0]['webp']
+
+        product.image = make_image('second.jpg', (700, 400))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertEqual([r['width'] for r in product.image_renditions['renditions']], [320, 640, 700])
+        self.assertTrue(image_url(product, 600).endswith('.640w.jpg'))
+
+    def test_unreadable_images_fall_back_to_the_original(self):
+        product = self.create_product(SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg'))
+
+        self.assertEqual(product.image_renditions, {})
+        self.assertEqual(image_url(product, 320), product.image.url)
+
+    def test_template_tag_renders_webp_and_fallback_srcsets(self):
+        product = self.create_product(make_image())
+        html = Template(
+            '{% load store_images %}{% responsive_image product class="product-image" %}'
+        ).render(Context({'product': product}))
+
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn('.320w.webp 320w', html)
+        self.assertIn('.1024w.jpg 1024w', html)
+        self.assertIn('class="product-image"', html)
+        self.assertIn('alt="Cherry Shrimp"', html)
+
+    def test_backfill_command_renders_missing_renditions(self):
+        # Saved without running on-commit callbacks, like images uploaded before renditions existed
+        product = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'), stock=2,
+                                         category=self.category, image=make_image())
+        self.assertFalse(is_current(product))
+
+        out = StringIO()
+        call_command('generate_image_renditions', '--workers', '0', stdout=out)
+        product.refresh_from_db()
+
+        self.assertTrue(is_current(product))
+        self.assertIn('Rendered 1 images', out.getvalue())
+        self.assertEqual(generate_renditions(product), 0)
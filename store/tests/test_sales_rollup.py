@@ -0,0 +1,118 @@
+from datetime import date, datetime, time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from io import StringIO
+
+from store.analytics import add_months, get_sales_summary, rebuild_daily_sales
+from store.models import Category, DailySalesRollup, Order, OrderItem, Product
+
+
+class DailySalesRollupTest(TestCase):
+    """Test the incrementally maintained sales rollup"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.product = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                              stock=50, category=category)
+        self.counter = 0
+
+    def make_order(self, email, day, quantity=2, status='pending'):
+        self.counter += 1
+        order = Order.objects.create(email=email, stripe_checkout_id=f'cs_rollup_{self.counter}',
+                                     total_amount=Decimal('3.00') * quantity)
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price=Decimal('3.00'))
+        created = timezone.make_aware(datetime.combine(day, time(12)))
+        Order.objects.filter(pk=order.pk).update(created_at=created)
+        order = Order.objects.get(pk=order.pk)
+        if status != 'pending':
+            order.status = status
+            order.save()
+        return order
+
+    def rollup(self):
+        return {
+            row.date: (row.orders, row.revenue, row.customers, row.items)
+            for row in DailySalesRollup.objects.all()
+        }
+
+    def test_paid_orders_update_rollup(self):
+        order = self.make_order('a@example.com', date(2026, 3, 5))
+        self.assertEqual(self.rollup(), {})
+
+        order.status = 'paid'
+        order.save()
+        # Moving on to shipped is still the same sale
+        order.status = 'shipped'
+        order.save()
+        self.assertEqual(self.rollup(), {date(2026, 3, 5): (1, Decimal('6.00'), 1, 2)})
+
+        order.status = 'cancelled'
+        order.save()
+        self.assertEqual(self.rollup(), {date(2026, 3, 5): (0, Decimal('0.00'), 0, 0)})
+
+    def test_customers_counted_once_per_month(self):
+        later = self.make_order('a@example.com', date(2026, 3, 20), status='paid')
+        earlier = self.make_order('a@example.com', date(2026, 3, 5), status='paid')
+        self.make_order('a@example.com', date(2026, 4, 1), status='paid')
+
+        rollup = self.rollup()
+        self.assertEqual(rollup[date(2026, 3, 5)][2], 1)
+        self.assertEqual(rollup[date(2026, 3, 20)][2], 0)
+        self.assertEqual(rollup[date(2026, 4, 1)][2], 1)
+
+        # Deleting the first order moves the customer to their next sale day
+        earlier.delete()
+        rollup = self.rollup()
+        self.assertEqual(rollup[date(2026, 3, 5)], (0, Decimal('0.00'), 0, 0))
+        self.assertEqual(rollup[date(2026, 3, 20)][2], 1)
+        self.assertEqual(later.status, 'paid')
+
+    def test_rebuild_matches_incremental(self):
+        self.make_order('a@example.com', date(2026, 2, 10), status='paid')
+        self.make_order('b@example.com', date(2026, 2, 10), quantity=3, status='delivered')
+        self.make_order('a@example.com', date(2026, 2, 11), status='paid')
+        self.make_order('c@example.com', date(2026, 3, 1), status='pending')
+        incremental = self.rollup()
+
+        DailySalesRollup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_sales_rollup', stdout=out)
+        self.assertIn('Wrote 2 daily rollup rows', out.getvalue())
+        self.assertEqual(self.rollup(), incremental)
+
+        rebuild_daily_sales(since=date(2026, 2, 20))
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_summary_uses_calendar_months(self):
+        self.assertEqual(add_months(date(2026, 1, 31), -1), date(2025, 12, 1))
+        self.make_order('a@example.com', date(2026, 2, 27), status='paid')
+        self.make_order('b@example.com', date(2026, 3, 31), quantity=1, status='paid')
+
+        with self.assertNumQueries(2):
+            summary = get_sales_summary(months=6, today=date(2026, 3, 31))
+
+        self.assertEqual([m['month'] for m in summary['months']],
+                         [date(2025, 10, 1), date(2025, 11, 1), date(2025, 12, 1),
+                          date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        self.assertEqual(summary['months'][-2]['orders'], 1)
+        self.assertEqual(summary['months'][-1]['revenue'], Decimal('3.00'))
+        self.assertEqual(summary['total'], {'orders': 2, 'revenue': Decimal('9.00'), 'items': 3})
+
+    def test_dashboard_reads_rollup(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.make_order('a@example.com', timezone.localdate(), status='paid')
+        self.make_order('b@example.com', timezone.localdate())
+
+        response = self.client.get(reverse('store:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_orders'], 2)  # Every order, not just sales
+        self.assertEqual(response.context['revenue_this_month'], Decimal('6.00'))
+        self.assertEqual(response.context['active_customers'], 1)
+        self.assertEqual(len(response.context['monthly_orders']), 6)
+        self.assertEqual(response.context['monthly_orders'][-1]['count'], 1)
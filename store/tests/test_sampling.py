@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import TestCase
+from decimal import Decimal
+
+from store.models import Category, Product
+from store.sampling import get_product_pool, sample_products
+
+
+class ProductSamplingTest(TestCase):
+    """Test random product sampling from cached id pools"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.other = Category.objects.create(name='Plants', slug='plants')
+        self.products = [
+            Product.objects.create(name=f'Shrimp {i}', price=Decimal('3.00'), stock=5,
+                                   featured=i % 2 == 0, category=self.category)
+            for i in range(6)
+        ]
+        Product.objects.create(name='Java Fern', price=Decimal('3.00'), stock=5,
+                               featured=True, category=self.other)
+
+    def test_sample_respects_pool_and_exclusions(self):
+        excluded = self.products[0]
+        sample = sample_products(4, category_id=self.category.id, exclude_ids=[excluded.id])
+        self.assertEqual(len(sample), 4)
+        self.assertEqual(len({p.id for p in sample}), 4)
+        for product in sample:
+            self.assertEqual(product.category_id, self.category.id)
+            self.assertNotEqual(product.id, excluded.id)
+
+    def test_featured_pool(self):
+        self.assertEqual(len(get_product_pool(featured=True)), 4)
+
+    def test_sampling_uses_cached_pool(self):
+        sample_products(4, featured=True)
+        with self.assertNumQueries(1):
+            sample = sample_products(4, featured=True)
+        self.assertTrue(all(p.featured for p in sample))
+        with self.assertNumQueries(0):
+            sample[0].category.name
+
+    def test_stock_change_invalidates_pool(self):
+        pool = get_product_pool(category_id=self.category.id)
+        self.assertEqual(len(pool), 6)
+
+        product = self.products[1]
+        product.stock = 0
+        product.save()
+        self.assertNotIn(product.id, get_product_pool(category_id=self.category.id))
+
+    def test_empty_pool(self):
+        empty = Category.objects.create(name='Snails', slug='snails')
+        self.assertEqual(sample_products(4, category_id=empty.id), [])
@@ -0,0 +1,86 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+from io import StringIO
+
+from store.models import Category, Product
+from store.search import SimpleSearchBackend, format_snippet, get_search_backend
+
+
+class ProductSearchTest(TestCase):
+    """Test the full-text product search backend"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(
+            name='Cherry Shrimp',
+            description='Hardy red dwarf shrimp for beginners.',
+            price=Decimal('3.00'), stock=10, category=self.category,
+        )
+        self.food = Product.objects.create(
+            name='Shrimp Pellets',
+            description='Sinking food suitable for cherry shrimp and snails.',
+            price=Decimal('4.00'), stock=10, category=self.category,
+        )
+        self.moss = Product.objects.create(
+            name='Java Moss',
+            description='Easy moss, loved by shrimp.',
+            price=Decimal('5.00'), stock=10, category=self.category,
+        )
+
+    def search(self, query):
+        backend = get_search_backend()
+        return list(backend.search(Product.objects.all(), query))
+
+    def test_backend_matches_database(self):
+        if connection.vendor == 'sqlite':
+            self.assertEqual(get_search_backend().__class__.__name__, 'SQLiteSearchBackend')
+
+    def test_results_are_relevance_ordered(self):
+        results = self.search('cherry')
+        self.assertEqual([p.id for p in results], [self.cherry.id, self.food.id])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_prefix_terms_match(self):
+        self.assertEqual([p.id for p in self.search('pell')], [self.food.id])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        self.moss.description = 'Moss <b>loved</b> by shrimp'
+        self.moss.save()
+        result = self.search('moss')[0]
+        html = format_snippet(result.search_snippet)
+        self.assertIn('<mark>', html)
+        self.assertIn('&lt;b&gt;', html)
+
+    def test_index_follows_save_and_delete(self):
+        self.moss.name = 'Christmas Moss'
+        self.moss.save()
+        self.assertEqual([p.id for p in self.search('christmas')], [self.moss.id])
+
+        self.moss.delete()
+        self.assertEqual(self.search('christmas'), [])
+
+    def test_query_syntax_is_not_injected(self):
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(len(self.search('cherry" (')), 2)
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 products', out.getvalue())
+        self.assertEqual(len(self.search('shrimp')), 3)
+
+    def test_simple_backend_fallback(self):
+        results = list(SimpleSearchBackend().search(Product.objects.all(), 'moss'))
+        self.assertEqual(results[0].id, self.moss.id)
+
+    def test_product_list_search(self):
+        response = self.client.get(reverse('store:product_list'), {'q': 'cherry'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sort'], 'relevance')
+        self.assertEqual(
+            [p.id for p in response.context['products']], [self.cherry.id, self.food.id]
+        )
+        self.assertContains(response, '<mark>')
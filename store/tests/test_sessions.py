@@ -0,0 +1,101 @@
+import time
+from decimal import Decimal
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.models import Category, Product
+from store.sessions import REFRESHED_AT_KEY, LazySessionMiddleware, reset_session_stats, session_stats
+
+
+@override_settings(SESSION_SAVE_EVERY_REQUEST=False, SESSION_REFRESH_INTERVAL=3600,
+                   SESSION_ENGINE='django.contrib.sessions.backends.db')
+class LazySessionMiddlewareTest(TestCase):
+    """Test that sessions are only written when they change"""
+
+    def setUp(self):
+        reset_session_stats()
+        self.factory = RequestFactory()
+
+    def request(self, session_key=None, view=None):
+        request = self.factory.get('/')
+        if session_key:
+            request.COOKIES['sessionid'] = session_key
+        middleware = LazySessionMiddleware(view or (lambda request: HttpResponse('ok')))
+        response = middleware(request)
+        return request, response
+
+    def touch_cart(self, request):
+        request.session['cart'] = {'1': {'id': '1', 'quantity': 1}}
+        return HttpResponse('ok')
+
+    def test_browsing_does_not_write_sessions(self):
+        request, response = self.request()
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(session_stats()['writes'], 0)
+
+    def test_cookieless_request_does_not_vary_on_cookie(self):
+        request, response = self.request()
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_changed_session_is_saved_then_left_alone(self):
+        request, response = self.request(view=self.touch_cart)
+        session_key = response.cookies['sessionid'].value
+        self.assertEqual(session_stats()['writes'], 1)
+
+        # Within the refresh interval an unchanged session is not rewritten
+        request, response = self.request(session_key)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(request.session['cart']['1']['quantity'], 1)
+
+        stats = session_stats()
+        self.assertEqual((stats['requests'], stats['writes']), (2, 1))
+        self.assertEqual(stats['writes_per_request'], 0.5)
+
+    def test_expiry_is_refreshed_after_the_interval(self):
+        request, response = self.request(view=self.touch_cart)
+        session_key = response.cookies['sessionid'].value
+        session = SessionStore(session_key)
+        session[REFRESHED_AT_KEY] = int(time.time()) - 3601
+        session.save()
+
+        request, response = self.request(session_key)
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(session_stats()['refreshes'], 1)
+        self.assertGreaterEqual(SessionStore(session_key)[REFRESHED_AT_KEY], int(time.time()) - 1)
+
+    def test_unknown_session_cookie_is_not_recreated(self):
+        request, response = self.request('doesnotexist1234567890')
+        self.assertEqual(session_stats()['writes'], 0)
+
+
+@override_settings(SESSION_SAVE_EVERY_REQUEST=False, SESSION_ENGINE='django.contrib.sessions.backends.db')
+class AnonymousBrowsingSessionTest(TestCase):
+    """Test that browsing the shop and viewing the cart never creates a session"""
+
+    def setUp(self):
+        reset_session_stats()
+        category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.product = Product.objects.create(name='Cherry Shrimp', slug='cherry-shrimp', price=Decimal('3.00'),
+                                              stock=5, category=category)
+
+    def test_anonymous_browse_sets_no_cookie_and_writes_no_session(self):
+        urls = [reverse('store:product_detail', args=[self.product.slug]), reverse('store:cart_view')]
+
+        with CaptureQueriesContext(connection) as queries:
+            for url in urls:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('sessionid', response.cookies)
+
+        self.assertFalse([q for q in queries if 'django_session' in q['sql']])
+        self.assertEqual(session_stats()['writes'], 0)
+
+    def test_adding_to_the_cart_creates_the_session(self):
+        response = self.client.post(reverse('store:add_to_cart', args=[self.product.pk]), {'quantity': 1})
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(session_stats()['writes'], 1)
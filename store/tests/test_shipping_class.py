@@ -0,0 +1,68 @@
+from django.core.management import call_command
+from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+
+from store.models import Category, Product, classify_shipping_class
+
+
+class ClassifyShippingClassTest(TestCase):
+    """Test the compiled live-animal matcher"""
+
+    def test_live_animals(self):
+        self.assertEqual(classify_shipping_class('Red Cherry Shrimp', 'Neocaridina'), 'live')
+        self.assertEqual(classify_shipping_class('Nerite Snail', 'Snails'), 'live')
+        self.assertEqual(classify_shipping_class('Ember Tetra', 'Fish'), 'live')
+
+    def test_food_is_standard(self):
+        self.assertEqual(classify_shipping_class('Shrimp Pellets', 'Food'), 'standard')
+        self.assertEqual(classify_shipping_class('Frozen Bloodworm', 'Fish Food'), 'standard')
+
+    def test_live_keyword_always_live(self):
+        self.assertEqual(classify_shipping_class('Live Daphnia', 'Food'), 'live')
+
+    def test_equipment_is_standard(self):
+        self.assertEqual(classify_shipping_class('Sponge Filter', 'Equipment'), 'standard')
+
+
+class ProductShippingClassTest(TestCase):
+    """Test that the shipping class is stored on save"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Equipment', slug='equipment')
+        self.product = Product.objects.create(
+            name='Cherry Shrimp Breeding Box',
+            price=Decimal('8.00'),
+            stock=5,
+            category=self.category,
+        )
+        self.filter = Product.objects.create(
+            name='Sponge Filter',
+            price=Decimal('6.00'),
+            stock=5,
+            category=self.category,
+        )
+
+    def test_product_save_sets_shipping_class(self):
+        self.assertEqual(self.product.shipping_class, 'live')
+        self.assertTrue(self.product.is_shrimp_product)
+        self.assertFalse(self.filter.is_shrimp_product)
+
+    def test_is_shrimp_product_reads_stored_column(self):
+        product = Product.objects.get(pk=self.filter.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(product.is_shrimp_product)
+
+    def test_category_rename_reclassifies_products(self):
+        self.category.name = 'Livestock'
+        self.category.save()
+        self.filter.refresh_from_db()
+        self.assertEqual(self.filter.shipping_class, 'live')
+
+    def test_backfill_command(self):
+        Product.objects.filter(pk=self.product.pk).update(shipping_class='standard')
+        out = StringIO()
+        call_command('backfill_shipping_class', stdout=out)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.shipping_class, 'live')
+        self.assertIn('Updated 1 products', out.getvalue())
@@ -0,0 +1,59 @@
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from store.models import Category, Product, allocate_slugs, generate_unique_slug, save_with_unique_slug
+
+
+class SlugAllocationTest(TestCase):
+    """Test set-based unique slug allocation"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+
+    def create_product(self, name, slug=''):
+        return Product.objects.create(name=name, slug=slug, price=Decimal('3.00'), stock=5, category=self.category)
+
+    def test_next_free_suffix_is_found_with_one_query(self):
+        self.create_product('Cherry Shrimp')
+        self.create_product('Cherry Shrimp')
+        self.create_product('Cherry Shrimp Grade A')
+        self.create_product('Other', slug='cherry-shrimp-3')
+
+        with self.assertNumQueries(1):
+            slug = generate_unique_slug(Product(name='Cherry Shrimp'))
+        self.assertEqual(slug, 'cherry-shrimp-2')
+
+    def test_renaming_keeps_own_slug(self):
+        product = self.create_product('Cherry Shrimp')
+        self.assertEqual(generate_unique_slug(product), 'cherry-shrimp')
+
+    def test_batch_allocation_accounts_for_earlier_names(self):
+        self.create_product('Amano Shrimp')
+        names = ['Cherry Shrimp'] * 3 + ['Amano Shrimp', 'Ghost Shrimp']
+
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(Product, names)
+        self.assertEqual(slugs, ['cherry-shrimp', 'cherry-shrimp-1', 'cherry-shrimp-2',
+                                 'amano-shrimp-1', 'ghost-shrimp'])
+
+    def test_slugs_respect_the_field_length(self):
+        slug = allocate_slugs(Category, ['x' * 300])[0]
+        self.assertLessEqual(len(slug), Category._meta.get_field('slug').max_length)
+
+    def test_concurrent_insert_conflict_is_retried(self):
+        self.create_product('Cherry Shrimp')
+        # A stale allocation, as if another request inserted the slug in between
+        with patch('store.models.generate_unique_slug', side_effect=['cherry-shrimp', 'cherry-shrimp-1']):
+            product = self.create_product('Cherry Shrimp')
+        self.assertEqual(product.slug, 'cherry-shrimp-1')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        product = Product(name='Broken', slug='broken', price=Decimal('3.00'), stock=5, category=self.category)
+        save = Mock(side_effect=IntegrityError('NOT NULL constraint failed'))
+
+        with self.assertRaises(IntegrityError):
+            save_with_unique_slug(product, save)
+        self.assertEqual(save.call_count, 1)
@@ -0,0 +1,137 @@
+import csv
+import io
+import unittest
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+
+from store import stock_io
+from store.models import Category, Product, StockMovement
+
+
+def csv_upload(rows, name='stock.csv'):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    return SimpleUploadedFile(name, buffer.getvalue().encode('utf-8'), content_type='text/csv')
+
+
+class StockImportExportTest(TestCase):
+    """Test spreadsheet stock export and import"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.cherry = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                             stock=10, category=self.category)
+        self.amano = Product.objects.create(name='Amano Shrimp', price=Decimal('4.00'),
+                                            stock=5, category=self.category)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_csv_export_streams_rows(self):
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('store:export_stock'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[0], stock_io.EXPORT_COLUMNS)
+        self.assertEqual(rows[1], [str(self.cherry.id), 'Cherry Shrimp', 'Shrimp', '10', '3.00', 'yes'])
+        self.assertEqual(len(rows), 3)
+
+    def test_dry_run_reports_diff_without_writing(self):
+        upload = csv_upload([
+            ['id', 'name', 'stock', 'price', 'available'],
+            [self.cherry.id, 'Cherry Shrimp', '12', '3.00', 'yes'],
+            [self.amano.id, 'Amano Shrimp', '5', '', ''],
+            [999999, 'Missing', '1', '', ''],
+            [self.amano.id, 'Amano Shrimp', '-3', '0.00', 'maybe'],
+        ])
+        report = stock_io.import_stock(upload, dry_run=True)
+
+        self.assertEqual((report.rows, report.changed, report.unchanged, report.error_count), (4, 1, 1, 2))
+        self.assertEqual(report.changes[0].changes, {'stock': (10, 12)})
+        self.assertEqual([row for row, message in report.errors], [4, 5])
+        self.assertIn('stock', report.errors[1][1])
+        self.assertIn('available', report.errors[1][1])
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_import_applies_in_chunks(self):
+        upload = csv_upload([
+            ['id', 'stock', 'price', 'available'],
+            [self.cherry.id, '0', '3.50', 'yes'],
+            [self.amano.id, '8', '', 'no'],
+        ])
+        report = stock_io.import_stock(upload, dry_run=False, user=self.admin, chunk_size=1)
+        self.assertEqual(report.changed, 2)
+
+        self.cherry.refresh_from_db()
+        self.amano.refresh_from_db()
+        self.assertEqual((self.cherry.stock, self.cherry.price, self.cherry.available), (0, Decimal('3.50'), False))
+        self.assertEqual((self.amano.stock, self.amano.available), (8, False))
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list('product_id', 'change', 'reason')),
+            sorted([(self.cherry.id, -10, 'import'), (self.amano.id, 3, 'import')]),
+        )
+
+    def test_model_limits_are_enforced(self):
+        upload = csv_upload([['id', 'price'], [self.cherry.id, '12000.00']])
+        report = stock_io.import_stock(upload, dry_run=False)
+        self.assertEqual(report.error_count, 1)
+        self.assertIn('9,999.99', report.errors[0][1])
+
+    def test_missing_id_column_is_rejected(self):
+        with self.assertRaises(stock_io.StockImportError):
+            stock_io.import_stock(csv_upload([['name', 'stock'], ['Cherry Shrimp', '3']]))
+
+    def test_unreadable_csv_is_rejected_with_its_line(self):
+        header = 'id,stock\n{},3\n'.format(self.cherry.id).encode('utf-8')
+        cases = [
+            (header + 'Caf\xe9,4\n'.encode('latin-1'), 'Line 3 is not UTF-8 text'),
+            (header + b'1,' + b'9' * 200000 + b'\n', 'Line 3 could not be read'),
+        ]
+        for content, message in cases:
+            with self.subTest(message=message), self.assertRaisesMessage(stock_io.StockImportError, message):
+                stock_io.import_stock(SimpleUploadedFile('stock.csv', content))
+
+    def test_import_view_reports_a_binary_upload(self):
+        self.client.login(username='admin', password='password')
+        upload = SimpleUploadedFile('stock.csv', b'\x89PNG\r\n\x1a\n\xff\xfe\x00', content_type='text/csv')
+
+        response = self.client.post(reverse('store:import_stock'), {'file': upload, 'dry_run': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not UTF-8 text', str(response.context['form'].errors['file']))
+
+    def test_import_view_previews_then_applies(self):
+        self.client.login(username='admin', password='password')
+        rows = [['id', 'stock'], [self.cherry.id, '20']]
+
+        response = self.client.post(reverse('store:import_stock'), {'file': csv_upload(rows), 'dry_run': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].changed, 1)
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 10)
+
+        response = self.client.post(reverse('store:import_stock'), {'file': csv_upload(rows)})
+        self.assertRedirects(response, reverse('store:stock_management'), fetch_redirect_response=False)
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 20)
+
+    @unittest.skipUnless(stock_io.xlsx_supported(), 'openpyxl is not installed')
+    def test_xlsx_round_trip(self):
+        data = b''.join(stock_io.iter_xlsx_export(Product.objects.all()))
+        dry_run = stock_io.import_stock(SimpleUploadedFile('stock.xlsx', data), dry_run=True)
+        self.assertEqual((dry_run.rows, dry_run.changed, dry_run.error_count), (2, 0, 0))
+
+        import openpyxl
+        workbook = openpyxl.load_workbook(io.BytesIO(data))
+        workbook.active['D2'] = 42
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        stock_io.import_stock(SimpleUploadedFile('stock.xlsx', buffer.getvalue()), dry_run=False)
+        self.cherry.refresh_from_db()
+        self.assertEqual(self.cherry.stock, 42)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from store import uploads
+from store.forms import CategoryForm
+from store.models import Category
+
+
+def png_upload(name='leaf.png', color='green'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 40), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageUploadTest(TestCase):
+    """Test shared image upload validation and storage"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_file_header_decides_the_image_type(self):
+        self.assertEqual(uploads.validate_image_upload(png_upload()), 'png')
+
+        disguised = SimpleUploadedFile('photo.jpg', b'<html>not an image</html>', content_type='image/jpeg')
+        with self.assertRaisesMessage(ValidationError, 'not a valid image'):
+            uploads.validate_image_upload(disguised)
+
+        with self.assertRaisesMessage(ValidationError, 'Invalid image format'):
+            uploads.validate_image_upload(SimpleUploadedFile('notes.txt', b'GIF89a'))
+
+    def test_form_and_model_sniff_the_upload_once(self):
+        form = CategoryForm(data={'name': 'Plants', 'order': 5}, files={'image': png_upload()})
+        with patch('store.uploads.sniff_image_type', wraps=uploads.sniff_image_type) as sniff:
+            self.assertTrue(form.is_valid(), form.errors)
+            category = form.save()
+        self.assertEqual(sniff.call_count, 1)
+        self.assertTrue(category.image.name.startswith('categories/'))
+        self.assertTrue(category.image.name.endswith('.png'))
+
+    def test_identical_images_are_stored_once(self):
+        first = Category.objects.create(name='Plants', slug='plants', image=png_upload('a.png'))
+        second = Category.objects.create(name='Mosses', slug='mosses', image=png_upload('b.png'))
+        third = Category.objects.create(name='Stones', slug='stones', image=png_upload('c.png', 'grey'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'categories'))), 2)
+
+    def test_reorder_save_is_a_single_update(self):
+        Category.objects.create(name='Plants', slug='plants', order=10, image=png_upload())
+        category = Category.objects.get(slug='plants')
+
+        category.order = 20
+        with self.assertNumQueries(1):
+            category.save()
+        self.assertEqual(Category.objects.get(pk=category.pk).order, 20)
+
+    def test_renaming_still_checks_for_duplicates(self):
+        Category.objects.create(name='Plants', slug='plants', order=10)
+        category = Category.objects.create(name='Mosses', slug='mosses', order=20)
+        category = Category.objects.get(pk=category.pk)
+
+        category.name = 'plants'
+        with self.assertRaises(ValidationError) as raised:
+            category.save()
+        self.assertIn('name', raised.exception.message_dict)
@@ -0,0 +1,65 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+from unittest.mock import patch
+
+from store.models import Category, Order, OrderItem, OutboundEmail, Product, WebhookEvent
+
+
+def make_event(event_id, session_id):
+    return type('Event', (), {
+        'id': event_id,
+        'type': 'checkout.session.completed',
+        'data': type('Data', (), {'object': type('Session', (), {'id': session_id, 'shipping': None})()})(),
+    })()
+
+
+class WebhookEventLedgerTest(TestCase):
+    """Test that Stripe retries are processed exactly once"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Shrimp', slug='shrimp')
+        self.product = Product.objects.create(name='Cherry Shrimp', price=Decimal('3.00'),
+                                              stock=5, category=category)
+        self.order = Order.objects.create(email='customer@example.com', stripe_checkout_id='cs_test_ledger',
+                                          total_amount=Decimal('6.00'))
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal('3.00'))
+
+    def post_webhook(self):
+        return self.client.post(reverse('store:stripe_webhook'), data=json.dumps({}),
+                                content_type='application/json', HTTP_STRIPE_SIGNATURE='sig')
+
+    def test_claim_is_insert_or_skip(self):
+        self.assertTrue(WebhookEvent.objects.claim('evt_1', 'checkout.session.completed'))
+        self.assertFalse(WebhookEvent.objects.claim('evt_1', 'checkout.session.completed'))
+        self.assertTrue(WebhookEvent.objects.is_processed('evt_1'))
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    @patch('store.views.stripe.Webhook.construct_event')
+    def test_retried_event_is_processed_once(self, mock_construct_event):
+        mock_construct_event.return_value = make_event('evt_retry', 'cs_test_ledger')
+
+        self.assertEqual(self.post_webhook().status_code, 200)
+        # The retry short-circuits after a single lookup
+        with self.assertNumQueries(1):
+            self.assertEqual(self.post_webhook().status_code, 200)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(OutboundEmail.objects.filter(order=self.order).count(), 2)
+
+    @patch('store.views.stripe.Webhook.construct_event')
+    def test_unknown_order_releases_claim(self, mock_construct_event):
+        mock_construct_event.return_value = make_event('evt_early', 'cs_test_missing')
+
+        self.assertEqual(self.post_webhook().status_code, 404)
+        self.assertFalse(WebhookEvent.objects.is_processed('evt_early'))
+
+        # Once the order exists the retry is processed normally
+        Order.objects.filter(pk=self.order.pk).update(stripe_checkout_id='cs_test_missing')
+        self.assertEqual(self.post_webhook().status_code, 200)
+        self.assertTrue(WebhookEvent.objects.is_processed('evt_early'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'paid')
@@ -0,0 +1,155 @@
+"""
+Shared handling for uploaded images (category images, admin forms).
+
+Uploads used to be checked twice per request, once by CategoryForm and
+again by Category.clean() on every save (even a reorder), and each upload
+was written to storage under a new name even when the same picture had
+been uploaded before. This module:
+
+* validates an upload once: size, extension and the real image type
+  sniffed from the first bytes of the file, without decoding the image.
+  The result is remembered on the upload object, so the model re-using
+  the form's file does not check it again
+* hashes the content in chunks and stores it under a content-addressed
+  name, so an identical image is never uploaded twice. Storage writes go
+  through storage.save(), which streams file.chunks() (Django spools
+  uploads over FILE_UPLOAD_MAX_MEMORY_SIZE to a temporary file)
+"""
+import hashlib
+import logging
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+VALID_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+
+# Leading bytes of each accepted image type, and the extension stored for it
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg', '.jpg'),
+    (b'\x89PNG', 'png', '.png'),
+    (b'GIF87a', 'gif', '.gif'),
+    (b'GIF89a', 'gif', '.gif'),
+]
+SNIFF_BYTES = 16
+
+_VALIDATED_ATTR = '_store_image_type'
+_HASH_ATTR = '_store_sha256'
+
+def _upload(file):
+    """The uploaded file object behind a model FieldFile, or the file itself"""
+    if isinstance(file, FieldFile):
+        return file.file
+    return file
+
+def is_new_upload(file):
+    """True for a file assigned to a model field but not yet written to storage"""
+    return bool(file) and not getattr(file, '_committed', True)
+
+def sniff_image_type(file):
+    """
+    Identify an image from its first bytes.
+    
+    Returns:
+        tuple of (type, extension), e.g. ('png', '.png'), or None if the
+        header is not a supported image
+    """
+    upload = _upload(file)
+    position = upload.tell() if hasattr(upload, 'tell') else 0
+    upload.seek(0)
+    header = upload.read(SNIFF_BYTES)
+    upload.seek(position)
+    
+    for signature, image_type, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_type, extension
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp', '.webp'
+    return None
+
+def validate_image_upload(file, max_size=MAX_IMAGE_SIZE):
+    """
+    Check an uploaded image's size, extension and real type.
+    
+    The result is cached on the upload, so calling this again for the same
+    file (form then model) costs nothing.
+    
+    Returns:
+        str: The sniffed image type ('jpeg', 'png', 'gif' or 'webp')
+    
+    Raises:
+        ValidationError: With the message to show for the image field
+    """
+    upload = _upload(file)
+    cached = getattr(upload, _VALIDATED_ATTR, None)
+    if cached:
+        return cached[0]
+    
+    size = getattr(upload, 'size', None)
+    if size is not None and size > max_size:
+        raise ValidationError(f'Image file too large. Maximum size is {max_size // (1024 * 1024)}MB.')
+    
+    extension = os.path.splitext(upload.name or '')[1].lower()
+    if extension not in VALID_IMAGE_EXTENSIONS:
+        raise ValidationError(f'Invalid image format. Allowed formats: {", ".join(VALID_IMAGE_EXTENSIONS)}')
+    
+    sniffed = sniff_image_type(upload)
+    if sniffed is None:
+        raise ValidationError('Uploaded file is not a valid image.')
+    
+    setattr(upload, _VALIDATED_ATTR, sniffed)
+    return sniffed[0]
+
+def content_hash(file):
+    """SHA-256 of an upload, read in chunks and cached on the upload"""
+    upload = _upload(file)
+    cached = getattr(upload, _HASH_ATTR, None)
+    if cached:
+        return cached
+    
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    setattr(upload, _HASH_ATTR, digest.hexdigest())
+    return digest.hexdigest()
+
+def store_upload(file, directory, storage=None):
+    """
+    Write an upload to storage under a name derived from its content.
+    
+    Args:
+        file: Uploaded file or uncommitted FieldFile
+        directory: Storage directory, e.g. 'categories/'
+        storage: Storage to use (default: the field's, or default_storage)
+    
+    Returns:
+        str: The stored name; an existing identical file is reused as is
+    """
+    upload = _upload(file)
+    storage = storage or getattr(file, 'storage', None) or default_storage
+    sniffed = getattr(upload, _VALIDATED_ATTR, None) or sniff_image_type(upload)
+    extension = sniffed[1] if sniffed else os.path.splitext(upload.name or '')[1].lower()
+    name = os.path.join(directory, f"{content_hash(upload)[:32]}{extension}")
+    
+    if storage.exists(name):
+        logger.debug(f"Skipped upload of {upload.name}: identical to {name}")
+        return name
+    return storage.save(name, upload)
+
+def save_image_field(instance, field_name, directory):
+    """
+    Store a newly assigned image on a model instance before it is saved.
+    
+    Replaces the pending upload with the content-addressed name, so
+    Model.save() does not write the file again. Does nothing for images
+    already in storage.
+    """
+    file = getattr(instance, field_name)
+    if not is_new_upload(file):
+        return
+    setattr(instance, field_name, store_upload(file, directory))
@@ -64,6 +64,8 @@ urlpatterns = [
     path('stock/', staff_member_required(views.stock_management), name='stock_management'),
     path('stock/update/<int:product_id>/', staff_member_required(views.update_stock), name='update_stock'),
     path('stock/bulk-update/', staff_member_required(views.update_stock_bulk), name='update_stock_bulk'),
+    path('stock/export/', staff_member_required(views.export_stock), name='export_stock'),
+    path('stock/import/', staff_member_required(views.import_stock), name='import_stock'),
     
     # Add this line - this is the URL your template is looking for
     path('stock/update/', staff_member_required(views.update_stock_bulk), name='update_stock_form'),
@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from decimal import Decimal
@@ -6,28 +6,67 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _order_email_context(order):
+    """Template context shared by the order confirmation and notification emails."""
+    return {
+        'order': order,
+        'order_items': order.items.all(),
+        'total': order.total_amount,
+        'shipping_cost': Decimal('0.00'),  # No separate shipping cost in current model
+        'site_name': 'Somerset Shrimp Shack',
+        'customer_name': getattr(order, 'shipping_name', ''),
+        'shipping_info': {
+            'address': getattr(order, 'shipping_address', ''),
+            'city': getattr(order, 'shipping_city', ''),
+            'state': getattr(order, 'shipping_state', ''),
+            'zip': getattr(order, 'shipping_zip', ''),
+            'country': getattr(order, 'shipping_country', ''),
+        }
+    }
+
+
+def build_order_email(order, kind, connection=None):
+    """
+    Render an order email without sending it.
+    
+    Args:
+        order: The Order the email is about
+        kind: 'order_confirmation' (to the customer) or 'order_notification' (to the admin)
+        connection: Optional mail backend connection to attach to the message
+        
+    Returns:
+        EmailMultiAlternatives: Message with plain-text body and HTML alternative
+    """
+    if kind == 'order_confirmation':
+        subject = f'Order Confirmation - #{order.order_reference}'
+        recipient = order.email
+    elif kind == 'order_notification':
+        subject = f'New Order Received - #{order.order_reference}'
+        recipient = getattr(settings, 'ADMIN_EMAIL', 'admin@somersetshrimp.com')
+    else:
+        raise ValueError(f"Unknown order email kind: {kind}")
+    
+    context = _order_email_context(order)
+    html_message = render_to_string(f'store/emails/{kind}.html', context)
+    plain_message = render_to_string(f'store/emails/{kind}.txt', context)
+    
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient],
+        connection=connection,
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
 def send_order_confirmation_email(order):
     """
     Send a detailed order confirmation email to the customer.
     """
     try:
-        order_items = order.items.all()
-
-        context = {
-            'order': order,
-            'order_items': order_items,
-            'total': order.total_amount,
-            'shipping_cost': Decimal('0.00'),  # No separate shipping cost in current model
-            'site_name': 'Somerset Shrimp Shack',
-            'customer_name': getattr(order, 'shipping_name', ''),
-            'shipping_info': {
-                'address': getattr(order, 'shipping_address', ''),
-                'city': getattr(order, 'shipping_city', ''),
-                'state': getattr(order, 'shipping_state', ''),
-                'zip': getattr(order, 'shipping_zip', ''),
-                'country': getattr(order, 'shipping_country', ''),
-            }
-        }
+        context = _order_email_context(order)
 
         subject = f'Order Confirmation - #{order.order_reference}'
         html_message = render_to_string('store/emails/order_confirmation.html', context)
@@ -55,23 +94,7 @@ def send_order_notification_email(order):
     Send a detailed order notification email to the site owner/admin.
     """
     try:
-        order_items = order.items.all()
-
-        context = {
-            'order': order,
-            'order_items': order_items,
-            'total': order.total_amount,
-            'shipping_cost': Decimal('0.00'),  # No separate shipping cost in current model
-            'site_name': 'Somerset Shrimp Shack',
-            'customer_name': getattr(order, 'shipping_name', ''),
-            'shipping_info': {
-                'address': getattr(order, 'shipping_address', ''),
-                'city': getattr(order, 'shipping_city', ''),
-                'state': getattr(order, 'shipping_state', ''),
-                'zip': getattr(order, 'shipping_zip', ''),
-                'country': getattr(order, 'shipping_country', ''),
-            }
-        }
+        context = _order_email_context(order)
 
         subject = f'New Order Received - #{order.order_reference}'
         html_message = render_to_string('store/emails/order_notification.html', context)
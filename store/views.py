@@ -4,7 +4,7 @@ This file contains all view functions for the store application.
 """
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.contrib import messages
 from django.conf import settings
 from django.utils import timezone
@@ -20,13 +20,25 @@ from django.core.exceptions import ValidationError
 from django.core.cache import cache
 from django.db import transaction
 
-from .models import Product, Order, OrderItem, Category
+from .models import Product, Order, OrderItem, Category, StockMovement, WebhookEvent
 from .cart import Cart
-from .forms import CheckoutForm, ProductForm, ContactForm, CategoryForm
-from .utils import send_order_confirmation_email, send_order_notification_email
+from .forms import CheckoutForm, ProductForm, ContactForm, CategoryForm, StockImportForm
+from .facets import normalize_filters, filter_products, get_facets
+from .search import get_search_backend, format_snippet
+from .sampling import sample_products
+from .cache import CacheNamespace
+from .inventory import (
+    InsufficientStock, apply_stock_levels, convert_reservations, get_reservation_expiry, parse_stock_levels,
+    release_reservations
+)
+from .outbox import enqueue_order_emails
+from .analytics import get_sales_summary
+from . import payments, stock_io
+from .pagination import CursorPaginator, cached_totals
+from .order_search import search_orders
+from .orders import OrderBuilder
 
 from decimal import Decimal, InvalidOperation
-import uuid
 import stripe
 import json
 import logging
@@ -38,6 +50,9 @@ logger = logging.getLogger(__name__)
 # Set up Stripe API key
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+# Per-IP request counters for rate limiting (fixed one minute windows)
+rate_limit_cache = CacheNamespace('rate_limit', timeout=60, versioned=False)
+
 # Constants - Deprecated: Use cart.get_shipping_cost() instead
 # SHIPPING_COST = Decimal('6')  # Removed - use dynamic shipping calculation
 
@@ -63,12 +78,19 @@ def validate_stock_quantity(quantity, max_stock=None):
     except (ValueError, TypeError):
         return None, "Invalid quantity format"
 
-def paginate_queryset(request, queryset, per_page=12):
-    """Helper function to paginate querysets with error handling"""
+def paginate_queryset(request, queryset, per_page=12, count=None):
+    """
+    Helper function to paginate querysets with error handling
+    
+    If the caller already knows the total number of rows it can pass it as
+    ``count`` to avoid the paginator's COUNT(*) query.
+    """
     # Validate per_page parameter
     per_page = max(1, min(per_page, 100))  # Limit between 1 and 100
     
     paginator = Paginator(queryset, per_page)
+    if count is not None:
+        paginator.count = count
     page = request.GET.get('page', 1)
     
     try:
@@ -82,6 +104,30 @@ def paginate_queryset(request, queryset, per_page=12):
     
     return page_obj
 
+def paginate_by_cursor(request, queryset, ordering, per_page=20):
+    """
+    Keyset-paginate a queryset using the ``cursor`` GET parameter
+    
+    Unlike paginate_queryset this never counts rows or uses OFFSET, so deep
+    pages cost the same as the first. The page gets ``first_query``,
+    ``next_query`` and ``previous_query`` strings (the current GET parameters
+    with the cursor swapped) for building links.
+    """
+    page_obj = CursorPaginator(queryset, ordering, per_page=per_page).page(request.GET.get('cursor'))
+    
+    def querystring(cursor):
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        params.pop('page', None)
+        if cursor:
+            params['cursor'] = cursor
+        return params.urlencode()
+    
+    page_obj.first_query = querystring(None)
+    page_obj.next_query = querystring(page_obj.next_cursor)
+    page_obj.previous_query = querystring(page_obj.previous_cursor)
+    return page_obj
+
 def ensure_media_directories():
     """Ensure that media directories exist for file uploads"""
     import os
@@ -110,10 +156,7 @@ def ensure_media_directories():
 def home(request):
     """Display the homepage with featured products"""
     # Get featured products that are available
-    featured_products = Product.objects.filter(
-        featured=True, 
-        available=True
-    ).select_related('category').order_by('?')[:4]
+    featured_products = sample_products(4, featured=True)
     
     # Get newest products
     new_arrivals = Product.objects.filter(
@@ -132,57 +175,32 @@ def home(request):
 def product_list(request):
     """Display list of all available products with filters and sorting"""
     # Extract filters from request
+    filters = normalize_filters(request.GET)
     category_filter = request.GET.get('category')
-    sort = request.GET.get('sort', 'name')  # Default sort by name
-    search = request.GET.get('search', '').strip()
-    in_stock = request.GET.get('in_stock')
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
+    search = filters['search']
+    # Default sort by relevance when searching, otherwise by name
+    sort = request.GET.get('sort', 'relevance' if search else 'name')
     
     # Start with all products that are available, using select_related for performance
-    products = Product.objects.filter(available=True).select_related('category')
+    products = filter_products(
+        Product.objects.filter(available=True).select_related('category'),
+        dict(filters, search='')
+    )
     
-    # Apply filters if provided
-    if category_filter:
-        # Try to filter by category slug or name
-        products = products.filter(
-            Q(category__slug=category_filter) | Q(category__name__iexact=category_filter)
-        )
-        
     if search:
-        # Limit search query length for security
-        search = search[:100]
-        products = products.filter(
-            Q(name__icontains=search) | 
-            Q(description__icontains=search)
-        )
-    
-    if in_stock == "1":
-        products = products.filter(stock__gt=0)
-    
-    # Price range filtering with better validation
-    if min_price:
-        try:
-            min_price_decimal = Decimal(min_price)
-            if min_price_decimal >= 0:
-                products = products.filter(price__gte=min_price_decimal)
-        except (ValueError, TypeError, InvalidOperation):
-            logger.warning(f"Invalid min_price provided: {min_price}")
-            
-    if max_price:
-        try:
-            max_price_decimal = Decimal(max_price)
-            if max_price_decimal >= 0:
-                products = products.filter(price__lte=max_price_decimal)
-        except (ValueError, TypeError, InvalidOperation):
-            logger.warning(f"Invalid max_price provided: {max_price}")
+        # Full-text search returns relevance-ranked rows with highlighted snippets
+        products = get_search_backend().search(products, search)
     
     # Apply sorting with validation
     valid_sorts = ['name', 'price-asc', 'price-desc', 'newest']
+    if search:
+        valid_sorts.append('relevance')
     if sort not in valid_sorts:
-        sort = 'name'
+        sort = 'relevance' if search else 'name'
         
-    if sort == 'price-asc':
+    if sort == 'relevance':
+        pass  # Already ordered by search rank
+    elif sort == 'price-asc':
         products = products.order_by('price')
     elif sort == 'price-desc':
         products = products.order_by('-price')
@@ -191,59 +209,57 @@ def product_list(request):
     else:  # Default to name
         products = products.order_by('name')
     
-    # Setup pagination
-    products_page = paginate_queryset(request, products)
+    # Facet counts for the current filters come from one cached grouped query
+    facets = get_facets(filters)
+    
+    # Setup pagination, reusing the facet total instead of a COUNT(*) query
+    # (ranked search results may be capped, so those are counted directly)
+    products_page = paginate_queryset(
+        request, products, count=None if search else facets['total']
+    )
     
     # Organize products by category for template display
     categorized_products = {}
     for product in products_page:
+        if search:
+            product.search_highlight = format_snippet(product.search_snippet)
         category_name = product.category.name
         if category_name not in categorized_products:
             categorized_products[category_name] = []
         categorized_products[category_name].append(product)
     
-    # Get all categories with their product counts
-    category_counts = Category.objects.annotate(
-        count=Count('products', filter=Q(products__available=True))
-    ).values('id', 'name', 'count')
-    
     # Get all categories for display and filtering
     all_categories = Category.objects.all().order_by('name')
     categories_for_filter = {cat.name: cat.name for cat in all_categories}
     
-    # Get min and max prices for price range filter
-    price_range = Product.objects.filter(available=True).aggregate(
-        min_price=Min('price'),
-        max_price=Max('price')
-    )
-    
-    # Get total products count for hero stats
-    total_products = Product.objects.filter(available=True).count()
+    # Get total products count for hero stats (unfiltered facets are cached too)
+    if any(filters.values()):
+        total_products = get_facets(normalize_filters({}))['total']
+    else:
+        total_products = facets['total']
     
     return render(request, 'store/product_list.html', {
         'products': products_page,
         'categorized_products': categorized_products,
         'categories': categories_for_filter,
         'all_categories': all_categories,
-        'category_counts': category_counts,
+        'category_counts': facets['categories'],
+        'facets': facets,
         'current_category': category_filter,
         'current_sort': sort,
         'search_query': search,
-        'in_stock_only': in_stock == "1",
-        'price_range': price_range,
+        'in_stock_only': filters['in_stock'],
+        'price_range': facets['price_range'],
         'total_products': total_products,
         'sort': sort,  # Add sort for template
     })
 
 def product_detail(request, slug):
     """Display detailed product information"""
-    product = get_object_or_404(Product, slug=slug)
+    product = get_object_or_404(Product.objects.select_related('category'), slug=slug)
     
-    # Load related products in same category
-    related_products = Product.objects.filter(
-        category=product.category, 
-        available=True
-    ).exclude(id=product.id).order_by('?')[:4]
+    # Load related products in same category from the cached id pool
+    related_products = sample_products(4, category_id=product.category_id, exclude_ids=[product.id])
     
     # Check if product is in cart already
     cart = Cart(request)
@@ -417,15 +433,13 @@ def add_to_cart(request, product_id):
     logger.debug(f"Add to cart called with product_id={product_id}, method={request.method}")
     
     # Rate limiting: limit to 10 add-to-cart actions per minute per IP
+    # (atomic counter in the shared cache, so the limit holds across workers)
     client_ip = request.META.get('REMOTE_ADDR', '')
-    cache_key = f"add_to_cart_{client_ip}"
-    current_requests = cache.get(cache_key, 0)
+    current_requests = rate_limit_cache.incr(f"add_to_cart:{client_ip}", timeout=60)
     
-    if current_requests >= 10:
+    if current_requests > 10:
         messages.error(request, "Too many requests. Please try again in a minute.")
         return redirect('store:product_list')
-    
-    cache.set(cache_key, current_requests + 1, 60)  # Reset every minute
     try:
         product = get_object_or_404(Product, id=product_id)
     except (ValueError, TypeError):
@@ -434,7 +448,7 @@ def add_to_cart(request, product_id):
         return redirect('store:products')
         
     cart = Cart(request)
-    logger.debug(f"Found product: {product.name}, cart items before: {len(cart.get_cart_items())}")
+    logger.debug(f"Found product: {product.name}, cart lines before: {len(cart.cart)}")
     
     # Check if product is in stock and available
     if not product.is_in_stock:
@@ -464,7 +478,7 @@ def add_to_cart(request, product_id):
         
         # Add to cart
         cart.add(product, quantity=quantity, size=size)
-        logger.debug(f"Added to cart. Cart items after: {len(cart.get_cart_items())}")
+        logger.debug(f"Added to cart. Cart lines after: {len(cart.cart)}")
         
         product_name = product.name
         if size:
@@ -590,6 +604,15 @@ def clear_cart(request):
 # Checkout Views
 ###################
 
+def _warn_stock_shortages(request, shortages):
+    """Add a cart warning for each StockShortage"""
+    for shortage in shortages:
+        messages.warning(
+            request, 
+            f"Only {shortage.available} of {shortage.name} available. "
+            f"Please update your cart quantity."
+        )
+
 def checkout_cart(request):
     """Process checkout for entire cart"""
     cart = Cart(request)
@@ -612,110 +635,66 @@ def checkout_cart(request):
             # Get customer data
             email = form.cleaned_data['email']
             
-            # Stock validation for all items
-            out_of_stock_items = []
-            for item in cart_items:
-                if item.quantity > item.product.stock:
-                    out_of_stock_items.append({
-                        'name': item.product.name,
-                        'requested': item.quantity,
-                        'available': item.product.stock
-                    })
+            builder = OrderBuilder.from_cart(cart, email, user=request.user)
+            
+            # Stock validation for all items in one query
+            shortages = builder.check_stock()
             
             # If any items are out of stock, show error and redirect back
-            if out_of_stock_items:
-                for item in out_of_stock_items:
-                    messages.warning(
-                        request, 
-                        f"Only {item['available']} of {item['name']} available. "
-                        f"Please update your cart quantity."
-                    )
+            if shortages:
+                _warn_stock_shortages(request, shortages)
                 return redirect("store:cart_view")
             
             try:
-                # Create line items for Stripe
-                line_items = []
                 metadata = {
                     'cart': 'true',
                     'email': email,
                     'user_id': request.user.id if request.user.is_authenticated else None,
                 }
                 
-                # Add product items
+                # Add item details to metadata
                 for i, item in enumerate(cart_items):
-                    product = item.product
-                    product_name = f"{product.name}{f' - {item.size}' if item.size else ''}"
-                    
-                    line_items.append({
-                        'price_data': {
-                            'currency': 'gbp',
-                            'product_data': {
-                                'name': product_name,
-                                'images': [request.build_absolute_uri(product.image.url)] if product.image else None,
-                            },
-                            'unit_amount': int(product.price * 100),  # Convert to pence
-                        },
-                        'quantity': item.quantity,
-                    })
-                    
-                    # Add item details to metadata
-                    metadata[f'item_{i}_product_id'] = product.id
+                    metadata[f'item_{i}_product_id'] = item.product.id
                     metadata[f'item_{i}_quantity'] = item.quantity
                     if item.size:
                         metadata[f'item_{i}_size'] = item.size
-                    
-                # Add shipping cost as separate line item
-                line_items.append({
-                    'price_data': {
-                        'currency': 'gbp',
-                        'product_data': {
-                            'name': 'Shipping',
-                        },
-                        'unit_amount': int(shipping_cost * 100),  # Convert to pence
-                    },
-                    'quantity': 1,
-                })
                 
-                # Create Stripe checkout session
-                session = stripe.checkout.Session.create(
-                    payment_method_types=['card'],
-                    line_items=line_items,
-                    mode='payment',
-                    success_url=request.build_absolute_uri(reverse('store:payment_success')),
-                    cancel_url=request.build_absolute_uri(reverse('store:payment_cancel')),
-                    shipping_address_collection={
+                # Stock is held until the Stripe session expires
+                reservation_expires_at = get_reservation_expiry()
+                
+                # Create Stripe checkout session (pooled connection, bounded timeouts and retries)
+                session = payments.create_checkout_session({
+                    'payment_method_types': ['card'],
+                    'line_items': payments.build_line_items(
+                        builder.lines, shipping_cost, request.build_absolute_uri('/')
+                    ),
+                    'mode': 'payment',
+                    'success_url': request.build_absolute_uri(reverse('store:payment_success')),
+                    'cancel_url': request.build_absolute_uri(reverse('store:payment_cancel')),
+                    'shipping_address_collection': {
                         'allowed_countries': ['GB'],  # UK only for now
                     },
-                    metadata=metadata
-                )
-                
-                # Generate unique order reference
-                order_reference = f"SSS-{uuid.uuid4().hex[:8].upper()}"
+                    'metadata': metadata,
+                    'expires_at': int(reservation_expires_at.timestamp()),
+                })
                 
-                # Create preliminary order and items in a transaction
-                with transaction.atomic():
-                    order = Order.objects.create(
-                        user=request.user if request.user.is_authenticated else None,
-                        email=email,
-                        order_reference=order_reference,
-                        stripe_checkout_id=session.id,
-                        status='pending',
-                        total_amount=grand_total,
-                        shipping_address='To be provided via Stripe',
-                        created_at=timezone.now()
-                    )
-                    
-                    # Create order items
-                    for item in cart_items:
-                        OrderItem.objects.create(
-                            order=order,
-                            product=item.product,
-                            price=item.price,
-                            quantity=item.quantity,
-                            size=item.size
-                        )
+                try:
+                    # Hold the stock and create the preliminary order and all its items
+                    builder.create(stripe_checkout_id=session.id, reservation_expires_at=reservation_expires_at)
+                except InsufficientStock:
+                    # Don't leave a payable session behind for stock we could not hold
+                    try:
+                        payments.expire_checkout_session(session.id)
+                    except stripe.error.StripeError as e:
+                        logger.error(f"Failed to expire checkout session {session.id}: {str(e)}")
+                    raise
                 
                 return redirect(session.url)
+            except InsufficientStock as e:
+                # Stock sold out while the Stripe session was being created
+                logger.warning(f"Stock changed during cart checkout: {str(e)}")
+                _warn_stock_shortages(request, e.shortages)
+                return redirect("store:cart_view")
             except stripe.error.CardError as e:
                 # Since it's a decline, stripe.error.CardError will be caught
                 logger.error(f"Card error in cart checkout: {str(e)}")
@@ -839,59 +818,68 @@ def stripe_webhook(request):
     if event.type == 'checkout.session.completed':
         session = event.data.object  # Stripe Checkout Session
         
+        # Stripe retries deliveries, so skip events that were already handled
+        if WebhookEvent.objects.is_processed(event.id):
+            logger.info(f"Ignoring duplicate webhook event {event.id}")
+            return HttpResponse(status=200)
+        
         try:
-            # Find the corresponding order
-            order = Order.objects.get(stripe_checkout_id=session.id)
-            
-            # Update order status and payment date
-            order.status = 'paid'
-            order.payment_date = timezone.now()
-            
-            # Get shipping details from the session
-            if hasattr(session, 'shipping') and session.shipping:
-                name = session.shipping.name
-                address = session.shipping.address
+            with transaction.atomic():
+                # Claim the event in the same transaction as the order update,
+                # so concurrent deliveries of one event are processed once
+                if not WebhookEvent.objects.claim(event.id, event.type):
+                    logger.info(f"Ignoring duplicate webhook event {event.id}")
+                    return HttpResponse(status=200)
                 
-                order.shipping_name = name
-                order.shipping_address = address.line1
-                if hasattr(address, 'line2') and address.line2:
-                    order.shipping_address += f"\n{address.line2}"
-                order.shipping_city = address.city
-                order.shipping_state = address.state
-                order.shipping_zip = address.postal_code
-                order.shipping_country = address.country
-            
-            order.save()
-            
-            # Send email notifications
-            try:
-                # Send confirmation email to customer
-                send_order_confirmation_email(order)
+                # Find the corresponding order
+                order = Order.objects.select_for_update().get(stripe_checkout_id=session.id)
                 
-                # Send notification email to admin
-                send_order_notification_email(order)
+                # Update order status and payment date
+                order.status = 'paid'
+                order.payment_date = timezone.now()
                 
-                logger.info(f"Email notifications sent for order #{order.id}")
-            except Exception as e:
-                logger.error(f"Failed to send email notifications for order #{order.id}: {str(e)}")
-            
-            # Update product stock levels
-            with transaction.atomic():
-                for item in order.items.all():
-                    product = item.product
-                    if product.stock >= item.quantity:
-                        product.stock -= item.quantity
-                        product.save()
-                    else:
-                        logger.warning(f"Order #{order.id}: Not enough stock for {product.name}")
+                # Get shipping details from the session
+                if hasattr(session, 'shipping') and session.shipping:
+                    name = session.shipping.name
+                    address = session.shipping.address
+                    
+                    order.shipping_name = name
+                    order.shipping_address = address.line1
+                    if hasattr(address, 'line2') and address.line2:
+                        order.shipping_address += f"\n{address.line2}"
+                    order.shipping_city = address.city
+                    order.shipping_state = address.state
+                    order.shipping_zip = address.postal_code
+                    order.shipping_country = address.country
+                
+                order.save()
+                
+                # Queue email notifications; the process_email_outbox worker sends them.
+                # Queued in the same transaction, so they exist iff the order is paid.
+                enqueue_order_emails(order)
+                
+                # Convert the checkout's stock holds into conditional, race-free decrements
+                stock_results = convert_reservations(
+                    session.id, order.items.values_list('product_id', 'quantity')
+                )
+                for result in stock_results:
+                    if not result.decremented:
+                        logger.warning(
+                            f"Order #{order.id}: Not enough stock for product #{result.product_id} "
+                            f"(requested {result.quantity})"
+                        )
                         # Consider what to do here - maybe partial fulfillment or customer notification
-            
-            logger.info(f"Payment for order #{order.id} completed successfully")
+                
+                logger.info(f"Payment for order #{order.id} completed successfully")
             
         except Order.DoesNotExist:
             logger.error(f"Order not found for session ID: {session.id}")
             return HttpResponse(status=404)
     
+    elif event.type == 'checkout.session.expired':
+        # The customer never paid; give the held stock back
+        release_reservations(event.data.object.id)
+    
     # Acknowledge receipt of the event
     return HttpResponse(status=200)
 
@@ -987,30 +975,17 @@ def dashboard(request):
     """
     Admin dashboard showing key metrics
     """
-    from django.contrib.auth.models import User
-    from datetime import datetime, timedelta
-    
-    # Get current month and year
-    now = timezone.now()
-    current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-    
     # Get counts for dashboard stats
     total_products = Product.objects.count()
     
-    # Total orders (all time)
-    total_orders = Order.objects.count()
-    
-    # Total orders this month
-    orders_this_month = Order.objects.filter(
-        created_at__gte=current_month_start
-    ).count()
+    # Sales KPIs and the 6-month chart come from the daily sales rollup
+    sales = get_sales_summary(months=6)
+    this_month, last_month = sales['months'][-1], sales['months'][-2]
     
-    # Total orders last month
-    orders_last_month = Order.objects.filter(
-        created_at__gte=last_month_start,
-        created_at__lt=current_month_start
-    ).count()
+    # Total orders (all time, whatever their status)
+    total_orders = Order.objects.count()
+    orders_this_month = this_month['orders']
+    orders_last_month = last_month['orders']
     
     # Calculate order growth percentage
     if orders_last_month > 0:
@@ -1018,23 +993,9 @@ def dashboard(request):
     else:
         order_growth = 100 if orders_this_month > 0 else 0
     
-    # Total revenue (from paid orders)
-    total_revenue = Order.objects.filter(status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or Decimal('0')
-    
-    # Revenue this month
-    revenue_this_month = Order.objects.filter(
-        status='paid',
-        created_at__gte=current_month_start
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-    
-    # Revenue last month
-    revenue_last_month = Order.objects.filter(
-        status='paid',
-        created_at__gte=last_month_start,
-        created_at__lt=current_month_start
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
+    total_revenue = sales['total']['revenue']
+    revenue_this_month = this_month['revenue']
+    revenue_last_month = last_month['revenue']
     
     # Calculate revenue growth percentage
     if revenue_last_month > 0:
@@ -1042,16 +1003,9 @@ def dashboard(request):
     else:
         revenue_growth = 100 if revenue_this_month > 0 else 0
     
-    # Active customers (customers who have made orders this month)
-    active_customers = Order.objects.filter(
-        created_at__gte=current_month_start
-    ).values('email').distinct().count()
-    
-    # Active customers last month
-    active_customers_last_month = Order.objects.filter(
-        created_at__gte=last_month_start,
-        created_at__lt=current_month_start
-    ).values('email').distinct().count()
+    # Active customers (customers who have paid for orders this month)
+    active_customers = this_month['customers']
+    active_customers_last_month = last_month['customers']
     
     # Calculate customer growth percentage
     if active_customers_last_month > 0:
@@ -1068,36 +1022,15 @@ def dashboard(request):
     # Products for overview section
     products = Product.objects.select_related('category').order_by('-created_at')[:10]
     
-    # Get monthly data for charts (past 6 months)
-    monthly_orders = []
-    monthly_revenue = []
-    
-    for i in range(6):  # Past 6 months
-        month_date = current_month_start - timedelta(days=30 * i)
-        month_start = month_date.replace(day=1)
-        
-        if month_start.month == 12:
-            next_month_start = month_start.replace(year=month_start.year + 1, month=1)
-        else:
-            next_month_start = month_start.replace(month=month_start.month + 1)
-        
-        # Orders this month
-        month_orders = Order.objects.filter(
-            created_at__gte=month_start,
-            created_at__lt=next_month_start,
-            status='paid'
-        )
-        
-        count = month_orders.count()
-        revenue = month_orders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        month_name = month_start.strftime('%b %Y')
-        monthly_orders.append({'month': month_name, 'count': count})
-        monthly_revenue.append({'month': month_name, 'amount': float(revenue)})
-    
-    # Reverse to show oldest to newest
-    monthly_orders.reverse()
-    monthly_revenue.reverse()
+    # Monthly data for charts (past 6 months, oldest to newest)
+    monthly_orders = [
+        {'month': month['month'].strftime('%b %Y'), 'count': month['orders']}
+        for month in sales['months']
+    ]
+    monthly_revenue = [
+        {'month': month['month'].strftime('%b %Y'), 'amount': float(month['revenue'])}
+        for month in sales['months']
+    ]
     
     return render(request, 'store/dashboard.html', {
         'title': 'Admin Dashboard',
@@ -1155,11 +1088,9 @@ def stock_management(request):
             Q(id__icontains=search)
         )
     
-    # Order by stock (low to high) then by name
-    products = products.order_by('stock', 'name')
-    
-    # Setup pagination
-    page_obj = paginate_queryset(request, products, per_page=20)
+    # Order by stock (low to high) then by name; keyset pagination on (stock, name, id)
+    page_obj = paginate_by_cursor(request, products, ['stock', 'name', 'id'], per_page=20)
+    product_count = cached_totals(products)['count']
     
     # Get categories for filter dropdown - Fixed: ensure all categories are shown
     categories = Category.objects.all().order_by('name')
@@ -1167,12 +1098,69 @@ def stock_management(request):
     return render(request, 'store/stock_management.html', {
         'title': 'Stock Management',
         'products': page_obj,
+        'product_count': product_count,
         'categories': categories,
         'current_category': int(category_id) if category_id and category_id.isdigit() else None,
         'current_stock_status': stock_status,
         'search_query': search,
     })
 
+@staff_member_required
+def export_stock(request):
+    """Stream every product's stock, price and availability as CSV or XLSX"""
+    file_format = request.GET.get('format', 'csv')
+    products = Product.objects.all()
+    filename = f"stock-{timezone.localdate():%Y-%m-%d}"
+    
+    if file_format == 'xlsx':
+        if not stock_io.xlsx_supported():
+            messages.error(request, "XLSX export is not available on this server. Please use CSV.")
+            return redirect('store:stock_management')
+        response = StreamingHttpResponse(
+            stock_io.iter_xlsx_export(products),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
+        return response
+    
+    response = StreamingHttpResponse(stock_io.iter_csv_export(products), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+@staff_member_required
+def import_stock(request):
+    """Preview or apply a stock take uploaded as CSV or XLSX"""
+    report = None
+    
+    if request.method == 'POST':
+        form = StockImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            dry_run = form.cleaned_data['dry_run']
+            try:
+                report = stock_io.import_stock(
+                    form.cleaned_data['file'], dry_run=dry_run, user=request.user
+                )
+            except stock_io.StockImportError as e:
+                form.add_error('file', str(e))
+            else:
+                if not dry_run:
+                    messages.success(
+                        request,
+                        f"Imported {report.rows} row(s): {report.changed} product(s) updated, "
+                        f"{report.error_count} row(s) skipped."
+                    )
+                    if not report.error_count:
+                        return redirect('store:stock_management')
+    else:
+        form = StockImportForm()
+    
+    return render(request, 'store/stock_import.html', {
+        'title': 'Import Stock',
+        'form': form,
+        'report': report,
+        'xlsx_supported': stock_io.xlsx_supported(),
+    })
+
 @staff_member_required
 @require_POST
 def update_stock(request, product_id):
@@ -1182,11 +1170,12 @@ def update_stock(request, product_id):
     try:
         new_stock = int(request.POST.get('stock', 0))
         if new_stock >= 0:
-            old_stock = product.stock
-            product.stock = new_stock
-            product.save()
-            
-            change = new_stock - old_stock
+            stock_changes = apply_stock_levels(
+                {product.id: new_stock}, user=request.user, reason=StockMovement.REASON_ADJUSTMENT
+            )
+            if stock_changes:
+                product = stock_changes[0].product
+            change = stock_changes[0].change if stock_changes else 0
             if change > 0:
                 messages.success(request, f"Added {change} to {product.name} stock (now {new_stock})")
             elif change < 0:
@@ -1216,42 +1205,18 @@ def update_stock(request, product_id):
 @require_POST
 def update_stock_bulk(request):
     """Handle bulk stock updates from the stock management form"""
-    products_updated = 0
-    results = []
-    
-    # Process all form fields
-    for key, value in request.POST.items():
-        # Check if this is a stock update field (format: stock_X where X is product ID)
-        if key.startswith('stock_'):
-            try:
-                # Extract product ID from field name
-                product_id = int(key.replace('stock_', ''))
-                new_stock = int(value)
-                
-                if new_stock < 0:
-                    continue  # Skip negative values
-                    
-                # Find and update product
-                product = Product.objects.get(id=product_id)
-                
-                # Only update if stock value actually changed
-                if product.stock != new_stock:
-                    old_stock = product.stock
-                    product.stock = new_stock
-                    product.save()
-                    products_updated += 1
-                    
-                    # Add to results for AJAX response
-                    results.append({
-                        'id': product.id,
-                        'stock': product.stock,
-                        'change': new_stock - old_stock,
-                        'status': product.stock_status
-                    })
-                    
-            except (ValueError, Product.DoesNotExist):
-                # Skip any fields with invalid format or non-existent products
-                continue
+    # Parse the whole submission, then apply every change in one batch
+    changes = apply_stock_levels(parse_stock_levels(request.POST), user=request.user)
+    products_updated = len(changes)
+    results = [
+        {
+            'id': change.product.id,
+            'stock': change.product.stock,
+            'change': change.change,
+            'status': change.product.stock_status
+        }
+        for change in changes
+    ]
     
     # Check if we should return JSON for AJAX requests
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1294,12 +1259,8 @@ def order_management(request):
     if search:
         # Limit search query length for security
         search = search.strip()[:100]
-        orders = orders.filter(
-            Q(email__icontains=search) | 
-            Q(shipping_name__icontains=search) |
-            Q(order_reference__icontains=search) |
-            Q(id__icontains=search)
-        )
+        # Pick an indexed lookup based on the shape of the query
+        orders = search_orders(orders, search)
     
     if start_date:
         try:
@@ -1316,17 +1277,17 @@ def order_management(request):
         except ValueError:
             pass
             
-    # Order by most recent first
-    orders = orders.order_by('-created_at')
-    
-    # Setup pagination
-    page_obj = paginate_queryset(request, orders, per_page=20)
-    
-    # Summary stats for current filter
-    order_count = orders.count()
-    total_revenue = orders.filter(status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or Decimal('0')
+    # Most recent first; keyset pagination on (created_at, id)
+    page_obj = paginate_by_cursor(request, orders, ['-created_at', '-id'], per_page=20)
+    
+    # Summary stats for current filter (one query, cached briefly)
+    totals = cached_totals(
+        orders,
+        order_count=Count('id'),
+        total_revenue=Sum('total_amount', filter=Q(status='paid')),
+    )
+    order_count = totals['order_count']
+    total_revenue = totals['total_revenue'] or Decimal('0')
     
     return render(request, 'store/order_management.html', {
         'title': 'Order Management',
@@ -1458,12 +1419,8 @@ def add_product(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
-            product = form.save(commit=False)
-            # Ensure the slug is set
-            if not product.slug:
-                from django.utils.text import slugify
-                product.slug = slugify(product.name)
-            product.save()
+            # Product.save() allocates a unique slug
+            product = form.save()
             
             messages.success(request, f"Product '{product.name}' was successfully added.")
             return redirect('store:product_management')
@@ -1731,38 +1688,36 @@ def update_category_order(request):
         if not category_orders:
             return JsonResponse({'success': False, 'message': 'No category order data provided'})
         
-        logger.info(f"Updating category order for {len(category_orders)} categories")
+        orders = {}
+        skipped = 0
+        for item in category_orders:
+            try:
+                category_id = int(item.get('id'))
+                new_order = int(item.get('order'))
+            except (AttributeError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if new_order < 0:
+                skipped += 1
+                continue
+            orders[category_id] = new_order
+        
+        if skipped:
+            logger.warning(f"Skipped {skipped} category order entries with a missing or invalid id/order")
         
         with transaction.atomic():
-            updated_count = 0
-            for item in category_orders:
-                category_id = item.get('id')
-                new_order = item.get('order')
-                
-                if category_id is None or new_order is None:
-                    logger.warning(f"Missing id or order in item: {item}")
-                    continue
-                
-                try:
-                    category = Category.objects.get(id=category_id)
-                    old_order = category.order
-                    category.order = new_order
-                    category.save()
-                    updated_count += 1
-                    logger.info(f"Updated category '{category.name}' order from {old_order} to {new_order}")
-                except Category.DoesNotExist:
-                    logger.warning(f"Category with id {category_id} does not exist")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error updating category {category_id}: {str(e)}")
-                    continue
+            result = Category.objects.reorder(orders)
         
-        logger.info(f"Successfully updated order for {updated_count} categories")
+        if result.missing:
+            logger.warning(f"Categories do not exist: {result.missing}")
+        logger.info(
+            f"Updated order for {result.updated} categories ({result.unchanged} unchanged)"
+        )
         
         return JsonResponse({
             'success': True, 
-            'message': f'Successfully updated {updated_count} categories',
-            'updated_count': updated_count
+            'message': f'Successfully updated {result.updated} categories',
+            'updated_count': result.updated
         })
     
     except json.JSONDecodeError: